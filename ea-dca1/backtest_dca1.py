@@ -16,6 +16,8 @@ import sys
 from dataclasses import dataclass
 from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
+
 DEFAULT_SYMBOL = "XAUUSD"
 DEFAULT_TIMEFRAME_MINUTES = 60 * 24
 CONTRACT_SIZE_DEFAULT = 1.0
@@ -24,6 +26,10 @@ SPREAD_DEFAULT = 2.0
 PRICE_SCALE_DEFAULT = 1.0
 MIN_LOT_DEFAULT = 0.01
 LOT_STEP_DEFAULT = 0.01
+CSV_CHUNK_BYTES = 16 * 1024 * 1024
+MAX_PRICE_WIDTH = 32
+EPOCH = dt.datetime(1970, 1, 1)
+CATALOG_NAME = "catalog.json"
 
 try:
     sys.stdout.reconfigure(line_buffering=True)
@@ -86,6 +92,13 @@ class Bar:
     close: float
 
 
+@dataclass
+class TickBlock:
+    time_ms: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--symbol", default=DEFAULT_SYMBOL)
@@ -104,8 +117,34 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def load_catalog_paths(base: str, symbol: str) -> Optional[Dict[str, str]]:
+    # catalog.json is maintained by ea-nm1/tick_store.py; only trust it while every
+    # year directory still has the mtime it was built from.
+    try:
+        with open(os.path.join(base, CATALOG_NAME), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("symbol") != symbol or payload.get("source") != "csv":
+            return None
+        dirs = payload.get("dirs", {})
+        years = {name for name in os.listdir(base) if name.isdigit()}
+        if years != set(dirs):
+            return None
+        for year, mtime_ns in dirs.items():
+            if os.stat(os.path.join(base, year)).st_mtime_ns != mtime_ns:
+                return None
+    except (OSError, ValueError, AttributeError):
+        return None
+    return {day: stats["path"] for day, stats in payload.get("days", {}).items()}
+
+
 def iter_tick_files(data_dir: str, symbol: str, start: dt.date, end: dt.date) -> Iterator[str]:
     base = os.path.join(data_dir, symbol)
+    catalog = load_catalog_paths(base, symbol)
+    if catalog is not None:
+        for day in sorted(catalog):
+            if start.isoformat() <= day <= end.isoformat():
+                yield os.path.join(base, catalog[day])
+        return
     current = start
     while current <= end:
         path = os.path.join(base, f"{current.year:04d}", f"{symbol}_{current.isoformat()}.csv.gz")
@@ -114,19 +153,181 @@ def iter_tick_files(data_dir: str, symbol: str, start: dt.date, end: dt.date) ->
         current += dt.timedelta(days=1)
 
 
+def days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def decode_time_field(buf: np.ndarray, begin: np.ndarray, end: np.ndarray) -> Optional[np.ndarray]:
+    # Fixed "YYYY-MM-DD HH:MM:SS.ffffff" layout parsed arithmetically; None -> strptime path.
+    length = end - begin
+    if length.min() < 21 or length.max() > 26:
+        return None
+    head = buf[begin[:, None] + np.arange(20)]
+    if not (
+        np.all(head[:, [4, 7]] == ord("-"))
+        and np.all(head[:, 10] == ord(" "))
+        and np.all(head[:, [13, 16]] == ord(":"))
+        and np.all(head[:, 19] == ord("."))
+    ):
+        return None
+    digits = head[:, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]].astype(np.int64) - ord("0")
+    if digits.min() < 0 or digits.max() > 9:
+        return None
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    if month.min() < 1 or month.max() > 12 or day.min() < 1 or day.max() > 31:
+        return None
+    seconds = (
+        days_from_civil(year, month, day) * 86400
+        + (digits[:, 8] * 10 + digits[:, 9]) * 3600
+        + (digits[:, 10] * 10 + digits[:, 11]) * 60
+        + digits[:, 12] * 10
+        + digits[:, 13]
+    )
+    micros = np.zeros(begin.shape[0], dtype=np.int64)
+    frac_len = length - 20
+    for k in range(6):
+        present = frac_len > k
+        if not present.any():
+            break
+        digit = buf[np.where(present, begin + 20 + k, begin)].astype(np.int64) - ord("0")
+        if np.any(present & ((digit < 0) | (digit > 9))):
+            return None
+        micros += np.where(present, digit * 10 ** (5 - k), 0)
+    if np.any(micros % 1000 != 0):
+        return None
+    return seconds * 1000 + micros // 1000
+
+
+def decode_price_field(buf: np.ndarray, begin: np.ndarray, end: np.ndarray) -> Optional[np.ndarray]:
+    length = end - begin
+    width = int(length.max())
+    if length.min() <= 0 or width > MAX_PRICE_WIDTH:
+        return None
+    offsets = np.arange(width)
+    chars = buf[np.minimum(begin[:, None] + offsets, buf.shape[0] - 1)]
+    chars[offsets >= length[:, None]] = 0
+    try:
+        return np.ascontiguousarray(chars).view(f"S{width}").ravel().astype(np.float64)
+    except ValueError:
+        return None
+
+
+def decode_tick_chunk(data: bytes, columns: List[str]) -> Optional[TickBlock]:
+    if b'"' in data:
+        return None
+    if b"\r" in data:
+        data = data.replace(b"\r", b"")
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    buf = np.frombuffer(data, dtype=np.uint8)
+    line_end = np.flatnonzero(buf == ord("\n"))
+    line_begin = np.concatenate(([0], line_end[:-1] + 1))
+    keep = line_end > line_begin
+    line_begin = line_begin[keep]
+    line_end = line_end[keep]
+    if line_end.shape[0] == 0:
+        return TickBlock(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    separators = len(columns) - 1
+    commas = np.flatnonzero(buf == ord(","))
+    if commas.shape[0] != line_end.shape[0] * separators:
+        return None
+    commas = commas.reshape(line_end.shape[0], separators)
+    if separators > 0 and (np.any(commas[:, 0] < line_begin) or np.any(commas[:, -1] > line_end)):
+        return None
+    field_begin = [line_begin] + [commas[:, i] + 1 for i in range(separators)]
+    field_end = [commas[:, i] for i in range(separators)] + [line_end]
+    time_col = columns.index("datetime")
+    bid_col = columns.index("bid")
+    ask_col = columns.index("ask")
+    time_ms = decode_time_field(buf, field_begin[time_col], field_end[time_col])
+    bid = decode_price_field(buf, field_begin[bid_col], field_end[bid_col])
+    ask = decode_price_field(buf, field_begin[ask_col], field_end[ask_col])
+    if time_ms is None or bid is None or ask is None:
+        return None
+    return TickBlock(time_ms, bid, ask)
+
+
+def decode_tick_file(path: str, chunk_bytes: int = CSV_CHUNK_BYTES) -> Optional[TickBlock]:
+    parts: List[TickBlock] = []
+    with gzip.open(path, "rb") as f:
+        columns = [name.strip() for name in f.readline().decode("utf-8", "replace").strip().split(",")]
+        if not {"datetime", "bid", "ask"}.issubset(columns):
+            return None
+        pending = b""
+        while True:
+            chunk = f.read(chunk_bytes)
+            data = pending + chunk
+            if chunk:
+                cut = data.rfind(b"\n") + 1
+                pending = data[cut:]
+                data = data[:cut]
+            if data:
+                part = decode_tick_chunk(data, columns)
+                if part is None:
+                    return None
+                parts.append(part)
+            if not chunk:
+                break
+    if not parts:
+        return TickBlock(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    return TickBlock(
+        np.concatenate([part.time_ms for part in parts]),
+        np.concatenate([part.bid for part in parts]),
+        np.concatenate([part.ask for part in parts]),
+    )
+
+
+def iter_tick_rows(path: str, scale: float) -> Iterator[Tuple[dt.datetime, float, float]]:
+    with gzip.open(path, "rt") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            ts = dt.datetime.strptime(row["datetime"], "%Y-%m-%d %H:%M:%S.%f")
+            ask = float(row["ask"]) * scale
+            bid = float(row["bid"]) * scale
+            yield ts, ask, bid
+
+
+def iter_tick_blocks(
+    files: Iterable[str],
+    price_scale: float = 1.0,
+) -> Iterator[TickBlock]:
+    scale = price_scale if price_scale > 0.0 else 1.0
+    for path in files:
+        block = decode_tick_file(path)
+        if block is None:
+            rows = list(iter_tick_rows(path, scale))
+            block = TickBlock(
+                np.array([(ts - EPOCH) // dt.timedelta(milliseconds=1) for ts, _, _ in rows], dtype=np.int64),
+                np.array([bid for _, _, bid in rows], dtype=np.float64),
+                np.array([ask for _, ask, _ in rows], dtype=np.float64),
+            )
+        elif scale != 1.0:
+            block = TickBlock(block.time_ms, block.bid * scale, block.ask * scale)
+        if block.time_ms.shape[0] > 0:
+            yield block
+
+
 def iter_ticks(
     files: Iterable[str],
     price_scale: float = 1.0,
 ) -> Iterator[Tuple[dt.datetime, float, float]]:
     scale = price_scale if price_scale > 0.0 else 1.0
     for path in files:
-        with gzip.open(path, "rt") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                ts = dt.datetime.strptime(row["datetime"], "%Y-%m-%d %H:%M:%S.%f")
-                ask = float(row["ask"]) * scale
-                bid = float(row["bid"]) * scale
-                yield ts, ask, bid
+        block = decode_tick_file(path)
+        if block is None:
+            yield from iter_tick_rows(path, scale)
+            continue
+        if scale != 1.0:
+            block = TickBlock(block.time_ms, block.bid * scale, block.ask * scale)
+        for time_ms, ask, bid in zip(block.time_ms.tolist(), block.ask.tolist(), block.bid.tolist()):
+            yield EPOCH + dt.timedelta(milliseconds=time_ms), ask, bid
 
 
 def build_bars(ticks: Iterable[Tuple[dt.datetime, float, float]], timeframe_minutes: int) -> Iterator[Bar]:
@@ -148,6 +349,38 @@ def build_bars(ticks: Iterable[Tuple[dt.datetime, float, float]], timeframe_minu
         yield current_bar
 
 
+def build_bars_from_blocks(blocks: Iterable[TickBlock], timeframe_minutes: int) -> Iterator[Bar]:
+    current_bar = None
+    bucket_ms = None
+    for block in blocks:
+        price = (block.ask + block.bid) / 2.0
+        minute = (block.time_ms // 60000) % 60
+        buckets = block.time_ms - block.time_ms % 3600000 + (minute // timeframe_minutes) * timeframe_minutes * 60000
+        starts = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+        highs = np.maximum.reduceat(price, starts)
+        lows = np.minimum.reduceat(price, starts)
+        ends = np.concatenate((starts[1:], [price.shape[0]])) - 1
+        for i, start in enumerate(starts.tolist()):
+            bucket = int(buckets[start])
+            if current_bar is not None and bucket == bucket_ms:
+                current_bar.high = max(current_bar.high, float(highs[i]))
+                current_bar.low = min(current_bar.low, float(lows[i]))
+                current_bar.close = float(price[ends[i]])
+                continue
+            if current_bar is not None:
+                yield current_bar
+            bucket_ms = bucket
+            current_bar = Bar(
+                ts=EPOCH + dt.timedelta(milliseconds=bucket),
+                open=float(price[start]),
+                high=float(highs[i]),
+                low=float(lows[i]),
+                close=float(price[ends[i]]),
+            )
+    if current_bar is not None:
+        yield current_bar
+
+
 def calc_atr(bars: List[Bar], period: int) -> List[Optional[float]]:
     atr = [None] * len(bars)
     trs = []
@@ -541,8 +774,8 @@ def main() -> None:
     files = list(iter_tick_files(args.data_dir, args.symbol, start, end))
     if not files:
         raise SystemExit("No data files found.")
-    ticks = iter_ticks(files, params.price_scale)
-    bars = list(build_bars(ticks, params.timeframe_minutes))
+    blocks = iter_tick_blocks(files, params.price_scale)
+    bars = list(build_bars_from_blocks(blocks, params.timeframe_minutes))
     if not bars:
         raise SystemExit("No bars constructed from data.")
     results = run_backtest(bars, params, debug=args.debug)
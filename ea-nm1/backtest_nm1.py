@@ -6,23 +6,88 @@ Default range: last 30 days from latest available data in data/<SYMBOL>.
 
 from __future__ import annotations
 
+import abc
 import argparse
+import collections
 import concurrent.futures
+import copy
 import csv
 import datetime as dt
+import functools
 import gzip
+import hashlib
 import json
 import os
-from dataclasses import asdict, dataclass, field
-from typing import Dict, Iterator, List, Optional, Tuple
+import pickle
+import threading
+from dataclasses import asdict, astuple, dataclass, field, fields, replace
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from event_journal import (
+    J_CLOSE,
+    J_ENTRY_CHECK,
+    J_FUNDING,
+    J_HOUR,
+    J_HOUR_FIRST,
+    J_MARGIN_CALL,
+    J_MARGIN_CALL_STOP,
+    J_NO_FUNDS,
+    J_OPEN,
+    J_OPEN_SKIP,
+    J_SNAPSHOT,
+    J_TRANSFER,
+    EventJournal,
+)
+from tick_store import (
+    BLOCK_ITER_ROWS,
+    DEFAULT_PREFETCH_DAYS,
+    DEFAULT_PREFETCH_MAX_MB,
+    DEFAULT_TICK_CACHE_MB,
+    MS_PER_HOUR,
+    MS_PER_MINUTE,
+    TICK_SOURCES,
+    PrefetchConfig,
+    SharedTicks,
+    SharedTicksHandle,
+    TickArrays,
+    TickCache,
+    attach_shared_ticks,
+    catalog_fingerprint,
+    check_catalog,
+    concat_tick_arrays,
+    datetime_to_ms,
+    datetime_to_ms_ceil,
+    iter_block_ticks,
+    iter_days,
+    iter_prefetched,
+    iter_tick_blocks,
+    ms_to_datetime,
+    read_csv_range,
+    refresh_catalog,
+    scale_prices,
+    tick_fingerprint,
+)
 
 # NM1 constants (from NM1.mq5)
 K_MAX_LEVELS = 13
 K_CORE_FLEX_SPLIT_LEVEL = 20 # 20 = spilitしない
 K_FLEX_COMMENT = "NM1_FLEX"
 K_CORE_COMMENT = "NM1_CORE"
+SIDE_BUY = 0
+SIDE_SELL = 1
 ATR_PERIOD = 14
+ATR_BASE_BARS = 50
+ATR_BASE_LAG = 5
 ADX_PERIOD = 14
+INDICATOR_CACHE_VERSION = 1
+RESULT_CACHE_VERSION = 1
+CHECKPOINT_VERSION = 1
+MS_PER_DAY = 24 * MS_PER_HOUR
+TIME_MODES = ("datetime", "int")
+# Engine timestamps: datetime, or int epoch milliseconds in the "int" time mode.
+TickTime = Union[dt.datetime, int]
 CONTRACT_SIZE = 100.0
 TOTAL_CAPITAL = 250000.0
 START_BALANCE = 50000.0
@@ -39,6 +104,7 @@ SYMBOL_PARAM_PRESETS: Dict[str, Dict[str, object]] = {
         "profit_base": 1.0,
         "max_levels": 12,
         "contract_size": 100.0,
+        "bi5_price_divisor": 1000.0,
     },
     "BTCUSD": {
         "atr_multiplier": 2.5,
@@ -48,6 +114,7 @@ SYMBOL_PARAM_PRESETS: Dict[str, Dict[str, object]] = {
         "max_levels": 20,
         "contract_size": 1.0,
         "price_scale": 100.0,
+        "bi5_price_divisor": 10.0,
     },
 }
 
@@ -55,22 +122,17 @@ def transfer_funds(
     balance: float,
     remaining_funds: float,
     amount: float,
-    tick_time: dt.datetime,
-    reason: str,
-    log_mode: bool,
+    tick_time: TickTime,
+    mode: int,
+    journal: Optional[EventJournal],
 ) -> Tuple[float, float]:
     if amount <= 0.0:
         return balance, remaining_funds
     amount = min(amount, balance)
     balance -= amount
     remaining_funds += amount
-    if log_mode:
-        print(
-            f"{tick_time.isoformat()} "
-            f"{reason} amount={amount:.2f} "
-            f"balance={balance:.2f} "
-            f"remaining_funds={remaining_funds:.2f}"
-        )
+    if journal is not None:
+        journal.record(J_TRANSFER, tick_time, flags=mode, a=amount, b=balance, c=remaining_funds)
     return balance, remaining_funds
 
 
@@ -78,8 +140,8 @@ def apply_fund_management(
     mode: int,
     balance: float,
     remaining_funds: float,
-    tick_time: dt.datetime,
-    log_mode: bool,
+    tick_time: TickTime,
+    journal: Optional[EventJournal],
 ) -> Tuple[float, float]:
     if mode == 2:
         while balance > 100000.0:
@@ -88,8 +150,8 @@ def apply_fund_management(
                 remaining_funds,
                 50000.0,
                 tick_time,
-                "FUND_TRANSFER_MODE2",
-                log_mode,
+                mode,
+                journal,
             )
     elif mode == 3:
         while balance > 60000.0:
@@ -98,8 +160,8 @@ def apply_fund_management(
                 remaining_funds,
                 10000.0,
                 tick_time,
-                "FUND_TRANSFER_MODE3",
-                log_mode,
+                mode,
+                journal,
             )
     return balance, remaining_funds
 
@@ -132,15 +194,7 @@ class NM1Params:
     restart_delay_seconds: int = 1
     nanpin_sleep_seconds: int = 10
     price_scale: float = 1.0
-
-
-@dataclass
-class Position:
-    side: str  # "buy" or "sell"
-    volume: float
-    price: float
-    comment: str
-    level: int
+    bi5_price_divisor: float = 0.0
 
 
 @dataclass
@@ -162,6 +216,114 @@ class BasketInfo:
     profit: float = 0.0
 
 
+@dataclass
+class SideTotals:
+    """Running aggregates of one side's open positions, summed in position order."""
+
+    count: int = 0
+    level_count: int = 0  # core positions
+    volume: float = 0.0
+    value: float = 0.0  # sum of volume * price
+    min_price: float = 0.0
+    max_price: float = 0.0
+
+    def add(self, volume: float, price: float, flex: bool) -> None:
+        if self.count == 0:
+            self.min_price = price
+            self.max_price = price
+        else:
+            self.min_price = min(self.min_price, price)
+            self.max_price = max(self.max_price, price)
+        self.count += 1
+        if not flex:
+            self.level_count += 1
+        self.volume += volume
+        self.value += volume * price
+
+    def reset(self) -> None:
+        self.count = 0
+        self.level_count = 0
+        self.volume = 0.0
+        self.value = 0.0
+        self.min_price = 0.0
+        self.max_price = 0.0
+
+    def fill(self, info: BasketInfo) -> BasketInfo:
+        info.count = self.count
+        info.level_count = self.level_count
+        info.volume = self.volume
+        info.avg_price = self.value / self.volume if self.volume > 0.0 else 0.0
+        info.min_price = self.min_price
+        info.max_price = self.max_price
+        info.profit = 0.0
+        return info
+
+
+POSITION_CAPACITY = K_MAX_LEVELS * 2 * 2  # core + flex per level, both sides
+
+
+class PositionBook:
+    """Open positions as preallocated parallel lists, in opening order.
+
+    side holds SIDE_BUY/SIDE_SELL and flex replaces the NM1_FLEX/NM1_CORE comment prefix;
+    comment() rebuilds the MT5 comment for logs only. Removal compacts in place.
+    """
+
+    __slots__ = ("count", "side", "flex", "level", "volume", "price", "totals", "info", "levels_dirty")
+
+    def __init__(self, capacity: int = POSITION_CAPACITY) -> None:
+        self.count = 0
+        self.side = [SIDE_BUY] * capacity
+        self.flex = [False] * capacity
+        self.level = [0] * capacity
+        self.volume = [0.0] * capacity
+        self.price = [0.0] * capacity
+        self.totals = (SideTotals(), SideTotals())
+        self.info = (BasketInfo(), BasketInfo())  # per-tick snapshot reused by collect_basket_info
+        self.levels_dirty = False  # level prices may miss a position opened since the last sync
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, side: int, volume: float, price: float, flex: bool, level: int) -> None:
+        i = self.count
+        if i >= len(self.side):
+            raise RuntimeError(f"position book full ({len(self.side)} positions)")
+        self.side[i] = side
+        self.flex[i] = flex
+        self.level[i] = level
+        self.volume[i] = volume
+        self.price[i] = price
+        self.count = i + 1
+        self.totals[side].add(volume, price, flex)
+        self.levels_dirty = True
+
+    def keep(self, src: int, dst: int) -> None:
+        if src != dst:
+            self.side[dst] = self.side[src]
+            self.flex[dst] = self.flex[src]
+            self.level[dst] = self.level[src]
+            self.volume[dst] = self.volume[src]
+            self.price[dst] = self.price[src]
+
+    def truncate(self, count: int) -> None:
+        """Finish a keep() pass; totals are rebuilt so their sums keep the opening order."""
+        if count == self.count:
+            return
+        self.count = count
+        for totals in self.totals:
+            totals.reset()
+        for i in range(count):
+            self.totals[self.side[i]].add(self.volume[i], self.price[i], self.flex[i])
+        self.levels_dirty = True
+
+    def clear(self) -> None:
+        self.truncate(0)
+
+    def comment(self, i: int) -> str:
+        return make_level_comment(K_FLEX_COMMENT if self.flex[i] else K_CORE_COMMENT, self.level[i])
+
+
 @dataclass
 class Bar:
     start: dt.datetime
@@ -175,7 +337,7 @@ class Bar:
 class SymbolState:
     params: NM1Params
     symbol: str
-    start_time: Optional[dt.datetime] = None
+    start_time: Optional[TickTime] = None
     initial_started: bool = False
     lot_seq: List[float] = field(default_factory=list)
     flex_buy_refs: List[FlexRef] = field(default_factory=list)
@@ -184,10 +346,10 @@ class SymbolState:
     sell_level_price: List[float] = field(default_factory=list)
     buy_grid_step: float = 0.0
     sell_grid_step: float = 0.0
-    last_buy_close_time: Optional[dt.datetime] = None
-    last_sell_close_time: Optional[dt.datetime] = None
-    last_buy_nanpin_time: Optional[dt.datetime] = None
-    last_sell_nanpin_time: Optional[dt.datetime] = None
+    last_buy_close_time: Optional[TickTime] = None
+    last_sell_close_time: Optional[TickTime] = None
+    last_buy_nanpin_time: Optional[TickTime] = None
+    last_sell_nanpin_time: Optional[TickTime] = None
     prev_buy_count: int = 0
     prev_sell_count: int = 0
     safety_active: bool = False
@@ -203,6 +365,8 @@ class SymbolState:
     sell_skip_distance: float = 0.0
     buy_skip_price: float = 0.0
     sell_skip_price: float = 0.0
+    point_small: float = 0.0  # infer_point below / from 10.0, fixed per symbol
+    point_large: float = 0.0
 
 
 @dataclass
@@ -213,33 +377,6 @@ class Stats:
     total_open_lots: float = 0.0
 
 
-@dataclass
-class AtrState:
-    bars: List[Bar] = field(default_factory=list)  # closed bars
-    tr_values: List[float] = field(default_factory=list)  # closed bars TR
-    atr_values: List[float] = field(default_factory=list)  # closed bars ATR
-    current_bar: Optional[Bar] = None
-
-
-@dataclass
-class AdxState:
-    bars: List[Bar] = field(default_factory=list)  # closed bars
-    tr_values: List[float] = field(default_factory=list)
-    plus_dm_values: List[float] = field(default_factory=list)
-    minus_dm_values: List[float] = field(default_factory=list)
-    dx_values: List[float] = field(default_factory=list)
-    current_bar: Optional[Bar] = None
-    smoothed_tr: float = 0.0
-    smoothed_plus_dm: float = 0.0
-    smoothed_minus_dm: float = 0.0
-    adx: float = 0.0
-    plus_di: float = 0.0
-    minus_di: float = 0.0
-    prev_adx: float = 0.0
-    prev_plus_di: float = 0.0
-    prev_minus_di: float = 0.0
-
-
 def normalize_lot(lot: float) -> float:
     step = 0.01
     minlot = 0.01
@@ -253,7 +390,7 @@ def normalize_ratio(value: float, fallback: float) -> float:
     return value if value > 0.0 else fallback
 
 
-def normalize_core_flex_lot(params: NM1Params, lot: float) -> Tuple[float, float]:
+def core_flex_ratios(params: NM1Params) -> Tuple[float, float]:
     core_ratio = normalize_ratio(params.core_ratio, 0.7)
     flex_ratio = normalize_ratio(params.flex_ratio, 0.3)
     ratio_sum = core_ratio + flex_ratio
@@ -261,8 +398,11 @@ def normalize_core_flex_lot(params: NM1Params, lot: float) -> Tuple[float, float
         core_ratio = 0.7
         flex_ratio = 0.3
         ratio_sum = 1.0
-    core_ratio /= ratio_sum
-    flex_ratio /= ratio_sum
+    return core_ratio / ratio_sum, flex_ratio / ratio_sum
+
+
+def normalize_core_flex_lot(params: NM1Params, lot: float) -> Tuple[float, float]:
+    _core_ratio, flex_ratio = core_flex_ratios(params)
     raw_flex = lot * flex_ratio
     flex = normalize_lot(raw_flex)
     core = normalize_lot(lot - flex)
@@ -305,10 +445,6 @@ def build_lot_sequence(params: NM1Params) -> List[float]:
     return seq
 
 
-def is_flex_comment(comment: str) -> bool:
-    return comment.startswith(K_FLEX_COMMENT)
-
-
 def make_level_comment(base: str, level: int) -> str:
     if level <= 0:
         return base
@@ -337,71 +473,83 @@ def infer_point(price: float, symbol: str = "", price_scale: float = 1.0) -> flo
     return base * scale
 
 
+def basket_profit(book: PositionBook, side: int, bid: float, ask: float, contract_size: float) -> float:
+    profit = 0.0
+    for i in range(book.count):
+        if book.side[i] != side:
+            continue
+        if side == SIDE_BUY:
+            profit += (bid - book.price[i]) * book.volume[i] * contract_size
+        else:
+            profit += (book.price[i] - ask) * book.volume[i] * contract_size
+    return profit
+
+
+def book_exposure(book: PositionBook, bid: float, ask: float, contract_size: float) -> Tuple[float, float]:
+    """(unrealized profit, used margin) of every open position, summed in position order."""
+    unrealized = 0.0
+    used_margin = 0.0
+    for i in range(book.count):
+        volume = book.volume[i]
+        if book.side[i] == SIDE_BUY:
+            unrealized += (bid - book.price[i]) * volume * contract_size
+            used_margin += volume * contract_size * bid / LEVERAGE
+        else:
+            unrealized += (book.price[i] - ask) * volume * contract_size
+            used_margin += volume * contract_size * ask / LEVERAGE
+    return unrealized, used_margin
+
+
 def collect_basket_info(
-    positions: List[Position],
+    state: SymbolState,
+    book: PositionBook,
     bid: float,
     ask: float,
     contract_size: float,
 ) -> Tuple[BasketInfo, BasketInfo]:
-    buy = BasketInfo()
-    sell = BasketInfo()
-    buy_value = 0.0
-    sell_value = 0.0
-    for pos in positions:
-        if pos.side == "buy":
-            price = pos.price
-            if buy.count == 0:
-                buy.min_price = price
-                buy.max_price = price
-            else:
-                buy.min_price = min(buy.min_price, price)
-                buy.max_price = max(buy.max_price, price)
-            buy.count += 1
-            if not is_flex_comment(pos.comment):
-                buy.level_count += 1
-            buy.volume += pos.volume
-            buy_value += pos.volume * price
-            buy.profit += (bid - price) * pos.volume * contract_size
-        else:
-            price = pos.price
-            if sell.count == 0:
-                sell.min_price = price
-                sell.max_price = price
-            else:
-                sell.min_price = min(sell.min_price, price)
-                sell.max_price = max(sell.max_price, price)
-            sell.count += 1
-            if not is_flex_comment(pos.comment):
-                sell.level_count += 1
-            sell.volume += pos.volume
-            sell_value += pos.volume * price
-            sell.profit += (price - ask) * pos.volume * contract_size
-    if buy.volume > 0.0:
-        buy.avg_price = buy_value / buy.volume
-    if sell.volume > 0.0:
-        sell.avg_price = sell_value / sell.volume
+    """Basket state from the running totals; profit is only summed where process_tick reads it."""
+    buy = book.totals[SIDE_BUY].fill(book.info[SIDE_BUY])
+    sell = book.totals[SIDE_SELL].fill(book.info[SIDE_SELL])
+    # Partial TP compares basket profit once a flex position of the side has closed.
+    if state.has_partial_buy or buy.count > buy.level_count:
+        buy.profit = basket_profit(book, SIDE_BUY, bid, ask, contract_size)
+    if state.has_partial_sell or sell.count > sell.level_count:
+        sell.profit = basket_profit(book, SIDE_SELL, bid, ask, contract_size)
     return buy, sell
 
 
-def sync_level_prices_from_positions(state: SymbolState, positions: List[Position]) -> None:
-    for pos in positions:
-        if is_flex_comment(pos.comment):
-            continue
-        level = pos.level
-        if level <= 0 or level > K_MAX_LEVELS:
-            continue
-        if pos.side == "buy":
-            if state.buy_level_price[level - 1] <= 0.0:
-                state.buy_level_price[level - 1] = pos.price
-        else:
-            if state.sell_level_price[level - 1] <= 0.0:
-                state.sell_level_price[level - 1] = pos.price
+def sync_level_prices_from_positions(state: SymbolState, book: PositionBook) -> None:
+    # Level prices are only cleared with an empty side, so a rescan is needed only after fills/closes.
+    if book.levels_dirty:
+        for i in range(book.count):
+            if book.flex[i]:
+                continue
+            level = book.level[i]
+            if level <= 0 or level > K_MAX_LEVELS:
+                continue
+            if book.side[i] == SIDE_BUY:
+                if state.buy_level_price[level - 1] <= 0.0:
+                    state.buy_level_price[level - 1] = book.price[i]
+            else:
+                if state.sell_level_price[level - 1] <= 0.0:
+                    state.sell_level_price[level - 1] = book.price[i]
+        book.levels_dirty = False
     if state.buy_grid_step <= 0.0 and state.buy_level_price[0] > 0.0 and state.buy_level_price[1] > 0.0:
         state.buy_grid_step = abs(state.buy_level_price[0] - state.buy_level_price[1])
     if state.sell_grid_step <= 0.0 and state.sell_level_price[0] > 0.0 and state.sell_level_price[1] > 0.0:
         state.sell_grid_step = abs(state.sell_level_price[0] - state.sell_level_price[1])
 
 
+def reset_side_levels(refs: List[FlexRef], level_prices: List[float]) -> None:
+    for ref in refs:
+        ref.active = False
+        ref.price = 0.0
+        ref.lot = 0.0
+        ref.level = 0
+    for i in range(len(level_prices)):
+        level_prices[i] = 0.0
+
+
 def add_flex_ref(refs: List[FlexRef], price: float, lot: float, level: int) -> bool:
     for ref in refs:
         if ref.active and abs(ref.price - price) <= 1e-9 and abs(ref.lot - lot) <= 1e-9 and ref.level == level:
@@ -416,158 +564,294 @@ def add_flex_ref(refs: List[FlexRef], price: float, lot: float, level: int) -> b
     return False
 
 
-def update_atr_state(atr_state: AtrState, tick_time: dt.datetime, bid: float) -> Tuple[float, float, float]:
-    bar_start = tick_time.replace(second=0, microsecond=0)
-    if atr_state.current_bar is None:
-        atr_state.current_bar = Bar(start=bar_start, open=bid, high=bid, low=bid, close=bid)
-    elif atr_state.current_bar.start != bar_start:
-        prev_close = atr_state.bars[-1].close if atr_state.bars else atr_state.current_bar.close
+class BarIndicator(abc.ABC):
+    """M1 bar consumer registered on a BarAggregator, producing `width` values per tick."""
+
+    width = 0
+
+    @abc.abstractmethod
+    def close_bar(self, bar: Bar) -> None:
+        ...
+
+    @abc.abstractmethod
+    def tick_values(self, bar: Bar) -> Tuple[float, ...]:
+        ...
+
+    @abc.abstractmethod
+    def segment_values(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, out: np.ndarray) -> None:
+        """tick_values for consecutive ticks of one bar, given the bar's running high/low/close per tick."""
+
+
+@dataclass
+class AtrState(BarIndicator):
+    width = 3  # atr_current, atr_base, atr_slope
+
+    last_close: Optional[float] = None  # close of the last closed bar
+    tr_values: Deque[float] = field(default_factory=lambda: collections.deque(maxlen=ATR_PERIOD))  # closed bars TR
+    tr_count: int = 0
+    atr_values: Deque[float] = field(
+        default_factory=lambda: collections.deque(maxlen=ATR_BASE_BARS + ATR_BASE_LAG)
+    )  # closed bars ATR
+    atr_count: int = 0
+    # Per-bar sums reused by every tick of the bar (same summation order as the full lists).
+    tr_tail_sum: float = 0.0  # last ATR_PERIOD - 1 closed TR
+    base_with_current: float = 0.0  # ATR base when the current ATR is appended
+    base_without_current: float = 0.0
+
+    def close_bar(self, bar: Bar) -> None:
+        prev_close = self.last_close if self.last_close is not None else bar.close
         tr = max(
-            atr_state.current_bar.high - atr_state.current_bar.low,
-            abs(atr_state.current_bar.high - prev_close),
-            abs(atr_state.current_bar.low - prev_close),
+            bar.high - bar.low,
+            abs(bar.high - prev_close),
+            abs(bar.low - prev_close),
         )
-        atr_state.bars.append(atr_state.current_bar)
-        atr_state.tr_values.append(tr)
-        if len(atr_state.tr_values) >= ATR_PERIOD:
-            atr = sum(atr_state.tr_values[-ATR_PERIOD:]) / ATR_PERIOD
+        self.tr_values.append(tr)
+        self.tr_count += 1
+        if self.tr_count >= ATR_PERIOD:
+            atr = sum(self.tr_values) / ATR_PERIOD
         else:
             atr = 0.0
-        atr_state.atr_values.append(atr)
-        atr_state.current_bar = Bar(start=bar_start, open=bid, high=bid, low=bid, close=bid)
-    else:
-        atr_state.current_bar.high = max(atr_state.current_bar.high, bid)
-        atr_state.current_bar.low = min(atr_state.current_bar.low, bid)
-        atr_state.current_bar.close = bid
-
-    if atr_state.current_bar is None:
-        return 0.0, 0.0, 0.0
-
-    prev_close = atr_state.bars[-1].close if atr_state.bars else atr_state.current_bar.close
-    current_tr = max(
-        atr_state.current_bar.high - atr_state.current_bar.low,
-        abs(atr_state.current_bar.high - prev_close),
-        abs(atr_state.current_bar.low - prev_close),
-    )
-    atr_current = 0.0
-    if len(atr_state.tr_values) + 1 >= ATR_PERIOD:
-        recent_tr = atr_state.tr_values[-(ATR_PERIOD - 1):] + [current_tr]
-        atr_current = sum(recent_tr) / ATR_PERIOD
-
-    atr_base = 0.0
-    if atr_current > 0.0:
-        temp = atr_state.atr_values + [atr_current]
-    else:
-        temp = atr_state.atr_values
-    if len(temp) >= 55:
-        window = temp[-55:-5]
-        atr_base = sum(window) / 50.0
-
-    atr_slope = 0.0
-    if len(temp) >= 3:
-        atr_slope = temp[-1] - temp[-3]
-
-    return atr_current, atr_base, atr_slope
+        self.atr_values.append(atr)
+        self.atr_count += 1
+
+        self.tr_tail_sum = sum(list(self.tr_values)[-(ATR_PERIOD - 1):])
+        history = list(self.atr_values)
+        window = ATR_BASE_BARS + ATR_BASE_LAG
+        self.base_with_current = 0.0
+        if self.atr_count + 1 >= window:
+            self.base_with_current = sum(history[-(window - 1):-(ATR_BASE_LAG - 1)]) / float(ATR_BASE_BARS)
+        self.base_without_current = 0.0
+        if self.atr_count >= window:
+            self.base_without_current = sum(history[-window:-ATR_BASE_LAG]) / float(ATR_BASE_BARS)
+        self.last_close = bar.close
+
+    def tick_values(self, bar: Bar) -> Tuple[float, float, float]:
+        prev_close = self.last_close if self.last_close is not None else bar.close
+        current_tr = max(
+            bar.high - bar.low,
+            abs(bar.high - prev_close),
+            abs(bar.low - prev_close),
+        )
+        atr_current = 0.0
+        if self.tr_count + 1 >= ATR_PERIOD:
+            atr_current = (self.tr_tail_sum + current_tr) / ATR_PERIOD
+
+        # Base/slope over closed ATR values, plus the current ATR as the newest value when positive.
+        atr_values = self.atr_values
+        count = self.atr_count
+        atr_base = 0.0
+        atr_slope = 0.0
+        if atr_current > 0.0:
+            atr_base = self.base_with_current
+            if count + 1 >= 3:
+                atr_slope = atr_current - atr_values[-2]
+        else:
+            atr_base = self.base_without_current
+            if count >= 3:
+                atr_slope = atr_values[-1] - atr_values[-3]
+        return atr_current, atr_base, atr_slope
+
+    def segment_values(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, out: np.ndarray) -> None:
+        prev_close = self.last_close if self.last_close is not None else close
+        current_tr = np.maximum(np.maximum(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        if self.tr_count + 1 >= ATR_PERIOD:
+            atr_current = (self.tr_tail_sum + current_tr) / ATR_PERIOD
+        else:
+            atr_current = np.zeros(len(close), dtype=np.float64)
+        atr_values = self.atr_values
+        count = self.atr_count
+        with_current = atr_current > 0.0
+        slope_with = atr_current - atr_values[-2] if count >= 2 else 0.0
+        slope_without = atr_values[-1] - atr_values[-3] if count >= 3 else 0.0
+        out[:, 0] = atr_current
+        out[:, 1] = np.where(with_current, self.base_with_current, self.base_without_current)
+        out[:, 2] = np.where(with_current, slope_with, slope_without)
 
 
-def update_adx_state(
-    adx_state: AdxState,
-    tick_time: dt.datetime,
-    bid: float,
-) -> Tuple[float, float, float, float, float, float]:
-    bar_start = tick_time.replace(second=0, microsecond=0)
-    if adx_state.current_bar is None:
-        adx_state.current_bar = Bar(start=bar_start, open=bid, high=bid, low=bid, close=bid)
-        return (
-            adx_state.adx,
-            adx_state.prev_adx,
-            adx_state.plus_di,
-            adx_state.prev_plus_di,
-            adx_state.minus_di,
-            adx_state.prev_minus_di,
-        )
+@dataclass
+class AdxState(BarIndicator):
+    width = 6  # adx, adx_prev, plus_di, plus_di_prev, minus_di, minus_di_prev
+
+    prev_bar: Optional[Bar] = None  # last closed bar
+    tr_values: Deque[float] = field(default_factory=lambda: collections.deque(maxlen=ADX_PERIOD))
+    plus_dm_values: Deque[float] = field(default_factory=lambda: collections.deque(maxlen=ADX_PERIOD))
+    minus_dm_values: Deque[float] = field(default_factory=lambda: collections.deque(maxlen=ADX_PERIOD))
+    dm_count: int = 0
+    dx_values: List[float] = field(default_factory=list)  # first ADX_PERIOD DX only
+    smoothed_tr: float = 0.0
+    smoothed_plus_dm: float = 0.0
+    smoothed_minus_dm: float = 0.0
+    adx: float = 0.0
+    plus_di: float = 0.0
+    minus_di: float = 0.0
+    prev_adx: float = 0.0
+    prev_plus_di: float = 0.0
+    prev_minus_di: float = 0.0
 
-    if adx_state.current_bar.start != bar_start:
-        prev_bar = adx_state.bars[-1] if adx_state.bars else None
+    def close_bar(self, bar: Bar) -> None:
+        prev_bar = self.prev_bar
         if prev_bar is not None:
-            adx_state.prev_adx = adx_state.adx
-            adx_state.prev_plus_di = adx_state.plus_di
-            adx_state.prev_minus_di = adx_state.minus_di
-            current_bar = adx_state.current_bar
+            self.prev_adx = self.adx
+            self.prev_plus_di = self.plus_di
+            self.prev_minus_di = self.minus_di
             tr = max(
-                current_bar.high - current_bar.low,
-                abs(current_bar.high - prev_bar.close),
-                abs(current_bar.low - prev_bar.close),
+                bar.high - bar.low,
+                abs(bar.high - prev_bar.close),
+                abs(bar.low - prev_bar.close),
             )
-            up_move = current_bar.high - prev_bar.high
-            down_move = prev_bar.low - current_bar.low
+            up_move = bar.high - prev_bar.high
+            down_move = prev_bar.low - bar.low
             plus_dm = up_move if up_move > down_move and up_move > 0.0 else 0.0
             minus_dm = down_move if down_move > up_move and down_move > 0.0 else 0.0
-            adx_state.tr_values.append(tr)
-            adx_state.plus_dm_values.append(plus_dm)
-            adx_state.minus_dm_values.append(minus_dm)
-
-            if len(adx_state.tr_values) == ADX_PERIOD:
-                adx_state.smoothed_tr = sum(adx_state.tr_values[-ADX_PERIOD:])
-                adx_state.smoothed_plus_dm = sum(adx_state.plus_dm_values[-ADX_PERIOD:])
-                adx_state.smoothed_minus_dm = sum(adx_state.minus_dm_values[-ADX_PERIOD:])
-            elif len(adx_state.tr_values) > ADX_PERIOD:
-                adx_state.smoothed_tr = (
-                    adx_state.smoothed_tr - (adx_state.smoothed_tr / ADX_PERIOD) + tr
-                )
-                adx_state.smoothed_plus_dm = (
-                    adx_state.smoothed_plus_dm - (adx_state.smoothed_plus_dm / ADX_PERIOD) + plus_dm
-                )
-                adx_state.smoothed_minus_dm = (
-                    adx_state.smoothed_minus_dm - (adx_state.smoothed_minus_dm / ADX_PERIOD) + minus_dm
-                )
-
-            if adx_state.smoothed_tr > 0.0:
-                adx_state.plus_di = 100.0 * adx_state.smoothed_plus_dm / adx_state.smoothed_tr
-                adx_state.minus_di = 100.0 * adx_state.smoothed_minus_dm / adx_state.smoothed_tr
-                denom = adx_state.plus_di + adx_state.minus_di
+            self.tr_values.append(tr)
+            self.plus_dm_values.append(plus_dm)
+            self.minus_dm_values.append(minus_dm)
+            self.dm_count += 1
+
+            if self.dm_count == ADX_PERIOD:
+                self.smoothed_tr = sum(self.tr_values)
+                self.smoothed_plus_dm = sum(self.plus_dm_values)
+                self.smoothed_minus_dm = sum(self.minus_dm_values)
+            elif self.dm_count > ADX_PERIOD:
+                self.smoothed_tr = self.smoothed_tr - (self.smoothed_tr / ADX_PERIOD) + tr
+                self.smoothed_plus_dm = self.smoothed_plus_dm - (self.smoothed_plus_dm / ADX_PERIOD) + plus_dm
+                self.smoothed_minus_dm = self.smoothed_minus_dm - (self.smoothed_minus_dm / ADX_PERIOD) + minus_dm
+
+            if self.smoothed_tr > 0.0:
+                self.plus_di = 100.0 * self.smoothed_plus_dm / self.smoothed_tr
+                self.minus_di = 100.0 * self.smoothed_minus_dm / self.smoothed_tr
+                denom = self.plus_di + self.minus_di
                 dx = 0.0
                 if denom > 0.0:
-                    dx = 100.0 * abs(adx_state.plus_di - adx_state.minus_di) / denom
-                if len(adx_state.dx_values) < ADX_PERIOD:
-                    adx_state.dx_values.append(dx)
-                    if len(adx_state.dx_values) == ADX_PERIOD:
-                        adx_state.adx = sum(adx_state.dx_values) / ADX_PERIOD
+                    dx = 100.0 * abs(self.plus_di - self.minus_di) / denom
+                if len(self.dx_values) < ADX_PERIOD:
+                    self.dx_values.append(dx)
+                    if len(self.dx_values) == ADX_PERIOD:
+                        self.adx = sum(self.dx_values) / ADX_PERIOD
                 else:
-                    adx_state.adx = ((adx_state.adx * (ADX_PERIOD - 1)) + dx) / ADX_PERIOD
+                    self.adx = ((self.adx * (ADX_PERIOD - 1)) + dx) / ADX_PERIOD
+        self.prev_bar = bar
 
-        adx_state.bars.append(adx_state.current_bar)
-        adx_state.current_bar = Bar(start=bar_start, open=bid, high=bid, low=bid, close=bid)
-    else:
-        adx_state.current_bar.high = max(adx_state.current_bar.high, bid)
-        adx_state.current_bar.low = min(adx_state.current_bar.low, bid)
-        adx_state.current_bar.close = bid
-
-    if adx_state.prev_adx == 0.0 and adx_state.adx > 0.0:
-        adx_state.prev_adx = adx_state.adx
-        adx_state.prev_plus_di = adx_state.plus_di
-        adx_state.prev_minus_di = adx_state.minus_di
-
-    return (
-        adx_state.adx,
-        adx_state.prev_adx,
-        adx_state.plus_di,
-        adx_state.prev_plus_di,
-        adx_state.minus_di,
-        adx_state.prev_minus_di,
-    )
+        # ADX only moves on bar close, so seeding the previous values here is the same as per tick.
+        if self.prev_adx == 0.0 and self.adx > 0.0:
+            self.prev_adx = self.adx
+            self.prev_plus_di = self.plus_di
+            self.prev_minus_di = self.minus_di
+
+    def tick_values(self, bar: Bar) -> Tuple[float, float, float, float, float, float]:
+        return (
+            self.adx,
+            self.prev_adx,
+            self.plus_di,
+            self.prev_plus_di,
+            self.minus_di,
+            self.prev_minus_di,
+        )
+
+    def segment_values(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, out: np.ndarray) -> None:
+        out[:] = self.tick_values(None)
+
+
+@dataclass
+class BarAggregator:
+    """Builds M1 bars from the bid stream once and feeds them to every registered indicator.
+
+    Per-tick output is the concatenation of each indicator's values in registration order.
+    """
+
+    indicators: List[BarIndicator]
+    current_bar: Optional[Bar] = None
+
+    @property
+    def width(self) -> int:
+        return sum(indicator.width for indicator in self.indicators)
+
+    def update(self, tick_time: dt.datetime, bid: float) -> List[float]:
+        bar_start = tick_time.replace(second=0, microsecond=0)
+        bar = self.current_bar
+        if bar is None or bar.start != bar_start:
+            if bar is not None:
+                for indicator in self.indicators:
+                    indicator.close_bar(bar)
+            bar = Bar(start=bar_start, open=bid, high=bid, low=bid, close=bid)
+            self.current_bar = bar
+        else:
+            bar.high = max(bar.high, bid)
+            bar.low = min(bar.low, bid)
+            bar.close = bid
+        values: List[float] = []
+        for indicator in self.indicators:
+            values.extend(indicator.tick_values(bar))
+        return values
+
+    def update_block(self, arrays: TickArrays) -> np.ndarray:
+        """update() for every tick of a block as an (n, width) array, leaving the same state.
+
+        Closed-bar work runs once per M1 bar; the intrabar inputs are vectorized per bar.
+        """
+        n = len(arrays)
+        out = np.zeros((n, self.width), dtype=np.float64)
+        if n == 0:
+            return out
+        bid = arrays.bid
+        minute = arrays.time_ms // MS_PER_MINUTE
+        starts = np.concatenate(([0], np.flatnonzero(minute[1:] != minute[:-1]) + 1))
+        ends = np.append(starts[1:], n)
+        for begin, end in zip(starts.tolist(), ends.tolist()):
+            seg = bid[begin:end]
+            bar_start = ms_to_datetime(int(minute[begin]) * MS_PER_MINUTE)
+            high = np.maximum.accumulate(seg)
+            low = np.minimum.accumulate(seg)
+            bar = self.current_bar
+            if bar is not None and bar.start == bar_start:
+                high = np.maximum(high, bar.high)
+                low = np.minimum(low, bar.low)
+                bar.high = float(high[-1])
+                bar.low = float(low[-1])
+                bar.close = float(seg[-1])
+            else:
+                if bar is not None:
+                    for indicator in self.indicators:
+                        indicator.close_bar(bar)
+                self.current_bar = Bar(
+                    start=bar_start,
+                    open=float(seg[0]),
+                    high=float(high[-1]),
+                    low=float(low[-1]),
+                    close=float(seg[-1]),
+                )
+            column = 0
+            for indicator in self.indicators:
+                indicator.segment_values(high, low, seg, out[begin:end, column : column + indicator.width])
+                column += indicator.width
+        return out
+
+
+def make_indicator_aggregator() -> BarAggregator:
+    # Column order matches the indicator arguments of process_tick.
+    return BarAggregator([AtrState(), AdxState()])
 
 
-def can_restart(last_close: Optional[dt.datetime], now: dt.datetime, delay: int) -> bool:
+def elapsed_seconds(now: TickTime, then: TickTime) -> float:
+    delta = now - then
+    # ms / 1000 rounds like timedelta.total_seconds() (us / 10**6) for millisecond times.
+    return delta / 1000.0 if isinstance(delta, int) else delta.total_seconds()
+
+
+def as_datetime(value: TickTime) -> dt.datetime:
+    return ms_to_datetime(value) if isinstance(value, int) else value
+
+
+def can_restart(last_close: Optional[TickTime], now: TickTime, delay: int) -> bool:
     if last_close is None:
         return True
-    return (now - last_close).total_seconds() >= delay
+    return elapsed_seconds(now, last_close) >= delay
 
 
-def can_nanpin(last_time: Optional[dt.datetime], now: dt.datetime, delay: int) -> bool:
+def can_nanpin(last_time: Optional[TickTime], now: TickTime, delay: int) -> bool:
     if last_time is None:
         return True
-    return (now - last_time).total_seconds() >= delay
+    return elapsed_seconds(now, last_time) >= delay
 
 
 def adx_blocks_side(
@@ -576,11 +860,11 @@ def adx_blocks_side(
     minus_di: float,
     adx_threshold: float,
     di_gap_min: float,
-    side: str,
+    side: int,
 ) -> bool:
     if adx < adx_threshold:
         return False
-    if side == "buy":
+    if side == SIDE_BUY:
         return minus_di > plus_di + di_gap_min
     return plus_di > minus_di + di_gap_min
 
@@ -594,11 +878,11 @@ def adx_nanpin_stop(
     minus_di_prev: float,
     adx_threshold: float,
     di_gap_min: float,
-    side: str,
+    side: int,
 ) -> bool:
     if adx_now < adx_threshold:
         return False
-    if side == "buy":
+    if side == SIDE_BUY:
         gap = minus_di_now - plus_di_now
         gap_prev = minus_di_prev - plus_di_prev
     else:
@@ -653,134 +937,129 @@ def adjust_nanpin_step(
 
 
 def open_position(
-    positions: List[Position],
+    book: PositionBook,
     stats: Stats,
-    side: str,
+    side: int,
     volume: float,
     price: float,
-    comment: str,
+    flex: bool,
     level: int,
     state: SymbolState,
 ) -> None:
     volume = normalize_lot(volume)
     if volume <= 0.0:
         return
-    positions.append(Position(side=side, volume=volume, price=price, comment=comment, level=level))
+    book.add(side, volume, price, flex, level)
     stats.opened_trades += 1
     stats.total_open_lots += volume
-    if side == "buy" and not is_flex_comment(comment):
+    if side == SIDE_BUY and not flex:
         if state.buy_level_price[level - 1] <= 0.0:
             state.buy_level_price[level - 1] = price
-    if side == "sell" and not is_flex_comment(comment):
+    if side == SIDE_SELL and not flex:
         if state.sell_level_price[level - 1] <= 0.0:
             state.sell_level_price[level - 1] = price
 
 
 def close_positions(
-    positions: List[Position],
+    book: PositionBook,
     stats: Stats,
-    side: str,
+    side: int,
     bid: float,
     ask: float,
-    tick_time: dt.datetime,
-    debug: bool,
-    start_time_by_side: Dict[str, Optional[dt.datetime]],
+    tick_time: TickTime,
+    journal: Optional[EventJournal],
+    start_time_by_side: List[Optional[TickTime]],
     level_max_duration: Dict[int, float],
     contract_size: float,
 ) -> None:
-    remaining = []
-    for pos in positions:
-        if pos.side != side:
-            remaining.append(pos)
+    kept = 0
+    for i in range(book.count):
+        if book.side[i] != side:
+            book.keep(i, kept)
+            kept += 1
             continue
-        if side == "buy":
-            profit = (bid - pos.price) * pos.volume * contract_size
+        volume = book.volume[i]
+        level = book.level[i]
+        if side == SIDE_BUY:
+            profit = (bid - book.price[i]) * volume * contract_size
         else:
-            profit = (pos.price - ask) * pos.volume * contract_size
-        if not is_flex_comment(pos.comment):
-            start_time = start_time_by_side.get(side)
+            profit = (book.price[i] - ask) * volume * contract_size
+        if not book.flex[i]:
+            start_time = start_time_by_side[side]
             if start_time is not None:
-                duration = (tick_time - start_time).total_seconds()
-                level_max_duration[pos.level] = max(level_max_duration.get(pos.level, 0.0), duration)
-        if debug:
-            print(
-                f"{tick_time.isoformat()} "
-                f"{side.upper()} "
-                f"lot={pos.volume:.2f} "
-                f"profit={profit:.2f} "
-                f"comment={pos.comment} "
-                f"level={pos.level}"
-            )
+                duration = elapsed_seconds(tick_time, start_time)
+                level_max_duration[level] = max(level_max_duration.get(level, 0.0), duration)
+        if journal is not None:
+            journal.record(J_CLOSE, tick_time, side, book.flex[i], level, volume, profit)
         stats.closed_profit += profit
         stats.closed_trades += 1
-    positions[:] = remaining
+    book.truncate(kept)
 
 
 def process_flex_partial(
     state: SymbolState,
-    positions: List[Position],
+    book: PositionBook,
     stats: Stats,
     bid: float,
     ask: float,
     atr_now: float,
-    tick_time: dt.datetime,
-    debug: bool,
+    tick_time: TickTime,
+    journal: Optional[EventJournal],
     contract_size: float,
 ) -> None:
     params = state.params
     if atr_now <= 0.0 or params.flex_atr_profit_multiplier <= 0.0:
         return
     target = atr_now * params.flex_atr_profit_multiplier
-    remaining = []
-    for pos in positions:
-        if not is_flex_comment(pos.comment):
-            remaining.append(pos)
+    kept = 0
+    for i in range(book.count):
+        if not book.flex[i]:
+            book.keep(i, kept)
+            kept += 1
             continue
-        if pos.side == "buy":
-            profit = (bid - pos.price)
+        side = book.side[i]
+        price = book.price[i]
+        if side == SIDE_BUY:
+            profit = (bid - price)
         else:
-            profit = (pos.price - ask)
+            profit = (price - ask)
         if profit < target:
-            remaining.append(pos)
+            book.keep(i, kept)
+            kept += 1
             continue
-        realized = profit * pos.volume * contract_size
-        if debug:
-            print(
-                f"{tick_time.isoformat()} "
-                f"{pos.side.upper()} "
-                f"lot={pos.volume:.2f} "
-                f"profit={realized:.2f} "
-                f"comment={pos.comment} "
-                f"level={pos.level}"
-            )
+        volume = book.volume[i]
+        level = book.level[i]
+        realized = profit * volume * contract_size
+        if journal is not None:
+            journal.record(J_CLOSE, tick_time, side, book.flex[i], level, volume, realized)
         stats.closed_profit += realized
         stats.closed_trades += 1
-        if pos.side == "buy":
+        if side == SIDE_BUY:
             state.realized_buy_profit += realized
             state.has_partial_buy = True
-            add_flex_ref(state.flex_buy_refs, pos.price, pos.volume, pos.level)
+            add_flex_ref(state.flex_buy_refs, price, volume, level)
         else:
             state.realized_sell_profit += realized
             state.has_partial_sell = True
-            add_flex_ref(state.flex_sell_refs, pos.price, pos.volume, pos.level)
-    positions[:] = remaining
+            add_flex_ref(state.flex_sell_refs, price, volume, level)
+    book.truncate(kept)
 
 
 def process_flex_refill(
     state: SymbolState,
-    positions: List[Position],
+    book: PositionBook,
     stats: Stats,
-    side: str,
+    side: int,
     trigger_price: float,
 ) -> None:
-    point = infer_point(trigger_price, state.symbol, state.params.price_scale)
+    point = state.point_large if trigger_price >= 10.0 else state.point_small
     tol = point * 0.5
-    refs = state.flex_buy_refs if side == "buy" else state.flex_sell_refs
+    refs = state.flex_buy_refs if side == SIDE_BUY else state.flex_sell_refs
     for ref in refs:
         if not ref.active:
             continue
         should_open = False
-        if side == "buy":
+        if side == SIDE_BUY:
             should_open = trigger_price <= ref.price + tol
             price = trigger_price
         else:
@@ -788,16 +1067,15 @@ def process_flex_refill(
             price = trigger_price
         if not should_open:
             continue
-        comment = make_level_comment(K_FLEX_COMMENT, ref.level)
-        open_position(positions, stats, side, ref.lot, price, comment, ref.level, state)
+        open_position(book, stats, side, ref.lot, price, True, ref.level, state)
         ref.active = False
 
 
 def process_tick(
     state: SymbolState,
-    positions: List[Position],
+    book: PositionBook,
     stats: Stats,
-    tick_time: dt.datetime,
+    tick_time: TickTime,
     bid: float,
     ask: float,
     atr_current: float,
@@ -809,20 +1087,20 @@ def process_tick(
     plus_di_prev: float,
     minus_di: float,
     minus_di_prev: float,
-    debug: bool,
-    start_time_by_side: Dict[str, Optional[dt.datetime]],
+    journal: Optional[EventJournal],
+    start_time_by_side: List[Optional[TickTime]],
     level_max_duration: Dict[int, float],
 ) -> None:
     params = state.params
     contract_size = params.contract_size
-    buy, sell = collect_basket_info(positions, bid, ask, contract_size)
+    buy, sell = collect_basket_info(state, book, bid, ask, contract_size)
     entry_block_buy = adx_blocks_side(
         adx,
         plus_di,
         minus_di,
         params.adx_max_for_entry,
         params.di_gap_min,
-        "buy",
+        SIDE_BUY,
     )
     entry_block_sell = adx_blocks_side(
         adx,
@@ -830,7 +1108,7 @@ def process_tick(
         minus_di,
         params.adx_max_for_entry,
         params.di_gap_min,
-        "sell",
+        SIDE_SELL,
     )
 
     if state.prev_buy_count > 0 and buy.count == 0:
@@ -842,10 +1120,9 @@ def process_tick(
         state.buy_skip_levels = 0
         state.buy_skip_distance = 0.0
         state.buy_skip_price = 0.0
-        state.flex_buy_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
-        state.buy_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
+        reset_side_levels(state.flex_buy_refs, state.buy_level_price)
         state.buy_grid_step = 0.0
-        start_time_by_side["buy"] = None
+        start_time_by_side[SIDE_BUY] = None
     if state.prev_sell_count > 0 and sell.count == 0:
         state.last_sell_close_time = tick_time
         state.last_sell_nanpin_time = None
@@ -855,82 +1132,66 @@ def process_tick(
         state.sell_skip_levels = 0
         state.sell_skip_distance = 0.0
         state.sell_skip_price = 0.0
-        state.flex_sell_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
-        state.sell_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
+        reset_side_levels(state.flex_sell_refs, state.sell_level_price)
         state.sell_grid_step = 0.0
-        start_time_by_side["sell"] = None
+        start_time_by_side[SIDE_SELL] = None
 
     if buy.count > 0 or sell.count > 0:
-        sync_level_prices_from_positions(state, positions)
+        sync_level_prices_from_positions(state, book)
 
     attempted_initial = False
     if not state.initial_started:
         if state.start_time is None:
             state.start_time = tick_time
-        if (tick_time - state.start_time).total_seconds() >= params.start_delay_seconds:
+        if elapsed_seconds(tick_time, state.start_time) >= params.start_delay_seconds:
             if buy.count == 0 and sell.count == 0:
-                if debug:
-                    print(
-                        f"{tick_time.isoformat()} "
-                        f"INIT_ENTRY_CHECK "
-                        f"adx={adx:.2f} "
-                        f"plus_di={plus_di:.2f} "
-                        f"minus_di={minus_di:.2f} "
-                        f"entry_block_buy={int(entry_block_buy)} "
-                        f"entry_block_sell={int(entry_block_sell)}"
+                if journal is not None:
+                    journal.record(
+                        J_ENTRY_CHECK,
+                        tick_time,
+                        flags=int(entry_block_buy) | int(entry_block_sell) << 1,
+                        a=adx,
+                        b=plus_di,
+                        c=minus_di,
                     )
                 opened_any = False
                 if not entry_block_buy:
                     open_position(
-                        positions,
+                        book,
                         stats,
-                        "buy",
+                        SIDE_BUY,
                         state.lot_seq[0],
                         ask,
-                        make_level_comment(K_CORE_COMMENT, 1),
+                        False,
                         1,
                         state,
                     )
-                    if debug:
-                        print(
-                            f"{tick_time.isoformat()} "
-                            f"OPEN BUY "
-                            f"lot={state.lot_seq[0]:.2f} "
-                            f"price={ask:.2f} "
-                            f"comment={make_level_comment(K_CORE_COMMENT, 1)} "
-                            f"level=1"
-                        )
-                    if start_time_by_side.get("buy") is None:
-                        start_time_by_side["buy"] = tick_time
+                    if journal is not None:
+                        journal.record(J_OPEN, tick_time, SIDE_BUY, False, 1, state.lot_seq[0], ask)
+                    if start_time_by_side[SIDE_BUY] is None:
+                        start_time_by_side[SIDE_BUY] = tick_time
                     opened_any = True
-                elif debug:
-                    print(f"{tick_time.isoformat()} OPEN BUY SKIP entry_block_buy=1")
+                elif journal is not None:
+                    journal.record(J_OPEN_SKIP, tick_time, SIDE_BUY)
                 if not entry_block_sell:
                     open_position(
-                        positions,
+                        book,
                         stats,
-                        "sell",
+                        SIDE_SELL,
                         state.lot_seq[0],
                         bid,
-                        make_level_comment(K_CORE_COMMENT, 1),
+                        False,
                         1,
                         state,
                     )
-                    if debug:
-                        print(
-                            f"{tick_time.isoformat()} "
-                            f"OPEN SELL "
-                            f"lot={state.lot_seq[0]:.2f} "
-                            f"price={bid:.2f} "
-                            f"comment={make_level_comment(K_CORE_COMMENT, 1)} "
-                            f"level=1"
-                        )
-                    if start_time_by_side.get("sell") is None:
-                        start_time_by_side["sell"] = tick_time
+                    if journal is not None:
+                        journal.record(J_OPEN, tick_time, SIDE_SELL, False, 1, state.lot_seq[0], bid)
+                    if start_time_by_side[SIDE_SELL] is None:
+                        start_time_by_side[SIDE_SELL] = tick_time
                     opened_any = True
-                elif debug:
-                    print(f"{tick_time.isoformat()} OPEN SELL SKIP entry_block_sell=1")
-                if positions:
+                elif journal is not None:
+                    journal.record(J_OPEN_SKIP, tick_time, SIDE_SELL)
+                if book.count:
                     state.initial_started = True
                 attempted_initial = opened_any
 
@@ -969,26 +1230,26 @@ def process_tick(
     if params.safe_stop_mode and safety_triggered:
         if buy.count > 0:
             close_positions(
-                positions,
+                book,
                 stats,
-                "buy",
+                SIDE_BUY,
                 bid,
                 ask,
                 tick_time,
-                debug,
+                journal,
                 start_time_by_side,
                 level_max_duration,
                 contract_size,
             )
         if sell.count > 0:
             close_positions(
-                positions,
+                book,
                 stats,
-                "sell",
+                SIDE_SELL,
                 bid,
                 ask,
                 tick_time,
-                debug,
+                journal,
                 start_time_by_side,
                 level_max_duration,
                 contract_size,
@@ -1009,7 +1270,7 @@ def process_tick(
             minus_di_prev,
             params.adx_max_for_nanpin,
             params.di_gap_min,
-            "buy",
+            SIDE_BUY,
         )
         sell_stop = adx_nanpin_stop(
             adx,
@@ -1020,14 +1281,14 @@ def process_tick(
             minus_di_prev,
             params.adx_max_for_nanpin,
             params.di_gap_min,
-            "sell",
+            SIDE_SELL,
         )
     allow_nanpin_buy = allow_nanpin and not buy_stop
     allow_nanpin_sell = allow_nanpin and not sell_stop
 
     if atr_now <= 0.0:
         atr_now = atr_current
-    process_flex_partial(state, positions, stats, bid, ask, atr_now, tick_time, debug, contract_size)
+    process_flex_partial(state, book, stats, bid, ask, atr_now, tick_time, journal, contract_size)
 
     if buy.count > 0:
         buy_profit_base = effective_profit_base(params, buy.level_count)
@@ -1035,13 +1296,13 @@ def process_tick(
             target_profit = buy.volume * buy_profit_base * 0.5 * contract_size
             if (buy.profit + state.realized_buy_profit) >= target_profit:
                 close_positions(
-                    positions,
+                    book,
                     stats,
-                    "buy",
+                    SIDE_BUY,
                     bid,
                     ask,
                     tick_time,
-                    debug,
+                    journal,
                     start_time_by_side,
                     level_max_duration,
                     contract_size,
@@ -1050,13 +1311,13 @@ def process_tick(
             target = buy.avg_price + buy_profit_base
             if bid >= target:
                 close_positions(
-                    positions,
+                    book,
                     stats,
-                    "buy",
+                    SIDE_BUY,
                     bid,
                     ask,
                     tick_time,
-                    debug,
+                    journal,
                     start_time_by_side,
                     level_max_duration,
                     contract_size,
@@ -1068,13 +1329,13 @@ def process_tick(
             target_profit = sell.volume * sell_profit_base * 0.5 * contract_size
             if (sell.profit + state.realized_sell_profit) >= target_profit:
                 close_positions(
-                    positions,
+                    book,
                     stats,
-                    "sell",
+                    SIDE_SELL,
                     bid,
                     ask,
                     tick_time,
-                    debug,
+                    journal,
                     start_time_by_side,
                     level_max_duration,
                     contract_size,
@@ -1083,13 +1344,13 @@ def process_tick(
             target = sell.avg_price - sell_profit_base
             if ask <= target:
                 close_positions(
-                    positions,
+                    book,
                     stats,
-                    "sell",
+                    SIDE_SELL,
                     bid,
                     ask,
                     tick_time,
-                    debug,
+                    journal,
                     start_time_by_side,
                     level_max_duration,
                     contract_size,
@@ -1102,32 +1363,32 @@ def process_tick(
             and not entry_block_buy
         ):
             open_position(
-                positions,
+                book,
                 stats,
-                "buy",
+                SIDE_BUY,
                 state.lot_seq[0],
                 ask,
-                make_level_comment(K_CORE_COMMENT, 1),
+                False,
                 1,
                 state,
             )
-            start_time_by_side["buy"] = tick_time
+            start_time_by_side[SIDE_BUY] = tick_time
         if (
             sell.count == 0
             and can_restart(state.last_sell_close_time, tick_time, params.restart_delay_seconds)
             and not entry_block_sell
         ):
             open_position(
-                positions,
+                book,
                 stats,
-                "sell",
+                SIDE_SELL,
                 state.lot_seq[0],
                 bid,
-                make_level_comment(K_CORE_COMMENT, 1),
+                False,
                 1,
                 state,
             )
-            start_time_by_side["sell"] = tick_time
+            start_time_by_side[SIDE_SELL] = tick_time
 
     levels = effective_max_levels(params)
     if buy.count > 0:
@@ -1166,7 +1427,7 @@ def process_tick(
             state.sell_skip_price = 0.0
             state.sell_skip_levels = 0
 
-    point = infer_point(bid, state.symbol, params.price_scale)
+    point = state.point_large if bid >= 10.0 else state.point_small
     tol = point * 0.5
 
     if buy.count > 0 and buy.level_count < levels:
@@ -1183,24 +1444,24 @@ def process_tick(
                     opened = False
                     if core_lot > 0.0:
                         open_position(
-                            positions,
+                            book,
                             stats,
-                            "buy",
+                            SIDE_BUY,
                             core_lot,
                             ask,
-                            make_level_comment(K_CORE_COMMENT, next_level),
+                            False,
                             next_level,
                             state,
                         )
                         opened = True
                     if flex_lot > 0.0:
                         open_position(
-                            positions,
+                            book,
                             stats,
-                            "buy",
+                            SIDE_BUY,
                             flex_lot,
                             ask,
-                            make_level_comment(K_FLEX_COMMENT, next_level),
+                            True,
                             next_level,
                             state,
                         )
@@ -1209,12 +1470,12 @@ def process_tick(
                         state.last_buy_nanpin_time = tick_time
                 else:
                     open_position(
-                        positions,
+                        book,
                         stats,
-                        "buy",
+                        SIDE_BUY,
                         lot,
                         ask,
-                        make_level_comment(K_CORE_COMMENT, next_level),
+                        False,
                         next_level,
                         state,
                     )
@@ -1234,24 +1495,24 @@ def process_tick(
                     opened = False
                     if core_lot > 0.0:
                         open_position(
-                            positions,
+                            book,
                             stats,
-                            "sell",
+                            SIDE_SELL,
                             core_lot,
                             bid,
-                            make_level_comment(K_CORE_COMMENT, next_level),
+                            False,
                             next_level,
                             state,
                         )
                         opened = True
                     if flex_lot > 0.0:
                         open_position(
-                            positions,
+                            book,
                             stats,
-                            "sell",
+                            SIDE_SELL,
                             flex_lot,
                             bid,
-                            make_level_comment(K_FLEX_COMMENT, next_level),
+                            True,
                             next_level,
                             state,
                         )
@@ -1260,148 +1521,763 @@ def process_tick(
                         state.last_sell_nanpin_time = tick_time
                 else:
                     open_position(
-                        positions,
+                        book,
                         stats,
-                        "sell",
+                        SIDE_SELL,
                         lot,
                         bid,
-                        make_level_comment(K_CORE_COMMENT, next_level),
+                        False,
                         next_level,
                         state,
                     )
                     state.last_sell_nanpin_time = tick_time
 
     if allow_nanpin_buy and buy.count > 0:
-        process_flex_refill(state, positions, stats, "buy", ask)
+        process_flex_refill(state, book, stats, SIDE_BUY, ask)
     if allow_nanpin_sell and sell.count > 0:
-        process_flex_refill(state, positions, stats, "sell", bid)
+        process_flex_refill(state, book, stats, SIDE_SELL, bid)
 
     state.prev_buy_count = buy.count
     state.prev_sell_count = sell.count
 
 
-def iter_ticks(
+
+QUIET_SCAN_MIN_TICKS = 32
+QUIET_SCAN_MAX_BACKOFF = 6  # up to 2**6 - 1 processed ticks between scans after misses
+
+
+@dataclass
+class QuietRun:
+    count: int
+    time_ms: np.ndarray
+    equity: np.ndarray
+    grid_step: float
+
+
+def infer_point_array(prices: np.ndarray, symbol: str = "", price_scale: float = 1.0) -> np.ndarray:
+    if symbol.strip().upper() == "USDJPY":
+        return np.full(len(prices), infer_point(0.0, symbol, price_scale))
+    scale = price_scale if price_scale > 0.0 else 1.0
+    return np.where(prices >= 10.0, 0.01, 0.00001) * scale
+
+
+def adx_nanpin_stop_mask(columns: np.ndarray, adx_threshold: float, di_gap_min: float, side: int) -> np.ndarray:
+    adx_now = columns[:, 3]
+    adx_prev = columns[:, 4]
+    if side == SIDE_BUY:
+        gap = columns[:, 7] - columns[:, 5]
+        gap_prev = columns[:, 8] - columns[:, 6]
+    else:
+        gap = columns[:, 5] - columns[:, 7]
+        gap_prev = columns[:, 6] - columns[:, 8]
+    return (adx_now >= adx_threshold) & (gap >= di_gap_min) & ~((adx_now < adx_prev) & (gap < gap_prev))
+
+
+def nanpin_ready_mask(last_time: Optional[TickTime], time_ms: np.ndarray, delay: int) -> np.ndarray:
+    if last_time is None:
+        return np.ones(len(time_ms), dtype=bool)
+    last_ms = last_time if isinstance(last_time, int) else datetime_to_ms(last_time)
+    return (time_ms - last_ms) >= delay * 1000
+
+
+def quiet_tick_events(
+    state: SymbolState,
+    book: PositionBook,
+    buy: BasketInfo,
+    sell: BasketInfo,
+    balance: float,
+    time_ms: np.ndarray,
+    bid: np.ndarray,
+    ask: np.ndarray,
+    columns: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(event, equity, grid_step) per tick of a window, with both baskets open and settled.
+
+    event marks ticks on which process_tick could open or close a position or flip a nanpin
+    stop, or run_backtest could see a margin call. The comparisons repeat the ones in
+    process_tick/run_backtest operation for operation, so the flags are exact, not estimates.
+    """
+    params = state.params
+    contract_size = params.contract_size
+    n = len(bid)
+    event = np.zeros(n, dtype=bool)
+    atr_current = columns[:, 0]
+    atr_base = columns[:, 1]
+    atr_slope = columns[:, 2]
+
+    flex_on = (atr_current > 0.0) & (params.flex_atr_profit_multiplier > 0.0)
+    flex_target = atr_current * params.flex_atr_profit_multiplier
+    unrealized = np.zeros(n, dtype=np.float64)
+    used_margin = np.zeros(n, dtype=np.float64)
+    buy_profit = np.zeros(n, dtype=np.float64)
+    sell_profit = np.zeros(n, dtype=np.float64)
+    for i in range(book.count):
+        price = book.price[i]
+        volume = book.volume[i]
+        if book.side[i] == SIDE_BUY:
+            term = (bid - price) * volume * contract_size
+            buy_profit = buy_profit + term
+            used_margin = used_margin + volume * contract_size * bid / LEVERAGE
+            if book.flex[i]:
+                event |= flex_on & ((bid - price) >= flex_target)
+        else:
+            term = (price - ask) * volume * contract_size
+            sell_profit = sell_profit + term
+            used_margin = used_margin + volume * contract_size * ask / LEVERAGE
+            if book.flex[i]:
+                event |= flex_on & ((price - ask) >= flex_target)
+        unrealized = unrealized + term
+    equity = balance + unrealized
+    with np.errstate(divide="ignore", invalid="ignore"):
+        event |= (used_margin > 0.0) & (equity / used_margin < 0.9)
+
+    allow_nanpin = np.ones(n, dtype=bool)
+    if params.safety_mode:
+        triggered = (atr_base > 0.0) & (
+            (atr_current >= atr_base * params.safe_k) | (atr_slope > atr_base * params.safe_slope_k)
+        )
+        if params.safe_stop_mode:
+            event |= triggered
+        else:
+            allow_nanpin = ~triggered
+    buy_stop = allow_nanpin & adx_nanpin_stop_mask(columns, params.adx_max_for_nanpin, params.di_gap_min, SIDE_BUY)
+    sell_stop = allow_nanpin & adx_nanpin_stop_mask(columns, params.adx_max_for_nanpin, params.di_gap_min, SIDE_SELL)
+    event |= buy_stop != state.buy_stop_active
+    event |= sell_stop != state.sell_stop_active
+    allow_nanpin_buy = allow_nanpin & ~buy_stop
+    allow_nanpin_sell = allow_nanpin & ~sell_stop
+
+    buy_profit_base = effective_profit_base(params, buy.level_count)
+    if state.has_partial_buy:
+        target_profit = buy.volume * buy_profit_base * 0.5 * contract_size
+        event |= (buy_profit + state.realized_buy_profit) >= target_profit
+    else:
+        event |= bid >= buy.avg_price + buy_profit_base
+    sell_profit_base = effective_profit_base(params, sell.level_count)
+    if state.has_partial_sell:
+        target_profit = sell.volume * sell_profit_base * 0.5 * contract_size
+        event |= (sell_profit + state.realized_sell_profit) >= target_profit
+    else:
+        event |= ask <= sell.avg_price - sell_profit_base
+
+    levels = effective_max_levels(params)
+    tol = infer_point_array(bid, state.symbol, params.price_scale) * 0.5
+    if buy.level_count < levels:
+        target = state.buy_level_price[buy.level_count]
+        ready = nanpin_ready_mask(state.last_buy_nanpin_time, time_ms, params.nanpin_sleep_seconds)
+        event |= allow_nanpin_buy & ready & (ask <= target + tol)
+    if sell.level_count < levels:
+        target = state.sell_level_price[sell.level_count]
+        ready = nanpin_ready_mask(state.last_sell_nanpin_time, time_ms, params.nanpin_sleep_seconds)
+        event |= allow_nanpin_sell & ready & (bid >= target - tol)
+
+    refill_tol = infer_point_array(ask, state.symbol, params.price_scale) * 0.5
+    for ref in state.flex_buy_refs:
+        if ref.active:
+            event |= allow_nanpin_buy & (ask <= ref.price + refill_tol)
+    for ref in state.flex_sell_refs:
+        if ref.active:
+            event |= allow_nanpin_sell & (bid >= ref.price - tol)
+
+    atr_ref = np.where(params.min_atr > atr_base, params.min_atr, atr_base)
+    grid_step = np.where(atr_ref > 0.0, atr_ref * params.atr_multiplier, 0.0)
+    return event, equity, grid_step
+
+
+def load_tick_range(
     data_dir: str,
     symbol: str,
     start: dt.datetime,
     end: dt.datetime,
     price_scale: float = 1.0,
-) -> Iterator[Tuple[dt.datetime, float, float]]:
-    current = start.date()
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    bi5_divisor: float = 0.0,
+) -> Optional[TickArrays]:
+    if source != "csv":
+        blocks = list(iter_tick_blocks(data_dir, symbol, start, end, price_scale, source, prefetch, bi5_divisor))
+        return concat_tick_arrays(blocks)
     scale = price_scale if price_scale > 0.0 else 1.0
-    while current <= end.date():
+    start_ms = datetime_to_ms_ceil(start)
+    end_ms = datetime_to_ms(end)
+    blocks = []
+    for _path, block in iter_csv_blocks(data_dir, symbol, start, end, start_ms, end_ms, prefetch):
+        if block is None:
+            # Sub-millisecond timestamps only replay exactly through the row parser.
+            return None
+        blocks.append(scale_prices(block, scale))
+    return concat_tick_arrays(blocks)
+
+
+def iter_csv_blocks(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    start_ms: int,
+    end_ms: int,
+    prefetch: Optional[PrefetchConfig],
+) -> Iterator[Tuple[str, Optional[TickArrays]]]:
+    paths: List[str] = []
+    loaders = []
+    for current in iter_days(start, end):
         fname = f"{symbol}_{current.isoformat()}.csv.gz"
         path = os.path.join(data_dir, str(current.year), fname)
         if os.path.exists(path):
-            with gzip.open(path, "rt") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    ts = dt.datetime.fromisoformat(row["datetime"])
-                    if ts < start or ts > end:
-                        continue
-                    bid = float(row["bid"]) * scale
-                    ask = float(row["ask"]) * scale
-                    yield ts, bid, ask
-        current += dt.timedelta(days=1)
+            paths.append(path)
+            loaders.append(functools.partial(read_csv_range, path, current, start_ms, end_ms))
+    yield from zip(paths, iter_prefetched(loaders, prefetch))
 
 
-def parse_user_datetime(value: Optional[str], is_end: bool) -> Optional[dt.datetime]:
-    if value is None:
-        return None
-    value = value.strip()
-    if "T" in value or " " in value:
-        return dt.datetime.fromisoformat(value)
-    date = dt.date.fromisoformat(value)
-    if is_end:
-        return dt.datetime.combine(date, dt.time(23, 59, 59, 999000))
-    return dt.datetime.combine(date, dt.time(0, 0, 0))
+TickChunk = Union[TickArrays, Iterator[Tuple[dt.datetime, float, float]]]
 
 
-def find_latest_date(data_dir: str, symbol: str) -> Optional[dt.date]:
-    latest = None
-    for root, _, files in os.walk(data_dir):
-        for name in files:
-            if not name.startswith(f"{symbol}_") or not name.endswith(".csv.gz"):
-                continue
-            date_str = name[len(symbol) + 1 : -len(".csv.gz")]
-            try:
-                d = dt.date.fromisoformat(date_str)
-            except ValueError:
+def iter_csv_rows(
+    path: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    scale: float,
+) -> Iterator[Tuple[dt.datetime, float, float]]:
+    with gzip.open(path, "rt") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            ts = dt.datetime.fromisoformat(row["datetime"])
+            if ts < start or ts > end:
                 continue
-            if latest is None or d > latest:
-                latest = d
-    return latest
-
-
-def build_default_range(data_dir: str, symbol: str) -> Tuple[dt.datetime, dt.datetime]:
-    latest = find_latest_date(data_dir, symbol)
-    if latest is None:
-        raise RuntimeError(f"No data found under {data_dir}")
-    end = dt.datetime.combine(latest, dt.time(23, 59, 59, 999000))
-    start = dt.datetime.combine(latest - dt.timedelta(days=29), dt.time(0, 0, 0))
-    return start, end
+            bid = float(row["bid"]) * scale
+            ask = float(row["ask"]) * scale
+            yield ts, bid, ask
 
 
-def build_daily_ranges(start: dt.datetime, end: dt.datetime) -> List[Tuple[dt.datetime, dt.datetime]]:
-    ranges: List[Tuple[dt.datetime, dt.datetime]] = []
-    current = start.date()
-    while current <= end.date():
-        day_start = dt.datetime.combine(current, dt.time(0, 0, 0))
-        day_end = dt.datetime.combine(current, dt.time(23, 59, 59, 999000))
-        if current == start.date():
-            day_start = start
-        if current == end.date():
-            day_end = end
-        ranges.append((day_start, day_end))
-        current += dt.timedelta(days=1)
-    return ranges
+def iter_tick_chunks(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    price_scale: float = 1.0,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    bi5_divisor: float = 0.0,
+    tick_cache: Optional[TickCache] = None,
+) -> Iterator[TickChunk]:
+    """Yield scaled tick blocks, or row iterators for csv days that need the row parser."""
+    if tick_cache is not None:
+        key = (os.path.abspath(data_dir), symbol, start, end, price_scale, source, bi5_divisor)
+        arrays = tick_cache.get(key)
+        if arrays is None:
+            arrays = load_tick_range(data_dir, symbol, start, end, price_scale, source, prefetch, bi5_divisor)
+            if arrays is not None:
+                tick_cache.put(key, arrays)
+        if arrays is not None:
+            yield arrays
+            return
+    if source != "csv":
+        yield from iter_tick_blocks(data_dir, symbol, start, end, price_scale, source, prefetch, bi5_divisor)
+        return
+    scale = price_scale if price_scale > 0.0 else 1.0
+    start_ms = datetime_to_ms_ceil(start)
+    end_ms = datetime_to_ms(end)
+    for path, block in iter_csv_blocks(data_dir, symbol, start, end, start_ms, end_ms, prefetch):
+        if block is not None:
+            yield scale_prices(block, scale)
+        else:
+            yield iter_csv_rows(path, start, end, scale)
 
 
-def build_result_path(prefix: str = "") -> str:
-    os.makedirs("result", exist_ok=True)
-    timestamp = dt.datetime.now().strftime("%Y%m%d%H%M%S%f")
-    pid = os.getpid()
-    return os.path.join("result", f"{prefix}{timestamp}_{pid}.json")
+def iter_ticks(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    price_scale: float = 1.0,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    bi5_divisor: float = 0.0,
+    tick_cache: Optional[TickCache] = None,
+) -> Iterator[Tuple[dt.datetime, float, float]]:
+    for chunk in iter_tick_chunks(
+        data_dir, symbol, start, end, price_scale, source, prefetch, bi5_divisor, tick_cache
+    ):
+        if isinstance(chunk, TickArrays):
+            yield from iter_block_ticks(chunk)
+        else:
+            yield from chunk
 
 
-def init_symbol_state(params: NM1Params, symbol: str) -> SymbolState:
-    state = SymbolState(params=params, symbol=symbol)
-    state.lot_seq = build_lot_sequence(params)
-    state.flex_buy_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
-    state.flex_sell_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
-    state.buy_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
-    state.sell_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
-    return state
+IndicatorBlock = Tuple[Union[TickArrays, Iterator[Tuple[dt.datetime, float, float, List[float]]]], Optional[np.ndarray]]
 
 
-def apply_param_overrides(params: NM1Params, overrides: Optional[Dict[str, object]]) -> NM1Params:
-    if not overrides:
-        return params
-    for key, value in overrides.items():
-        if not hasattr(params, key):
-            raise ValueError(f"Unknown parameter override: {key}")
-        setattr(params, key, value)
-    return params
+@dataclass
+class DaySnapshots:
+    """Copies of the bar aggregator taken before the first tick of each day, for checkpoints."""
+
+    bars: BarAggregator
+    day: Optional[int] = None
+    copies: Dict[int, BarAggregator] = field(default_factory=dict)
+
+    def mark(self, day: int) -> None:
+        if day != self.day:
+            self.day = day
+            self.copies[day] = copy.deepcopy(self.bars)
+
+    def take(self, day: int) -> Optional[BarAggregator]:
+        for old in [key for key in self.copies if key < day]:
+            del self.copies[old]
+        return self.copies.pop(day, None)
+
+
+def iter_marked_rows(
+    rows: Iterator[Tuple[dt.datetime, float, float]],
+    bars: BarAggregator,
+    days: DaySnapshots,
+) -> Iterator[Tuple[dt.datetime, float, float, List[float]]]:
+    for tick_time, bid, ask in rows:
+        days.mark(datetime_to_ms(tick_time) // MS_PER_DAY)
+        yield tick_time, bid, ask, bars.update(tick_time, bid)
+
+
+def iter_indicator_blocks(
+    chunks: Iterator[TickChunk],
+    bars: BarAggregator,
+    days: Optional[DaySnapshots] = None,
+) -> Iterator[IndicatorBlock]:
+    """Yield (block, columns) per BLOCK_ITER_ROWS slice; row chunks come as (rows with indicators, None).
+
+    With days, blocks also end at day boundaries and bars is snapshotted before each day.
+    """
+    for chunk in chunks:
+        if not isinstance(chunk, TickArrays):
+            if days is not None:
+                yield iter_marked_rows(chunk, bars, days), None
+            else:
+                yield ((tick_time, bid, ask, bars.update(tick_time, bid)) for tick_time, bid, ask in chunk), None
+            continue
+        day_starts = [0]
+        if days is not None and len(chunk):
+            day = chunk.time_ms // MS_PER_DAY
+            day_starts = [0] + (np.flatnonzero(day[1:] != day[:-1]) + 1).tolist()
+        day_ends = day_starts[1:] + [len(chunk)]
+        for day_begin, day_end in zip(day_starts, day_ends):
+            if days is not None:
+                days.mark(int(chunk.time_ms[day_begin]) // MS_PER_DAY)
+            for begin in range(day_begin, day_end, BLOCK_ITER_ROWS):
+                part = chunk.slice(begin, min(begin + BLOCK_ITER_ROWS, day_end))
+                yield part, bars.update_block(part)
+
+
+def iter_block_indicator_ticks(
+    blocks: Iterator[IndicatorBlock],
+    int_time: bool = False,
+) -> Iterator[Tuple[TickTime, float, float, List[float]]]:
+    for block, columns in blocks:
+        if columns is None:
+            if int_time:
+                for tick_time, bid, ask, indicators in block:
+                    yield datetime_to_ms(tick_time), bid, ask, indicators
+            else:
+                yield from block
+            continue
+        if int_time:
+            yield from zip(block.time_ms.tolist(), block.bid.tolist(), block.ask.tolist(), columns.tolist())
+            continue
+        for (tick_time, bid, ask), indicators in zip(iter_block_ticks(block), columns.tolist()):
+            yield tick_time, bid, ask, indicators
 
 
-def normalize_symbol(symbol: str) -> str:
-    symbol = symbol.strip().upper()
-    if not symbol:
-        raise ValueError("Symbol must not be empty")
-    return symbol
+def tick_calendar(tick_time: TickTime) -> Tuple[Union[dt.date, int], TickTime]:
+    """(date, hour start) keys of a tick; epoch day number and hour start ms for int times."""
+    if isinstance(tick_time, int):
+        return tick_time // MS_PER_DAY, tick_time - tick_time % MS_PER_HOUR
+    return tick_time.date(), tick_time.replace(minute=0, second=0, microsecond=0)
 
 
-def load_symbol_param_file(path: str) -> Dict[str, Dict[str, object]]:
-    with open(path, "r", encoding="utf-8") as f:
-        payload = json.load(f)
-    if not isinstance(payload, dict):
-        raise ValueError("Symbol params JSON must be an object of symbol -> params")
-    normalized: Dict[str, Dict[str, object]] = {}
-    for key, value in payload.items():
-        if not isinstance(value, dict):
-            raise ValueError(f"Symbol params for {key} must be an object")
-        normalized[normalize_symbol(str(key))] = value
-    return normalized
+def iter_indicator_ticks(
+    chunks: Iterator[TickChunk],
+    bars: BarAggregator,
+) -> Iterator[Tuple[dt.datetime, float, float, List[float]]]:
+    """Yield (time, bid, ask, indicators) with one value per indicator output column."""
+    return iter_block_indicator_ticks(iter_indicator_blocks(chunks, bars))
+
+
+def indicator_cache_path(
+    cache_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    fingerprint: str,
+) -> str:
+    key = json.dumps(
+        [
+            INDICATOR_CACHE_VERSION,
+            symbol,
+            start.isoformat(),
+            end.isoformat(),
+            fingerprint,
+            ATR_PERIOD,
+            ATR_BASE_BARS,
+            ATR_BASE_LAG,
+            ADX_PERIOD,
+        ]
+    )
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+    name = f"{symbol}_{start:%Y%m%d%H%M%S}_{end:%Y%m%d%H%M%S}_{digest}.npy"
+    return os.path.join(cache_dir, name)
+
+
+def load_indicator_columns(
+    cache_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    arrays: TickArrays,
+) -> np.ndarray:
+    """Per-tick indicator columns for a whole replay, memory-mapped from cache_dir.
+
+    The columns only depend on the (scaled) bid stream and the indicator periods, never on
+    NM1Params, so every optimisation trial over the same range reuses one file.
+    """
+    path = indicator_cache_path(cache_dir, symbol, start, end, tick_fingerprint(arrays))
+    if os.path.exists(path):
+        columns = np.load(path, mmap_mode="r")
+        if columns.shape == (len(arrays), make_indicator_aggregator().width):
+            return columns
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    bars = make_indicator_aggregator()
+    columns = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(len(arrays), bars.width))
+    for begin in range(0, len(arrays), BLOCK_ITER_ROWS):
+        part = arrays.slice(begin, begin + BLOCK_ITER_ROWS)
+        columns[begin : begin + len(part)] = bars.update_block(part)
+    columns.flush()
+    del columns
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def result_cache_params(params: NM1Params) -> Dict[str, object]:
+    """NM1Params as the engine reads them: settings that cannot change a replay collapse to one value."""
+    normalized = replace(params, max_levels=effective_max_levels(params))
+    normalized.core_ratio, normalized.flex_ratio = core_flex_ratios(params)
+    if not params.profit_base_level_mode:
+        defaults = NM1Params()
+        normalized.profit_base_level_step = defaults.profit_base_level_step
+        normalized.profit_base_level_min = defaults.profit_base_level_min
+    return asdict(normalized)
+
+
+@functools.lru_cache(maxsize=None)
+def engine_fingerprint() -> str:
+    """Digest of the engine sources, so a code change never serves results cached before it."""
+    digest = hashlib.blake2b(digest_size=12)
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ("backtest_nm1.py", "tick_store.py"):
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def result_cache_path(
+    cache_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    fund_mode: int,
+    stop_on_margin_call: bool,
+    params: NM1Params,
+    fingerprint: str,
+) -> str:
+    key = json.dumps(
+        [
+            RESULT_CACHE_VERSION,
+            engine_fingerprint(),
+            symbol,
+            start.isoformat(),
+            end.isoformat(),
+            fund_mode,
+            stop_on_margin_call,
+            fingerprint,
+            result_cache_params(params),
+        ],
+        sort_keys=True,
+    )
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{symbol}_{digest}.json")
+
+
+def range_data_fingerprint(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    source: str = "csv",
+    tick_cache: Optional[TickCache] = None,
+) -> str:
+    """Content digest of the unscaled ticks in [start, end], for result_cache_path.
+
+    Ranges that need the csv row parser fall back to the catalog stats of their day files.
+    With tick_cache, the decoded range stays cached for replays with the default price scale.
+    """
+    defaults = NM1Params()
+    chunks = list(
+        iter_tick_chunks(
+            data_dir, symbol, start, end, defaults.price_scale, source, None, defaults.bi5_price_divisor, tick_cache
+        )
+    )
+    if all(isinstance(chunk, TickArrays) for chunk in chunks):
+        return tick_fingerprint(concat_tick_arrays(chunks))
+    return catalog_fingerprint(refresh_catalog(data_dir, symbol, source), start.date(), end.date())
+
+
+def read_cached_result(path: str) -> Optional[Tuple[float, bool, float, float, float]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            final_funds, margin_call, max_drawdown_rate, profit, unrealized_loss = json.load(f)["result"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return float(final_funds), bool(margin_call), float(max_drawdown_rate), float(profit), float(unrealized_loss)
+
+
+def write_cached_result(path: str, result: Tuple[float, bool, float, float, float]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"result": list(result)}, f)
+    os.replace(tmp_path, path)
+
+
+def iter_cached_indicator_blocks(arrays: TickArrays, columns: np.ndarray) -> Iterator[IndicatorBlock]:
+    for begin in range(0, len(arrays), BLOCK_ITER_ROWS):
+        part = arrays.slice(begin, begin + BLOCK_ITER_ROWS)
+        yield part, columns[begin : begin + len(part)]
+
+
+def scan_quiet_run(
+    state: SymbolState,
+    book: PositionBook,
+    balance: float,
+    arrays: TickArrays,
+    columns: np.ndarray,
+    begin: int,
+) -> Optional[QuietRun]:
+    """Quiet ticks from begin (the tick after the one just processed) to the first event or hour end."""
+    params = state.params
+    if not state.initial_started:
+        return None
+    buy = book.totals[SIDE_BUY].fill(BasketInfo())
+    sell = book.totals[SIDE_SELL].fill(BasketInfo())
+    if buy.count == 0 or sell.count == 0:
+        return None
+    # The tick after a fill or close still settles counts, level prices and targets.
+    if state.prev_buy_count != buy.count or state.prev_sell_count != sell.count:
+        return None
+    levels = effective_max_levels(params)
+    if buy.level_count < levels and state.buy_level_price[buy.level_count] <= 0.0:
+        return None
+    if sell.level_count < levels and state.sell_level_price[sell.level_count] <= 0.0:
+        return None
+
+    time_ms = arrays.time_ms
+    hour_end = (int(time_ms[begin - 1]) // MS_PER_HOUR + 1) * MS_PER_HOUR
+    limit = begin + int(np.searchsorted(time_ms[begin:], hour_end, side="left"))
+    equity_parts: List[np.ndarray] = []
+    grid_step = 0.0
+    lo = begin
+    width = QUIET_SCAN_MIN_TICKS
+    while lo < limit:
+        hi = min(limit, lo + width)
+        event, equity, steps = quiet_tick_events(
+            state,
+            book,
+            buy,
+            sell,
+            balance,
+            time_ms[lo:hi],
+            arrays.bid[lo:hi],
+            arrays.ask[lo:hi],
+            columns[lo:hi],
+        )
+        hits = np.flatnonzero(event)
+        stop = int(hits[0]) if len(hits) else hi - lo
+        equity_parts.append(equity[:stop])
+        if stop > 0:
+            grid_step = max(grid_step, float(steps[:stop].max()))
+        if len(hits):
+            break
+        lo = hi
+        width *= 2
+    # Leave the last quiet tick to process_tick.
+    count = sum(len(part) for part in equity_parts) - 1
+    if count < 1:
+        return None
+    equity = np.concatenate(equity_parts)[:count]
+    return QuietRun(count=count, time_ms=time_ms[begin : begin + count], equity=equity, grid_step=grid_step)
+
+
+@dataclass
+class QuietScanner:
+    """scan_quiet_run with a backoff, so stretches with an event on every tick are not rescanned."""
+
+    misses: int = 0
+    backoff: int = 0
+
+    def find(
+        self,
+        state: SymbolState,
+        book: PositionBook,
+        balance: float,
+        arrays: TickArrays,
+        columns: np.ndarray,
+        begin: int,
+    ) -> Optional[QuietRun]:
+        if self.backoff > 0:
+            self.backoff -= 1
+            return None
+        run = scan_quiet_run(state, book, balance, arrays, columns, begin)
+        if run is None:
+            self.misses = min(self.misses + 1, QUIET_SCAN_MAX_BACKOFF)
+            self.backoff = (1 << self.misses) - 1
+        else:
+            self.misses = 0
+        return run
+
+
+@dataclass
+class EventTickCursor:
+    """Replays (ticks, indicator columns) blocks like iter_indicator_ticks, but can jump.
+
+    After run_backtest processed a tick, find_quiet_run() scans the rest of its hour for the
+    first tick process_tick could act on and skip() drops the quiet ticks before it. The last
+    quiet tick is still replayed so write-only state (stop distance, safety flag) ends the same.
+    """
+
+    blocks: Iterator[IndicatorBlock]
+    arrays: Optional[TickArrays] = None
+    columns: Optional[np.ndarray] = None
+    index: int = 0
+    scanner: QuietScanner = field(default_factory=QuietScanner)
+    skipped: int = 0
+    int_time: bool = False
+
+    def __iter__(self) -> Iterator[Tuple[TickTime, float, float, List[float]]]:
+        for arrays, columns in self.blocks:
+            if columns is None:
+                # Row-parsed csv day: replayed tick by tick without scanning.
+                self.arrays = None
+                yield from iter_block_indicator_ticks(iter([(arrays, None)]), self.int_time)
+                continue
+            self.arrays = arrays
+            self.columns = columns
+            self.index = 0
+            while self.index < len(arrays):
+                i = self.index
+                self.index = i + 1
+                time_ms = int(arrays.time_ms[i])
+                yield (
+                    time_ms if self.int_time else ms_to_datetime(time_ms),
+                    float(arrays.bid[i]),
+                    float(arrays.ask[i]),
+                    columns[i].tolist(),
+                )
+
+    def skip(self, count: int) -> None:
+        self.index += count
+        self.skipped += count
+
+    def find_quiet_run(self, state: SymbolState, book: PositionBook, balance: float) -> Optional[QuietRun]:
+        if self.arrays is None:
+            return None
+        return self.scanner.find(state, book, balance, self.arrays, self.columns, self.index)
+
+
+def parse_user_datetime(value: Optional[str], is_end: bool) -> Optional[dt.datetime]:
+    if value is None:
+        return None
+    value = value.strip()
+    if "T" in value or " " in value:
+        return dt.datetime.fromisoformat(value)
+    date = dt.date.fromisoformat(value)
+    if is_end:
+        return dt.datetime.combine(date, dt.time(23, 59, 59, 999000))
+    return dt.datetime.combine(date, dt.time(0, 0, 0))
+
+
+def find_latest_date(data_dir: str, symbol: str, source: str = "csv") -> Optional[dt.date]:
+    if not os.path.isdir(data_dir):
+        return None
+    return refresh_catalog(data_dir, symbol, source).latest_day()
+
+
+def build_default_range(data_dir: str, symbol: str, source: str = "csv") -> Tuple[dt.datetime, dt.datetime]:
+    latest = find_latest_date(data_dir, symbol, source)
+    if latest is None:
+        raise RuntimeError(f"No data found under {data_dir}")
+    end = dt.datetime.combine(latest, dt.time(23, 59, 59, 999000))
+    start = dt.datetime.combine(latest - dt.timedelta(days=29), dt.time(0, 0, 0))
+    return start, end
+
+
+def build_daily_ranges(start: dt.datetime, end: dt.datetime) -> List[Tuple[dt.datetime, dt.datetime]]:
+    ranges: List[Tuple[dt.datetime, dt.datetime]] = []
+    current = start.date()
+    while current <= end.date():
+        day_start = dt.datetime.combine(current, dt.time(0, 0, 0))
+        day_end = dt.datetime.combine(current, dt.time(23, 59, 59, 999000))
+        if current == start.date():
+            day_start = start
+        if current == end.date():
+            day_end = end
+        ranges.append((day_start, day_end))
+        current += dt.timedelta(days=1)
+    return ranges
+
+
+def build_result_path(prefix: str = "") -> str:
+    os.makedirs("result", exist_ok=True)
+    timestamp = dt.datetime.now().strftime("%Y%m%d%H%M%S%f")
+    pid = os.getpid()
+    return os.path.join("result", f"{prefix}{timestamp}_{pid}.json")
+
+
+def init_symbol_state(params: NM1Params, symbol: str) -> SymbolState:
+    state = SymbolState(params=params, symbol=symbol)
+    state.lot_seq = build_lot_sequence(params)
+    state.flex_buy_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
+    state.flex_sell_refs = [FlexRef() for _ in range(K_MAX_LEVELS)]
+    state.buy_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
+    state.sell_level_price = [0.0 for _ in range(K_MAX_LEVELS)]
+    state.point_small = infer_point(0.0, symbol, params.price_scale)
+    state.point_large = infer_point(10.0, symbol, params.price_scale)
+    return state
+
+
+def apply_param_overrides(params: NM1Params, overrides: Optional[Dict[str, object]]) -> NM1Params:
+    if not overrides:
+        return params
+    for key, value in overrides.items():
+        if not hasattr(params, key):
+            raise ValueError(f"Unknown parameter override: {key}")
+        setattr(params, key, value)
+    return params
+
+
+def normalize_symbol(symbol: str) -> str:
+    symbol = symbol.strip().upper()
+    if not symbol:
+        raise ValueError("Symbol must not be empty")
+    return symbol
+
+
+def load_symbol_param_file(path: str) -> Dict[str, Dict[str, object]]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if not isinstance(payload, dict):
+        raise ValueError("Symbol params JSON must be an object of symbol -> params")
+    normalized: Dict[str, Dict[str, object]] = {}
+    for key, value in payload.items():
+        if not isinstance(value, dict):
+            raise ValueError(f"Symbol params for {key} must be an object")
+        normalized[normalize_symbol(str(key))] = value
+    return normalized
 
 
 def build_symbol_overrides(symbol: str, params_file: Optional[str]) -> Dict[str, object]:
@@ -1417,133 +2293,78 @@ def build_symbol_overrides(symbol: str, params_file: Optional[str]) -> Dict[str,
     return overrides
 
 
-def run_backtest(
-    data_dir: str,
-    symbol: str,
-    start: dt.datetime,
-    end: dt.datetime,
-    debug: bool,
-    base_lot_override: Optional[float],
-    fund_mode: int,
-    stop_on_margin_call: bool = False,
-    log_mode: bool = True,
-    params_override: Optional[Dict[str, object]] = None,
-) -> Tuple[float, bool, float, float, float]:
-    params = apply_param_overrides(NM1Params(), params_override)
-    if base_lot_override is not None:
-        params.base_lot = base_lot_override
-    state = init_symbol_state(params, symbol)
-
-    positions: List[Position] = []
-    stats = Stats()
-    atr_state = AtrState()
-    adx_state = AdxState()
-    added_funds = 0.0
-    reserve_funds = max(0.0, TOTAL_CAPITAL - START_BALANCE)
+@dataclass
+class BacktestRun:
+    """Strategy and account state of one replay, advanced one tick at a time by on_tick().
 
-    max_lot = max(state.lot_seq) if state.lot_seq else params.base_lot
-    profit_amount = params.base_lot * params.profit_base * params.contract_size
-    margin_call_detected = False
-    if log_mode:
-        print(
-            "Backtest setup "
-            f"symbol={symbol} "
-            f"base_lot={params.base_lot:.2f} "
-            f"max_nanpin_lot={max_lot:.2f} "
-            f"base_profit={params.profit_base:.8f} "
-            f"profit_level_mode={int(params.profit_base_level_mode)} "
-            f"profit_level_step={params.profit_base_level_step:.4f} "
-            f"profit_level_min={params.profit_base_level_min:.4f} "
-            f"profit_amount={profit_amount:.2f} "
-            f"contract_size={params.contract_size:.0f} "
-            f"start_balance={START_BALANCE:.2f} "
-            f"total_capital={TOTAL_CAPITAL:.2f} "
-            f"reserve_funds={reserve_funds:.2f} "
-            f"fund_mode={fund_mode} "
-            f"stop_on_margin_call={int(stop_on_margin_call)}"
-        )
+    run_backtest drives a single run; run_backtest_batch steps several over one tick pass.
+    """
 
-    ticks = iter_ticks(data_dir, symbol, start, end, params.price_scale)
-    total_ticks = 0
-    balance = START_BALANCE
-    last_closed_profit = 0.0
-    current_hour: Optional[dt.datetime] = None
-    hour_peak_equity = balance
-    hour_min_equity = balance
-    last_balance = balance
-    last_equity = balance
-    total_funds = reserve_funds
-    last_date: Optional[dt.date] = None
-    peak_equity = balance
-    max_drawdown_amount = 0.0
-    max_drawdown_rate = 0.0
-    max_drawdown_time: Optional[dt.datetime] = None
-    over_50_count = 0
-    over_50_active = False
-    start_time_by_side: Dict[str, Optional[dt.datetime]] = {"buy": None, "sell": None}
-    level_max_duration: Dict[int, float] = {}
-    for tick_time, bid, ask in ticks:
-        log_snapshot = False
-        tick_date = tick_time.date()
-        tick_hour = tick_time.replace(minute=0, second=0, microsecond=0)
-        if last_date is not None and tick_date != last_date and fund_mode == 1:
-            if balance > START_BALANCE:
-                excess = balance - START_BALANCE
-                balance, total_funds = transfer_funds(
-                    balance,
-                    total_funds,
-                    excess,
-                    tick_time,
-                    "FUND_TRANSFER_MODE1",
-                    log_mode,
-                )
-                last_balance = balance
-                last_equity = max(0.0, last_equity - excess)
-        if current_hour is None:
-            current_hour = tick_hour
-            hour_peak_equity = last_equity
-            hour_min_equity = last_equity
-            if log_mode:
-                print(
-                    f"{current_hour.isoformat()} "
-                    f"balance={last_balance:.2f} "
-                    f"equity={last_equity:.2f} "
-                    f"remaining_funds={total_funds:.2f} "
-                    f"dd_now=0.00 "
-                    f"dd_max=0.00"
-                )
-                log_snapshot = True
-        elif tick_hour != current_hour:
-            # dd_* are rates based on balance at log time.
-            if last_balance > 0.0:
-                drawdown_now = (last_balance - last_equity) / last_balance
-                max_drawdown = (last_balance - hour_min_equity) / last_balance
-            else:
-                drawdown_now = 0.0
-                max_drawdown = 0.0
-            if log_mode:
-                print(
-                    f"{tick_hour.isoformat()} "
-                    f"balance={last_balance:.2f} "
-                    f"equity={last_equity:.2f} "
-                    f"remaining_funds={total_funds:.2f} "
-                    f"dd_now={drawdown_now:.6f} "
-                    f"dd_max={max_drawdown:.6f}"
-                )
-                log_snapshot = True
-            current_hour = tick_hour
-            hour_peak_equity = last_equity
-            hour_min_equity = last_equity
-
-        total_ticks += 1
-        atr_current, atr_base, atr_slope = update_atr_state(atr_state, tick_time, bid)
-        adx, adx_prev, plus_di, plus_di_prev, minus_di, minus_di_prev = update_adx_state(
-            adx_state, tick_time, bid
-        )
+    params: NM1Params
+    symbol: str
+    fund_mode: int
+    stop_on_margin_call: bool = False
+    journal: Optional[EventJournal] = None
+    account_log: Optional[EventJournal] = field(init=False)  # journal if it records account events
+    trade_log: Optional[EventJournal] = field(init=False)  # journal if it records trade events
+    state: SymbolState = field(init=False)
+    book: PositionBook = field(default_factory=PositionBook)
+    stats: Stats = field(default_factory=Stats)
+    added_funds: float = 0.0
+    total_funds: float = max(0.0, TOTAL_CAPITAL - START_BALANCE)
+    balance: float = START_BALANCE
+    last_closed_profit: float = 0.0
+    current_hour: Optional[TickTime] = None
+    hour_peak_equity: float = START_BALANCE
+    hour_min_equity: float = START_BALANCE
+    last_balance: float = START_BALANCE
+    last_equity: float = START_BALANCE
+    last_date: Optional[Union[dt.date, int]] = None
+    peak_equity: float = START_BALANCE
+    max_drawdown_amount: float = 0.0
+    max_drawdown_rate: float = 0.0
+    max_drawdown_time: Optional[TickTime] = None
+    over_50_count: int = 0
+    over_50_active: bool = False
+    margin_call_detected: bool = False
+    stopped: bool = False  # stop_on_margin_call or out of funds
+    total_ticks: int = 0
+    last_bid: float = 0.0
+    last_ask: float = 0.0
+    start_time_by_side: List[Optional[TickTime]] = field(default_factory=lambda: [None, None])
+    level_max_duration: Dict[int, float] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.attach_journal(self.journal)
+        self.state = init_symbol_state(self.params, self.symbol)
+
+    def attach_journal(self, journal: Optional[EventJournal]) -> None:
+        self.journal = journal
+        self.account_log = journal if journal is not None and journal.accounts else None
+        self.trade_log = journal if journal is not None and journal.trades else None
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Checkpoints keep the strategy/account state only; the journal belongs to the process.
+        state = self.__dict__.copy()
+        state["journal"] = state["account_log"] = state["trade_log"] = None
+        return state
+
+    def on_tick(
+        self,
+        tick_time: TickTime,
+        tick_date: Union[dt.date, int],
+        tick_hour: TickTime,
+        bid: float,
+        ask: float,
+        indicators: List[float],
+    ) -> None:
+        log_snapshot = self.begin_tick(tick_time, tick_date, tick_hour)
+        self.total_ticks += 1
+        atr_current, atr_base, atr_slope, adx, adx_prev, plus_di, plus_di_prev, minus_di, minus_di_prev = indicators
         process_tick(
-            state,
-            positions,
-            stats,
+            self.state,
+            self.book,
+            self.stats,
             tick_time,
             bid,
             ask,
@@ -1556,196 +2377,702 @@ def run_backtest(
             plus_di_prev,
             minus_di,
             minus_di_prev,
-            debug,
-            start_time_by_side,
-            level_max_duration,
+            self.trade_log,
+            self.start_time_by_side,
+            self.level_max_duration,
         )
-        realized_delta = stats.closed_profit - last_closed_profit
+        self.last_bid = bid
+        self.last_ask = ask
+        unrealized, used_margin = book_exposure(self.book, bid, ask, self.params.contract_size)
+        self.settle(tick_time, tick_date, tick_hour, unrealized, used_margin, log_snapshot)
+
+    def begin_tick(self, tick_time: TickTime, tick_date: Union[dt.date, int], tick_hour: TickTime) -> bool:
+        """Day-change fund sweep and hourly log before the strategy sees a tick; True if a snapshot is due."""
+        log = self.account_log
+        log_snapshot = False
+        if self.last_date is not None and tick_date != self.last_date and self.fund_mode == 1:
+            if self.balance > START_BALANCE:
+                excess = self.balance - START_BALANCE
+                self.balance, self.total_funds = transfer_funds(
+                    self.balance,
+                    self.total_funds,
+                    excess,
+                    tick_time,
+                    1,
+                    log,
+                )
+                self.last_balance = self.balance
+                self.last_equity = max(0.0, self.last_equity - excess)
+        if self.current_hour is None:
+            self.current_hour = tick_hour
+            self.hour_peak_equity = self.last_equity
+            self.hour_min_equity = self.last_equity
+            if log is not None:
+                log.record(
+                    J_HOUR_FIRST,
+                    self.current_hour,
+                    a=self.last_balance,
+                    b=self.last_equity,
+                    c=self.total_funds,
+                )
+                log_snapshot = True
+        elif tick_hour != self.current_hour:
+            # dd_* are rates based on balance at log time.
+            if self.last_balance > 0.0:
+                drawdown_now = (self.last_balance - self.last_equity) / self.last_balance
+                max_drawdown = (self.last_balance - self.hour_min_equity) / self.last_balance
+            else:
+                drawdown_now = 0.0
+                max_drawdown = 0.0
+            if log is not None:
+                log.record(
+                    J_HOUR,
+                    tick_hour,
+                    a=self.last_balance,
+                    b=self.last_equity,
+                    c=self.total_funds,
+                    d=drawdown_now,
+                    e=max_drawdown,
+                )
+                log_snapshot = True
+            self.current_hour = tick_hour
+            self.hour_peak_equity = self.last_equity
+            self.hour_min_equity = self.last_equity
+        return log_snapshot
+
+    def settle(
+        self,
+        tick_time: TickTime,
+        tick_date: Union[dt.date, int],
+        tick_hour: TickTime,
+        unrealized: float,
+        used_margin: float,
+        log_snapshot: bool = False,
+    ) -> bool:
+        """Book the tick's realized profit and exposure into balance, funds and drawdown; True on a margin call."""
+        params = self.params
+        book = self.book
+        stats = self.stats
+        log = self.account_log
+        fund_mode = self.fund_mode
+        balance = self.balance
+        total_funds = self.total_funds
+        margin_call = False
+        realized_delta = stats.closed_profit - self.last_closed_profit
         if abs(realized_delta) > 1e-12:
             balance += realized_delta
-            last_closed_profit = stats.closed_profit
+            self.last_closed_profit = stats.closed_profit
             if fund_mode in (2, 3):
                 balance, total_funds = apply_fund_management(
                     fund_mode,
                     balance,
                     total_funds,
                     tick_time,
-                    log_mode,
+                    log,
                 )
 
-        unrealized = 0.0
-        for pos in positions:
-            if pos.side == "buy":
-                unrealized += (bid - pos.price) * pos.volume * params.contract_size
-            else:
-                unrealized += (pos.price - ask) * pos.volume * params.contract_size
         equity = balance + unrealized
-        used_margin = 0.0
-        if positions:
-            for pos in positions:
-                price = bid if pos.side == "buy" else ask
-                used_margin += pos.volume * params.contract_size * price / LEVERAGE
         margin_level = equity / used_margin if used_margin > 0.0 else float("inf")
-        hour_peak_equity = max(hour_peak_equity, equity)
-        hour_min_equity = min(hour_min_equity, equity)
-        if log_mode and log_snapshot:
-            buy_info, sell_info = collect_basket_info(positions, bid, ask, params.contract_size)
-            print(
-                f"{tick_time.isoformat()} "
-                f"POS_SNAPSHOT "
-                f"buy_count={buy_info.count} "
-                f"buy_avg={buy_info.avg_price:.2f} "
-                f"sell_count={sell_info.count} "
-                f"sell_avg={sell_info.avg_price:.2f}"
+        self.hour_peak_equity = max(self.hour_peak_equity, equity)
+        self.hour_min_equity = min(self.hour_min_equity, equity)
+        if log_snapshot:
+            buy_totals, sell_totals = book.totals
+            log.record(
+                J_SNAPSHOT,
+                tick_time,
+                a=buy_totals.count,
+                b=buy_totals.value / buy_totals.volume if buy_totals.volume > 0.0 else 0.0,
+                c=sell_totals.count,
+                d=sell_totals.value / sell_totals.volume if sell_totals.volume > 0.0 else 0.0,
             )
 
-        drawdown = hour_peak_equity - equity
-        if equity > peak_equity:
-            peak_equity = equity
-        global_drawdown = peak_equity - equity
-        if global_drawdown > max_drawdown_amount:
-            max_drawdown_amount = global_drawdown
-            max_drawdown_rate = global_drawdown / START_BALANCE if START_BALANCE > 0.0 else 0.0
-            max_drawdown_time = tick_time
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        global_drawdown = self.peak_equity - equity
+        if global_drawdown > self.max_drawdown_amount:
+            self.max_drawdown_amount = global_drawdown
+            self.max_drawdown_rate = global_drawdown / START_BALANCE if START_BALANCE > 0.0 else 0.0
+            self.max_drawdown_time = tick_time
         current_rate = global_drawdown / START_BALANCE if START_BALANCE > 0.0 else 0.0
         if current_rate > 0.5:
-            if not over_50_active:
-                over_50_count += 1
-                over_50_active = True
+            if not self.over_50_active:
+                self.over_50_count += 1
+                self.over_50_active = True
         else:
-            over_50_active = False
+            self.over_50_active = False
         if used_margin > 0.0 and margin_level < 0.9:
-            margin_call_detected = True
+            margin_call = True
+            self.margin_call_detected = True
             loss = balance
             stats.closed_profit -= loss
-            last_closed_profit = stats.closed_profit
-            if log_mode:
-                print(
-                    f"{tick_time.isoformat()} "
-                    f"MARGIN_CALL loss={loss:.2f} balance=0.00 "
-                    f"margin_level={margin_level:.3f}"
-                )
-            positions.clear()
-            state = init_symbol_state(params, symbol)
+            self.last_closed_profit = stats.closed_profit
+            if log is not None:
+                log.record(J_MARGIN_CALL, tick_time, a=loss, b=margin_level)
+            book.clear()
+            self.state = init_symbol_state(params, self.symbol)
             balance = 0.0
-            start_time_by_side = {"buy": None, "sell": None}
-            if stop_on_margin_call:
-                if log_mode:
-                    print(
-                        f"{tick_time.isoformat()} "
-                        f"MARGIN_CALL_STOP remaining_funds={total_funds:.2f} backtest_stop"
-                    )
-                unrealized = 0.0
-                equity = balance
-                last_balance = balance
-                last_equity = equity
-                break
-            if total_funds <= 0.0:
-                if log_mode:
-                    print(
-                        f"{tick_time.isoformat()} "
-                        f"NO_FUNDS remaining=0.00 backtest_stop"
-                    )
-                unrealized = 0.0
-                equity = balance
-                last_balance = balance
-                last_equity = equity
-                break
-            added_funds += START_BALANCE
+            self.start_time_by_side = [None, None]
+            if self.stop_on_margin_call or total_funds <= 0.0:
+                if log is not None:
+                    if self.stop_on_margin_call:
+                        log.record(J_MARGIN_CALL_STOP, tick_time, a=total_funds)
+                    else:
+                        log.record(J_NO_FUNDS, tick_time)
+                self.balance = balance
+                self.total_funds = total_funds
+                self.last_balance = balance
+                self.last_equity = balance
+                self.stopped = True
+                return margin_call
+            self.added_funds += START_BALANCE
             total_funds = max(0.0, total_funds - START_BALANCE)
             balance = START_BALANCE
-            if log_mode:
-                print(
-                    f"{tick_time.isoformat()} "
-                    f"FUNDING +{START_BALANCE:.2f} total_added={added_funds:.2f} "
-                    f"remaining_funds={total_funds:.2f}"
-                )
-            current_hour = tick_hour
-            hour_peak_equity = balance
-            hour_min_equity = balance
-            unrealized = 0.0
+            if log is not None:
+                log.record(J_FUNDING, tick_time, a=START_BALANCE, b=self.added_funds, c=total_funds)
+            self.current_hour = tick_hour
+            self.hour_peak_equity = balance
+            self.hour_min_equity = balance
             equity = balance
-            peak_equity = max(peak_equity, equity)
+            self.peak_equity = max(self.peak_equity, equity)
+
+        self.balance = balance
+        self.total_funds = total_funds
+        self.last_balance = balance
+        self.last_equity = equity
+        self.last_date = tick_date
+        return margin_call
+
+    def apply_quiet_run(self, quiet: QuietRun) -> None:
+        """Account for ticks scan_quiet_run proved quiet: only grid step and equity tracking move."""
+        state = self.state
+        self.total_ticks += quiet.count
+        state.buy_grid_step = max(state.buy_grid_step, quiet.grid_step)
+        state.sell_grid_step = max(state.sell_grid_step, quiet.grid_step)
+        equity_run = quiet.equity
+        self.hour_peak_equity = max(self.hour_peak_equity, float(equity_run.max()))
+        self.hour_min_equity = min(self.hour_min_equity, float(equity_run.min()))
+        peaks = np.maximum.accumulate(np.concatenate(([self.peak_equity], equity_run)))[1:]
+        self.peak_equity = float(peaks[-1])
+        global_drawdowns = peaks - equity_run
+        worst = int(np.argmax(global_drawdowns))
+        if global_drawdowns[worst] > self.max_drawdown_amount:
+            self.max_drawdown_amount = float(global_drawdowns[worst])
+            self.max_drawdown_rate = self.max_drawdown_amount / START_BALANCE if START_BALANCE > 0.0 else 0.0
+            self.max_drawdown_time = int(quiet.time_ms[worst])
+        rates = global_drawdowns / START_BALANCE if START_BALANCE > 0.0 else np.zeros(quiet.count)
+        over_50 = rates > 0.5
+        self.over_50_count += int(np.count_nonzero(over_50 & ~np.concatenate(([self.over_50_active], over_50[:-1]))))
+        self.over_50_active = bool(over_50[-1])
+        self.last_equity = float(equity_run[-1])
+
+    def replay(self, chunk: SpeculativeChunk, arrays: TickArrays, begin: int) -> bool:
+        """Account side of chunk ticks begin.. once this run's strategy state equals the chunk's there.
+
+        Closed profits, opened lots and exposure come from the chunk and pass through begin_tick
+        and settle as on_tick would hand them over; the strategy end state is then adopted.
+        False on a margin call, which the speculative run did not have to reset its strategy.
+        """
+        stats = self.stats
+        closes = [item for item in chunk.closes if item[0] >= begin]
+        opens = [item for item in chunk.opens if item[0] >= begin]
+        close_at = 0
+        open_at = 0
+        time_ms = arrays.time_ms.tolist()
+        unrealized = chunk.unrealized.tolist()
+        used_margin = chunk.used_margin.tolist()
+        for i in range(begin, len(time_ms)):
+            tick_time = time_ms[i]
+            tick_date, tick_hour = tick_calendar(tick_time)
+            self.begin_tick(tick_time, tick_date, tick_hour)
+            self.total_ticks += 1
+            while close_at < len(closes) and closes[close_at][0] == i:
+                stats.closed_profit += closes[close_at][1]
+                stats.closed_trades += 1
+                close_at += 1
+            while open_at < len(opens) and opens[open_at][0] == i:
+                stats.opened_trades += 1
+                stats.total_open_lots += opens[open_at][1]
+                open_at += 1
+            if self.settle(tick_time, tick_date, tick_hour, unrealized[i], used_margin[i]):
+                return False
+        for mark, durations in chunk.durations:
+            if mark >= begin:
+                for level, duration in durations.items():
+                    self.level_max_duration[level] = max(self.level_max_duration.get(level, 0.0), duration)
+        if begin < len(time_ms):
+            self.last_bid = float(arrays.bid[-1])
+            self.last_ask = float(arrays.ask[-1])
+        self.state = chunk.state
+        self.book = chunk.book
+        self.start_time_by_side = chunk.start_time_by_side
+        return True
 
-        last_balance = balance
-        last_equity = equity
-        last_date = tick_date
+    def day_progress(self, day: int) -> DayProgress:
+        return DayProgress(day, self.last_equity, self.max_drawdown_rate, self.margin_call_detected, self.result())
 
-    # Compute unrealized PnL at end
-    unrealized = 0.0
-    if positions:
-        last_bid = bid
-        last_ask = ask
-        for pos in positions:
-            if pos.side == "buy":
-                unrealized += (last_bid - pos.price) * pos.volume * params.contract_size
-            else:
-                unrealized += (pos.price - last_ask) * pos.volume * params.contract_size
+    def unrealized(self) -> float:
+        return book_exposure(self.book, self.last_bid, self.last_ask, self.params.contract_size)[0]
+
+    def result(self) -> Tuple[float, bool, float, float, float]:
+        """(final_funds, margin_call, max_drawdown_rate, profit, unrealized_loss) as run_backtest returns."""
+        final_funds = self.total_funds + self.balance
+        profit = final_funds - TOTAL_CAPITAL
+        unrealized_loss = max(0.0, -self.unrealized())
+        return final_funds, self.margin_call_detected, self.max_drawdown_rate, profit, unrealized_loss
+
+
+@dataclass
+class DayProgress:
+    """Account state at a day boundary, passed to run_backtest(on_day=...)."""
+
+    day: int  # days replayed so far
+    equity: float
+    max_drawdown_rate: float
+    margin_call: bool
+    result: Tuple[float, bool, float, float, float]  # BacktestRun.result() at this point
+
+
+def abort_on(max_drawdown_rate: Optional[float] = None, margin_call: bool = False) -> Callable[[DayProgress], bool]:
+    """on_day callback ending a run once its drawdown reaches max_drawdown_rate or, optionally, on a margin call."""
+
+    def check(progress: DayProgress) -> bool:
+        if margin_call and progress.margin_call:
+            return True
+        return max_drawdown_rate is not None and progress.max_drawdown_rate >= max_drawdown_rate
+
+    return check
+
+
+@dataclass
+class Checkpointer:
+    """Writes the full replay state to path on every every_days-th day boundary.
+
+    The file is a pickle of the run (SymbolState, PositionBook, Stats, balances, fund and
+    drawdown trackers, level_max_duration), the bar aggregator as it was before the new day's
+    first tick, and the settings it was written with. run_backtest(resume_path=...) continues
+    from the start of that day.
+    """
+
+    path: str
+    every_days: int
+    days: DaySnapshots
+    config: Dict[str, object]
+    start: dt.datetime
+    boundaries: int = 0
+
+    def save(self, run: BacktestRun, tick_time: TickTime) -> None:
+        day = (tick_time if isinstance(tick_time, int) else datetime_to_ms(tick_time)) // MS_PER_DAY
+        bars = self.days.take(day)
+        self.boundaries += 1
+        if bars is None or self.boundaries % self.every_days:
+            return
+        if run.journal is not None:
+            # Log text on disk then ends where the checkpoint resumes.
+            run.journal.flush()
+        write_checkpoint(self.path, self.config, self.start, ms_to_datetime(day * MS_PER_DAY), run, bars)
+
+
+def write_checkpoint(
+    path: str,
+    config: Dict[str, object],
+    start: dt.datetime,
+    resume_from: dt.datetime,
+    run: BacktestRun,
+    bars: BarAggregator,
+) -> None:
+    payload = {
+        "version": CHECKPOINT_VERSION,
+        "config": config,
+        "start": start,
+        "resume_from": resume_from,
+        "run": run,
+        "bars": bars,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def checkpoint_config(
+    symbol: str,
+    fund_mode: int,
+    stop_on_margin_call: bool,
+    params: NM1Params,
+    time_mode: str,
+) -> Dict[str, object]:
+    return {
+        "symbol": symbol,
+        "fund_mode": fund_mode,
+        "stop_on_margin_call": stop_on_margin_call,
+        "params": asdict(params),
+        "time_mode": time_mode,
+    }
+
+
+def load_checkpoint(path: str, config: Dict[str, object]) -> Dict[str, object]:
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    if not isinstance(payload, dict) or payload.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint file: {path}")
+    if payload["config"] != config:
+        raise ValueError(f"Checkpoint {path} was written with different symbol/fund mode/params/time mode")
+    return payload
 
-    final_funds = total_funds + balance
-    profit = final_funds - TOTAL_CAPITAL
-    unrealized_loss = max(0.0, -unrealized)
+
+def open_indicator_blocks(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    params: NM1Params,
+    source: str,
+    prefetch: Optional[PrefetchConfig],
+    tick_cache: Optional[TickCache],
+    tick_arrays: Optional[TickArrays],
+    indicator_cache_dir: Optional[str],
+    bars: Optional[BarAggregator] = None,
+    days: Optional[DaySnapshots] = None,
+) -> Iterator[IndicatorBlock]:
+    """Indicator blocks from a fresh aggregator, or from bars (resumed state) without the cache."""
+    chunks: Iterator[TickChunk]
+    if tick_arrays is not None:
+        # Pre-decoded, unscaled ticks for exactly [start, end] (e.g. a shared-memory day slice).
+        chunks = iter([scale_prices(tick_arrays, params.price_scale)])
+    else:
+        chunks = iter_tick_chunks(
+            data_dir,
+            symbol,
+            start,
+            end,
+            params.price_scale,
+            source,
+            prefetch,
+            params.bi5_price_divisor,
+            tick_cache,
+        )
+    if bars is not None:
+        return iter_indicator_blocks(chunks, bars, days)
+    if indicator_cache_dir is not None:
+        chunk_list = list(chunks)
+        chunks = iter(chunk_list)
+        if all(isinstance(chunk, TickArrays) for chunk in chunk_list):
+            arrays = concat_tick_arrays(chunk_list)
+            columns = load_indicator_columns(indicator_cache_dir, symbol, start, end, arrays)
+            return iter_cached_indicator_blocks(arrays, columns)
+    return iter_indicator_blocks(chunks, make_indicator_aggregator())
+
+
+def print_backtest_setup(run: BacktestRun) -> None:
+    params = run.params
+    state = run.state
+    max_lot = max(state.lot_seq) if state.lot_seq else params.base_lot
+    profit_amount = params.base_lot * params.profit_base * params.contract_size
+    print(
+        "Backtest setup "
+        f"symbol={run.symbol} "
+        f"base_lot={params.base_lot:.2f} "
+        f"max_nanpin_lot={max_lot:.2f} "
+        f"base_profit={params.profit_base:.8f} "
+        f"profit_level_mode={int(params.profit_base_level_mode)} "
+        f"profit_level_step={params.profit_base_level_step:.4f} "
+        f"profit_level_min={params.profit_base_level_min:.4f} "
+        f"profit_amount={profit_amount:.2f} "
+        f"contract_size={params.contract_size:.0f} "
+        f"start_balance={START_BALANCE:.2f} "
+        f"total_capital={TOTAL_CAPITAL:.2f} "
+        f"reserve_funds={run.total_funds:.2f} "
+        f"fund_mode={run.fund_mode} "
+        f"stop_on_margin_call={int(run.stop_on_margin_call)}"
+    )
+
+
+def write_backtest_result(
+    run: BacktestRun,
+    start: dt.datetime,
+    end: dt.datetime,
+    base_lot_override: Optional[float],
+    source: str,
+) -> str:
+    params = run.params
+    stats = run.stats
+    max_drawdown_time = as_datetime(run.max_drawdown_time) if run.max_drawdown_time is not None else None
+    result_json = {
+        "range": {"start": start.isoformat(), "end": end.isoformat()},
+        "symbol": run.symbol,
+        "ticks": run.total_ticks,
+        "opened_trades": stats.opened_trades,
+        "closed_trades": stats.closed_trades,
+        "total_open_lots": round(stats.total_open_lots, 2),
+        "realized_pnl": round(stats.closed_profit, 2),
+        "unrealized_pnl": round(run.unrealized(), 2),
+        "open_positions": len(run.book),
+        "added_funds": round(run.added_funds, 2),
+        "remaining_funds": round(run.total_funds, 2),
+        "final_funds": round(run.result()[0], 2),
+        "max_drawdown": {
+            "time": max_drawdown_time.isoformat() if max_drawdown_time else None,
+            "amount": round(run.max_drawdown_amount, 2),
+            "rate": round(run.max_drawdown_rate, 6),
+        },
+        "drawdown_over_50_count": run.over_50_count,
+        "core_close_max_duration_sec": run.level_max_duration,
+        "settings": {
+            "symbol": run.symbol,
+            "params": asdict(params),
+            "base_lot_override": base_lot_override,
+            "fund_mode": run.fund_mode,
+            "total_capital": TOTAL_CAPITAL,
+            "start_balance": START_BALANCE,
+            "contract_size": params.contract_size,
+            "stop_on_margin_call": run.stop_on_margin_call,
+            "source": source,
+        },
+    }
+    result_path = build_result_path()
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result_json, f, indent=2, sort_keys=True)
+    return result_path
+
+
+def print_backtest_result(run: BacktestRun, start: dt.datetime, end: dt.datetime) -> None:
+    stats = run.stats
+    max_drawdown_time = as_datetime(run.max_drawdown_time) if run.max_drawdown_time is not None else None
+    print("Backtest result")
+    print(f"Range: {start.isoformat()} -> {end.isoformat()}")
+    print(f"Ticks: {run.total_ticks}")
+    print(f"Opened trades: {stats.opened_trades}")
+    print(f"Closed trades: {stats.closed_trades}")
+    print(f"Total open lots: {stats.total_open_lots:.2f}")
+    print(f"Realized PnL: {stats.closed_profit:.2f}")
+    print(f"Unrealized PnL: {run.unrealized():.2f}")
+    print(f"Open positions: {len(run.book)}")
+    print(f"Added funds: {run.added_funds:.2f}")
+    print(f"Remaining funds: {run.total_funds:.2f}")
+    print(f"Final funds: {run.result()[0]:.2f}")
+    if max_drawdown_time is not None:
+        print(
+            f"Max drawdown time: {max_drawdown_time.isoformat()} "
+            f"amount={run.max_drawdown_amount:.2f} "
+            f"rate={run.max_drawdown_rate:.2%}"
+        )
+    else:
+        print("Max drawdown time: N/A amount=0.00 rate=0.00%")
+    print(f"Drawdown over 50% count: {run.over_50_count}")
+    levels = effective_max_levels(run.params)
+    for level in range(1, levels + 1):
+        duration = run.level_max_duration.get(level, 0.0)
+        print(f"Core close max duration L{level}: {duration:.0f}s")
+
+
+def run_backtest(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    debug: bool,
+    base_lot_override: Optional[float],
+    fund_mode: int,
+    stop_on_margin_call: bool = False,
+    log_mode: bool = True,
+    params_override: Optional[Dict[str, object]] = None,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    tick_cache: Optional[TickCache] = None,
+    tick_arrays: Optional[TickArrays] = None,
+    indicator_cache_dir: Optional[str] = None,
+    event_skip: bool = False,
+    journal_path: Optional[str] = None,
+    time_mode: str = "datetime",
+    checkpoint_path: Optional[str] = None,
+    checkpoint_days: int = 1,
+    resume_path: Optional[str] = None,
+    save_state: bool = False,
+    on_day: Optional[Callable[[DayProgress], bool]] = None,
+) -> Tuple[float, bool, float, float, float]:
+    """Replay [start, end] and return BacktestRun.result().
+
+    on_day is called at every day boundary with the account state so far (DayProgress) and
+    ends the replay there by returning True; the result is then that of the days replayed.
+    It cannot be combined with save_state, whose end state must cover the whole range.
+    """
+    if save_state and on_day is not None:
+        raise ValueError("save_state cannot be combined with on_day")
+    params = apply_param_overrides(NM1Params(), params_override)
+    if base_lot_override is not None:
+        params.base_lot = base_lot_override
+    # Events are rendered to stdout in bulk, or kept as binary records with journal_path.
+    journal = EventJournal(journal_path, accounts=log_mode, trades=debug) if log_mode or debug else None
+    run = BacktestRun(params, symbol, fund_mode, stop_on_margin_call, journal)
     if log_mode:
-        result = {
-            "range": {"start": start.isoformat(), "end": end.isoformat()},
-            "symbol": symbol,
-            "ticks": total_ticks,
-            "opened_trades": stats.opened_trades,
-            "closed_trades": stats.closed_trades,
-            "total_open_lots": round(stats.total_open_lots, 2),
-            "realized_pnl": round(stats.closed_profit, 2),
-            "unrealized_pnl": round(unrealized, 2),
-            "open_positions": len(positions),
-            "added_funds": round(added_funds, 2),
-            "remaining_funds": round(total_funds, 2),
-            "final_funds": round(final_funds, 2),
-            "max_drawdown": {
-                "time": max_drawdown_time.isoformat() if max_drawdown_time else None,
-                "amount": round(max_drawdown_amount, 2),
-                "rate": round(max_drawdown_rate, 6),
-            },
-            "drawdown_over_50_count": over_50_count,
-            "core_close_max_duration_sec": level_max_duration,
-            "settings": {
-                "symbol": symbol,
-                "params": asdict(params),
-                "base_lot_override": base_lot_override,
-                "fund_mode": fund_mode,
-                "total_capital": TOTAL_CAPITAL,
-                "start_balance": START_BALANCE,
-                "contract_size": params.contract_size,
-                "stop_on_margin_call": stop_on_margin_call,
-            },
-        }
-        result_path = build_result_path()
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, sort_keys=True)
-        print("Backtest result")
-        print(f"Range: {start.isoformat()} -> {end.isoformat()}")
-        print(f"Ticks: {total_ticks}")
-        print(f"Opened trades: {stats.opened_trades}")
-        print(f"Closed trades: {stats.closed_trades}")
-        print(f"Total open lots: {stats.total_open_lots:.2f}")
-        print(f"Realized PnL: {stats.closed_profit:.2f}")
-        print(f"Unrealized PnL: {unrealized:.2f}")
-        print(f"Open positions: {len(positions)}")
-        print(f"Added funds: {added_funds:.2f}")
-        print(f"Remaining funds: {total_funds:.2f}")
-        print(f"Final funds: {final_funds:.2f}")
-        if max_drawdown_time is not None:
-            print(
-                f"Max drawdown time: {max_drawdown_time.isoformat()} "
-                f"amount={max_drawdown_amount:.2f} "
-                f"rate={max_drawdown_rate:.2%}"
-            )
-        else:
-            print("Max drawdown time: N/A amount=0.00 rate=0.00%")
-        print(f"Drawdown over 50% count: {over_50_count}")
-        levels = effective_max_levels(params)
-        for level in range(1, levels + 1):
-            duration = level_max_duration.get(level, 0.0)
-            print(f"Core close max duration L{level}: {duration:.0f}s")
-    return final_funds, margin_call_detected, max_drawdown_rate, profit, unrealized_loss
+        print_backtest_setup(run)
+
+    bars: Optional[BarAggregator] = None
+    tick_start = start
+    if resume_path is not None or checkpoint_path is not None or save_state:
+        # The indicator cache holds no aggregator state to checkpoint or resume from.
+        config = checkpoint_config(symbol, fund_mode, stop_on_margin_call, params, time_mode)
+        bars = make_indicator_aggregator()
+        if resume_path is not None:
+            resumed = load_checkpoint(resume_path, config)
+            run = resumed["run"]
+            run.attach_journal(journal)
+            bars = resumed["bars"]
+            start = resumed["start"]
+            tick_start = resumed["resume_from"]
+    days = DaySnapshots(bars) if checkpoint_path is not None else None
+    checkpointer = (
+        Checkpointer(checkpoint_path, max(1, checkpoint_days), days, config, start)
+        if checkpoint_path is not None
+        else None
+    )
+    blocks = open_indicator_blocks(
+        data_dir,
+        symbol,
+        tick_start,
+        end,
+        params,
+        source,
+        prefetch,
+        tick_cache,
+        tick_arrays,
+        indicator_cache_dir,
+        bars,
+        days,
+    )
+    int_time = time_mode == "int"
+    cursor = EventTickCursor(blocks, int_time=int_time) if event_skip else None
+    ticks = iter(cursor) if cursor is not None else iter_block_indicator_ticks(blocks, int_time)
+    if run.stopped:
+        # Resumed from the end state of a run that stopped on a margin call.
+        ticks = iter(())
+    days_done = 0
+    replayed_end = end
+    for tick_time, bid, ask, indicators in ticks:
+        tick_date, tick_hour = tick_calendar(tick_time)
+        if run.last_date is not None and tick_date != run.last_date:
+            if checkpointer is not None:
+                checkpointer.save(run, tick_time)
+            if on_day is not None:
+                days_done += 1
+                if on_day(run.day_progress(days_done)):
+                    if log_mode:
+                        print(f"Aborted after {days_done} days")
+                    # The result covers the days replayed, up to the end of the one before this tick.
+                    boundary = as_datetime(tick_time)
+                    replayed_end = dt.datetime.combine(boundary.date(), dt.time()) - dt.timedelta(milliseconds=1)
+                    break
+        run.on_tick(tick_time, tick_date, tick_hour, bid, ask, indicators)
+        if run.stopped:
+            break
+        quiet = cursor.find_quiet_run(run.state, run.book, run.balance) if cursor is not None else None
+        if quiet is not None:
+            run.apply_quiet_run(quiet)
+            cursor.skip(quiet.count)
+
+    if journal is not None:
+        journal.flush()
+    if log_mode:
+        result_path = write_backtest_result(run, start, replayed_end, base_lot_override, source)
+        if save_state:
+            # End-of-run state next to the result; --resume with a later --to replays only the new ticks.
+            state_path = f"{os.path.splitext(result_path)[0]}.state.pkl"
+            write_checkpoint(state_path, config, start, end + dt.timedelta(microseconds=1), run, bars)
+        print_backtest_result(run, start, replayed_end)
+        if save_state:
+            print(f"State: {state_path}")
+    return run.result()
+
+
+def run_backtest_batch(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    fund_mode: int,
+    params_overrides: List[Optional[Dict[str, object]]],
+    stop_on_margin_call: bool = False,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    tick_cache: Optional[TickCache] = None,
+    tick_arrays: Optional[TickArrays] = None,
+    indicator_cache_dir: Optional[str] = None,
+    event_skip: bool = False,
+    time_mode: str = "datetime",
+) -> List[Tuple[float, bool, float, float, float]]:
+    """run_backtest(log_mode=False) for several parameter sets in one lockstep pass over the ticks.
+
+    Decoding, ATR/ADX and the per-tick datetime/date/hour are done once; each set keeps its own
+    state, position book and account. wake[m] is the next block index set m must process, so a
+    tick is only materialised when some set needs it (every tick unless event_skip).
+    """
+    params_list = [apply_param_overrides(NM1Params(), overrides) for overrides in params_overrides]
+    if not params_list:
+        return []
+    first = params_list[0]
+    for params in params_list[1:]:
+        if params.price_scale != first.price_scale or params.bi5_price_divisor != first.bi5_price_divisor:
+            raise ValueError("run_backtest_batch needs the same price_scale/bi5_price_divisor for every set")
+    runs = [BacktestRun(params, symbol, fund_mode, stop_on_margin_call) for params in params_list]
+    scanners = [QuietScanner() for _ in runs]
+    blocks = open_indicator_blocks(
+        data_dir, symbol, start, end, first, source, prefetch, tick_cache, tick_arrays, indicator_cache_dir
+    )
+    int_time = time_mode == "int"
+    for block, columns in blocks:
+        if columns is None:
+            for tick_time, bid, ask, indicators in iter_block_indicator_ticks(iter([(block, None)]), int_time):
+                tick_date, tick_hour = tick_calendar(tick_time)
+                for run in runs:
+                    if not run.stopped:
+                        run.on_tick(tick_time, tick_date, tick_hour, bid, ask, indicators)
+            continue
+        n = len(block)
+        wake = np.array([n if run.stopped else 0 for run in runs], dtype=np.int64)
+        while True:
+            i = int(wake.min())
+            if i >= n:
+                break
+            time_ms = int(block.time_ms[i])
+            tick_time = time_ms if int_time else ms_to_datetime(time_ms)
+            tick_date, tick_hour = tick_calendar(tick_time)
+            bid = float(block.bid[i])
+            ask = float(block.ask[i])
+            indicators = columns[i].tolist()
+            for m in np.flatnonzero(wake == i).tolist():
+                run = runs[m]
+                run.on_tick(tick_time, tick_date, tick_hour, bid, ask, indicators)
+                if run.stopped:
+                    wake[m] = n
+                    continue
+                next_index = i + 1
+                if event_skip:
+                    quiet = scanners[m].find(run.state, run.book, run.balance, block, columns, next_index)
+                    if quiet is not None:
+                        run.apply_quiet_run(quiet)
+                        next_index += quiet.count
+                wake[m] = next_index
+    return [run.result() for run in runs]
+
+
+def load_shared_day_ticks(
+    data_dir: str,
+    symbol: str,
+    ranges: List[Tuple[dt.datetime, dt.datetime]],
+    source: str,
+    prefetch: Optional[PrefetchConfig],
+    bi5_divisor: float,
+) -> Optional[SharedTicks]:
+    loaders = [
+        functools.partial(load_tick_range, data_dir, symbol, day_start, day_end, 1.0, source, None, bi5_divisor)
+        for day_start, day_end in ranges
+    ]
+    parts: List[TickArrays] = []
+    for arrays in iter_prefetched(loaders, prefetch):
+        if arrays is None:
+            return None
+        parts.append(arrays)
+    return SharedTicks.create(parts)
 
 
 def run_daily_backtest_task(args: Tuple[
@@ -1758,6 +3085,10 @@ def run_daily_backtest_task(args: Tuple[
     int,
     bool,
     Optional[Dict[str, object]],
+    str,
+    Optional[Tuple[SharedTicksHandle, int]],
+    bool,
+    str,
 ]) -> Dict[str, object]:
     (
         data_dir,
@@ -1769,7 +3100,15 @@ def run_daily_backtest_task(args: Tuple[
         fund_mode,
         stop_on_margin_call,
         params_override,
+        source,
+        shared_part,
+        event_skip,
+        time_mode,
     ) = args
+    tick_arrays = None
+    if shared_part is not None:
+        handle, part_index = shared_part
+        tick_arrays = attach_shared_ticks(handle).part(part_index)
     final_funds, margin_call_detected, max_drawdown_rate, profit, unrealized_loss = run_backtest(
         data_dir,
         symbol,
@@ -1781,6 +3120,10 @@ def run_daily_backtest_task(args: Tuple[
         stop_on_margin_call=stop_on_margin_call,
         log_mode=False,
         params_override=params_override,
+        source=source,
+        tick_arrays=tick_arrays,
+        event_skip=event_skip,
+        time_mode=time_mode,
     )
     return {
         "date": start.date().isoformat(),
@@ -1793,6 +3136,274 @@ def run_daily_backtest_task(args: Tuple[
     }
 
 
+STRATEGY_FINGERPRINT_SKIP = ("params", "symbol", "point_small", "point_large")  # fixed per run
+
+
+def strategy_fingerprint(
+    state: SymbolState,
+    book: PositionBook,
+    start_time_by_side: List[Optional[TickTime]],
+) -> bytes:
+    """What process_tick carries from one tick to the next, as bytes equal only for equal states.
+
+    start_time only matters until the initial entry. Bar indicators are left out: stitched
+    chunks get them from one shared aggregator pass, so they agree by construction.
+    """
+    values: List[object] = []
+    for item in fields(SymbolState):
+        if item.name in STRATEGY_FINGERPRINT_SKIP:
+            continue
+        value = getattr(state, item.name)
+        if item.name == "start_time" and state.initial_started:
+            value = None
+        elif item.name in ("flex_buy_refs", "flex_sell_refs"):
+            value = [astuple(ref) for ref in value]
+        values.append(value)
+    n = book.count
+    values.append((book.side[:n], book.flex[:n], book.level[:n], book.volume[:n], book.price[:n], book.levels_dirty))
+    values.extend(astuple(totals) for totals in book.totals)
+    values.append(list(start_time_by_side))
+    return pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class StatsRecorder:
+    """Stats stand-in for speculative chunks, recording each addition with its tick index.
+
+    closed_profit and total_open_lots read as 0.0, so `stats.closed_profit += profit` stores the
+    profit itself; replaying the additions in order onto the true totals gives the same floats.
+    """
+
+    def __init__(self) -> None:
+        self.tick = 0
+        self.closed_trades = 0
+        self.opened_trades = 0
+        self.closes: List[Tuple[int, float]] = []
+        self.opens: List[Tuple[int, float]] = []
+
+    @property
+    def closed_profit(self) -> float:
+        return 0.0
+
+    @closed_profit.setter
+    def closed_profit(self, value: float) -> None:
+        self.closes.append((self.tick, value))
+
+    @property
+    def total_open_lots(self) -> float:
+        return 0.0
+
+    @total_open_lots.setter
+    def total_open_lots(self, value: float) -> None:
+        self.opens.append((self.tick, value))
+
+
+@dataclass
+class SpeculativeChunk:
+    """Strategy-only replay of one chunk from a guessed start state (run_speculative_chunk).
+
+    Indexes are chunk tick indexes. marks holds strategy_fingerprint() before the first tick of
+    each hour and durations the core close durations from each mark on; closes/opens are the
+    closed_profit/total_open_lots additions in order; unrealized/used_margin are the exposure
+    after each tick. state/book/start_time_by_side are the strategy state at the chunk end.
+    """
+
+    marks: Dict[int, bytes]
+    durations: List[Tuple[int, Dict[int, float]]]
+    closes: List[Tuple[int, float]]
+    opens: List[Tuple[int, float]]
+    unrealized: np.ndarray
+    used_margin: np.ndarray
+    state: SymbolState
+    book: PositionBook
+    start_time_by_side: List[Optional[TickTime]]
+
+
+def run_speculative_chunk(
+    args: Tuple[SharedTicksHandle, int, int, int, BarAggregator, NM1Params, str],
+) -> SpeculativeChunk:
+    """Replay shared day parts warm..end - 1, recording parts first.. as a SpeculativeChunk.
+
+    bars is the aggregator state before part warm. A run starting at the first part starts
+    from the true initial state; any other assumes both baskets flat with the initial entry
+    done, and the warm-up parts give it time to fall in step with the sequential run.
+    """
+    handle, warm, first, end, bars, params, symbol = args
+    shared = attach_shared_ticks(handle)
+    arrays = scale_prices(shared.parts(warm, end), params.price_scale)
+    begin = int(shared.offsets[first] - shared.offsets[warm])
+    columns = bars.update_block(arrays)
+    state = init_symbol_state(params, symbol)
+    state.initial_started = warm > 0
+    book = PositionBook()
+    start_time_by_side: List[Optional[TickTime]] = [None, None]
+    warm_stats = Stats()
+    durations: Dict[int, float] = {}
+    stats = StatsRecorder()
+    marks: Dict[int, bytes] = {}
+    mark_durations: List[Tuple[int, Dict[int, float]]] = []
+    unrealized = np.zeros(len(arrays) - begin, dtype=np.float64)
+    used_margin = np.zeros(len(arrays) - begin, dtype=np.float64)
+    contract_size = params.contract_size
+    hour: Optional[int] = None
+    rows = zip(arrays.time_ms.tolist(), arrays.bid.tolist(), arrays.ask.tolist(), columns.tolist())
+    for index, (tick_time, bid, ask, indicators) in enumerate(rows):
+        i = index - begin
+        if i < 0:
+            process_tick(state, book, warm_stats, tick_time, bid, ask, *indicators, None, start_time_by_side, durations)
+            continue
+        tick_hour = tick_time - tick_time % MS_PER_HOUR
+        if tick_hour != hour:
+            hour = tick_hour
+            marks[i] = strategy_fingerprint(state, book, start_time_by_side)
+            durations = {}
+            mark_durations.append((i, durations))
+        stats.tick = i
+        process_tick(state, book, stats, tick_time, bid, ask, *indicators, None, start_time_by_side, durations)
+        unrealized[i], used_margin[i] = book_exposure(book, bid, ask, contract_size)
+    return SpeculativeChunk(
+        marks,
+        mark_durations,
+        stats.closes,
+        stats.opens,
+        unrealized,
+        used_margin,
+        state,
+        book,
+        start_time_by_side,
+    )
+
+
+def advance_chunk(run: BacktestRun, arrays: TickArrays, bars: BarAggregator, marks: Dict[int, bytes]) -> Optional[int]:
+    """Step run through the chunk ticks until its strategy state equals a mark; that index, else None."""
+    time_ms = arrays.time_ms.tolist()
+    bid = arrays.bid.tolist()
+    ask = arrays.ask.tolist()
+    rows: Optional[List[List[float]]] = None
+    for i, tick_time in enumerate(time_ms):
+        mark = marks.get(i)
+        if mark is not None and mark == strategy_fingerprint(run.state, run.book, run.start_time_by_side):
+            return i
+        if rows is None:
+            rows = copy.deepcopy(bars).update_block(arrays).tolist()
+        tick_date, tick_hour = tick_calendar(tick_time)
+        run.on_tick(tick_time, tick_date, tick_hour, bid[i], ask[i], rows[i])
+        if run.stopped:
+            return None
+    return None
+
+
+def stitch_chunk(
+    run: BacktestRun,
+    chunk: SpeculativeChunk,
+    arrays: TickArrays,
+    bars: BarAggregator,
+) -> Tuple[BacktestRun, Optional[int]]:
+    """Carry the true run over one chunk; also returns the time (epoch ms) the chunk was stitched at."""
+    origin = copy.deepcopy(run)
+    index = advance_chunk(run, arrays, bars, chunk.marks)
+    if index is None:
+        return run, None
+    if run.replay(chunk, arrays, index):
+        return run, int(arrays.time_ms[index])
+    # A margin call the speculative run never saw: replay the chunk tick by tick.
+    advance_chunk(origin, arrays, bars, {})
+    return origin, None
+
+
+def run_backtest_stitched(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    base_lot_override: Optional[float],
+    fund_mode: int,
+    stop_on_margin_call: bool = False,
+    log_mode: bool = True,
+    params_override: Optional[Dict[str, object]] = None,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    workers: int = 8,
+    chunk_days: int = 5,
+    warmup_days: int = 1,
+) -> Tuple[float, bool, float, float, float]:
+    """run_backtest(time_mode="int") with the strategy replayed chunk by chunk in a process pool.
+
+    Every chunk of chunk_days days is replayed speculatively (run_speculative_chunk), starting
+    warmup_days earlier from flat baskets. Indicator state at each day start comes from one
+    aggregator pass in the parent, so indicators are exact everywhere. The parent then carries
+    the true run into each chunk until its strategy state equals the speculative one at an
+    hour mark (usually at once, both baskets being flat at some point of the warm-up) and only
+    replays the account side from there. Chunks that never match, or that hit a margin call
+    the speculative run did not, are replayed tick by tick, so the results equal run_backtest.
+    """
+    params = apply_param_overrides(NM1Params(), params_override)
+    if base_lot_override is not None:
+        params.base_lot = base_lot_override
+    days = build_daily_ranges(start, end)
+    shared = load_shared_day_ticks(data_dir, symbol, days, source, prefetch, params.bi5_price_divisor)
+    if shared is None:
+        if log_mode:
+            print("Shared ticks unavailable (sub-millisecond timestamps); running sequentially")
+        return run_backtest(
+            data_dir,
+            symbol,
+            start,
+            end,
+            False,
+            base_lot_override,
+            fund_mode,
+            stop_on_margin_call=stop_on_margin_call,
+            log_mode=log_mode,
+            params_override=params_override,
+            source=source,
+            prefetch=prefetch,
+            time_mode="int",
+        )
+    run = BacktestRun(params, symbol, fund_mode, stop_on_margin_call)
+    if log_mode:
+        print_backtest_setup(run)
+    chunk_days = max(1, chunk_days)
+    try:
+        bars = make_indicator_aggregator()
+        day_bars: List[BarAggregator] = []
+        for index in range(len(days)):
+            day_bars.append(copy.deepcopy(bars))
+            bars.update_block(scale_prices(shared.part(index), params.price_scale))
+        tasks = [
+            (shared.handle, max(0, first - max(0, warmup_days)), first, min(len(days), first + chunk_days))
+            for first in range(0, len(days), chunk_days)
+        ]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [
+                executor.submit(run_speculative_chunk, (handle, warm, first, last, day_bars[warm], params, symbol))
+                for handle, warm, first, last in tasks
+            ]
+            for future, (_handle, _warm, first, last) in zip(futures, tasks):
+                # Tick arrays are views of the shared block; none may outlive the loop body.
+                run, stitched = stitch_chunk(
+                    run,
+                    future.result(),
+                    scale_prices(shared.parts(first, last), params.price_scale),
+                    day_bars[first],
+                )
+                if log_mode:
+                    print(
+                        f"Chunk {days[first][0].date().isoformat()} -> {days[last - 1][1].date().isoformat()} "
+                        f"ticks={int(shared.offsets[last] - shared.offsets[first])} "
+                        f"stitched_at={ms_to_datetime(stitched).isoformat() if stitched is not None else 'none'}"
+                    )
+                if run.stopped:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    finally:
+        shared.unlink()
+    if log_mode:
+        write_backtest_result(run, start, end, base_lot_override, source)
+        print_backtest_result(run, start, end)
+    return run.result()
+
+
 def optimize_base_lot(
     data_dir: str,
     symbol: str,
@@ -1802,7 +3413,15 @@ def optimize_base_lot(
     fund_mode: int,
     stop_on_margin_call: bool,
     params_override: Optional[Dict[str, object]] = None,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    tick_cache_mb: int = DEFAULT_TICK_CACHE_MB,
+    indicator_cache_dir: Optional[str] = None,
+    event_skip: bool = False,
+    time_mode: str = "int",
 ) -> None:
+    # Every lot step replays the same range, so decode it once and keep the arrays in memory.
+    tick_cache = TickCache(max_bytes=tick_cache_mb * 1024 * 1024) if tick_cache_mb > 0 else None
     lot = OPTIMIZE_START_LOT
     prev_final: Optional[float] = None
     best_lot = lot
@@ -1819,6 +3438,12 @@ def optimize_base_lot(
             stop_on_margin_call=stop_on_margin_call,
             log_mode=False,
             params_override=params_override,
+            source=source,
+            prefetch=prefetch,
+            tick_cache=tick_cache,
+            indicator_cache_dir=indicator_cache_dir,
+            event_skip=event_skip,
+            time_mode=time_mode,
         )
         print(f"Optimize lot={lot:.2f} final_funds={final_funds:.2f}")
         if final_funds > best_final:
@@ -1842,6 +3467,178 @@ def optimize_base_lot(
     print(f"Best lot={best_lot:.2f} best_final_funds={best_final:.2f}")
 
 
+def run_lot_task(args: Tuple[
+    str,
+    str,
+    dt.datetime,
+    dt.datetime,
+    float,
+    int,
+    bool,
+    Optional[Dict[str, object]],
+    str,
+    Optional[Tuple[SharedTicksHandle, int]],
+    Optional[str],
+    bool,
+    str,
+]) -> Tuple[float, bool, float, float, float]:
+    (
+        data_dir,
+        symbol,
+        start,
+        end,
+        lot,
+        fund_mode,
+        stop_on_margin_call,
+        params_override,
+        source,
+        shared_part,
+        indicator_cache_dir,
+        event_skip,
+        time_mode,
+    ) = args
+    tick_arrays = None
+    if shared_part is not None:
+        handle, part_index = shared_part
+        tick_arrays = attach_shared_ticks(handle).part(part_index)
+    return run_backtest(
+        data_dir,
+        symbol,
+        start,
+        end,
+        False,
+        lot,
+        fund_mode,
+        stop_on_margin_call=stop_on_margin_call,
+        log_mode=False,
+        params_override=params_override,
+        source=source,
+        tick_arrays=tick_arrays,
+        indicator_cache_dir=indicator_cache_dir,
+        event_skip=event_skip,
+        time_mode=time_mode,
+    )
+
+
+def optimize_lot_at(index: int) -> float:
+    return round(OPTIMIZE_START_LOT + index * OPTIMIZE_STEP, 2)
+
+
+def optimize_base_lot_bracket(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    fund_mode: int,
+    stop_on_margin_call: bool,
+    params_override: Optional[Dict[str, object]] = None,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    indicator_cache_dir: Optional[str] = None,
+    event_skip: bool = False,
+    time_mode: str = "int",
+    workers: int = 8,
+) -> None:
+    """optimize_base_lot's search with up to `workers` lots replayed at once in a process pool.
+
+    The linear scan stops at the first lot index whose final funds fall below the previous
+    lot's (or that hits a margin call, with stop_on_margin_call) and keeps the best lot up to
+    there. Below the first margin call a unimodal final funds curve has that condition false
+    before the stop and true after it, so the first lot that drops or has any margin call is
+    bracketed by probes at doubling strides and the bracket is split evenly until it is one
+    step wide (each probe also replays the lot below it). Past a margin call that did not stop
+    the scan, refunded runs make the curve irregular, so the search goes on with batches of
+    consecutive lots exactly like the linear scan.
+    """
+    load_params = apply_param_overrides(NM1Params(), params_override)
+    shared_ticks = load_shared_day_ticks(
+        data_dir, symbol, [(start, end)], source, prefetch, load_params.bi5_price_divisor
+    )
+    worker_count = max(1, workers)
+    pairs = max(1, worker_count // 2)
+    results: Dict[int, Tuple[float, bool]] = {}
+
+    def stops(index: int) -> bool:
+        final_funds, margin_call_detected = results[index]
+        if margin_call_detected and stop_on_margin_call:
+            return True
+        return index > 0 and final_funds < results[index - 1][0]
+
+    def bounds(index: int) -> bool:
+        return results[index][1] or stops(index)
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count) as executor:
+
+            def evaluate(indexes: List[int]) -> None:
+                wanted = sorted(set(index for index in indexes if index >= 0) - results.keys())
+                tasks = [
+                    (
+                        data_dir,
+                        symbol,
+                        start,
+                        end,
+                        optimize_lot_at(index),
+                        fund_mode,
+                        stop_on_margin_call,
+                        params_override,
+                        source,
+                        (shared_ticks.handle, 0) if shared_ticks is not None else None,
+                        indicator_cache_dir,
+                        event_skip,
+                        time_mode,
+                    )
+                    for index in wanted
+                ]
+                for index, result in zip(wanted, executor.map(run_lot_task, tasks)):
+                    results[index] = (result[0], result[1])
+                    print(f"Optimize lot={optimize_lot_at(index):.2f} final_funds={result[0]:.2f}")
+
+            lo = -1  # the first bounding index is above lo
+            hi: Optional[int] = None  # ... and at most hi
+            stride = 2
+            while hi is None or hi - lo > 1:
+                if hi is None:
+                    probes = [lo + stride * (k + 1) for k in range(pairs)]
+                    stride *= 2
+                elif hi - lo - 1 <= worker_count:
+                    probes = list(range(lo + 1, hi))
+                else:
+                    probes = [lo + (hi - lo) * (k + 1) // (pairs + 1) for k in range(pairs)]
+                evaluate([index for probe in probes for index in (probe - 1, probe)])
+                for index in sorted(results):
+                    if index <= lo or (hi is not None and index >= hi) or (index > 0 and index - 1 not in results):
+                        continue
+                    if bounds(index):
+                        hi = index
+                        break
+                    lo = index
+                print(
+                    f"Optimize bracket lot={optimize_lot_at(lo) if lo >= 0 else 0.0:.2f}"
+                    f"..{optimize_lot_at(hi) if hi is not None else float('inf'):.2f}"
+                )
+            stop = hi
+            while not stops(stop):
+                batch = list(range(stop + 1, stop + 1 + worker_count))
+                evaluate(batch)
+                stop = next((index for index in batch if stops(index)), batch[-1])
+    finally:
+        if shared_ticks is not None:
+            shared_ticks.unlink()
+    final_funds, margin_call_detected = results[stop]
+    if margin_call_detected and stop_on_margin_call:
+        print(f"Optimization stop (margin call) at lot={optimize_lot_at(stop):.2f} final_funds={final_funds:.2f}")
+    else:
+        print(
+            f"Optimization stop at lot={optimize_lot_at(stop):.2f} "
+            f"prev_final={results[stop - 1][0]:.2f} "
+            f"final_funds={final_funds:.2f}"
+        )
+    # max() keeps the first (lowest) lot among equal final funds, as the linear scan does.
+    best = max((index for index in sorted(results) if index <= stop), key=lambda index: results[index][0])
+    print(f"Best lot={optimize_lot_at(best):.2f} best_final_funds={results[best][0]:.2f}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="NM1 backtest")
     parser.add_argument("--symbol", default=DEFAULT_SYMBOL, help="Symbol (e.g. XAUUSD, BTCUSD)")
@@ -1852,7 +3649,77 @@ def main() -> None:
     )
     parser.add_argument("--from", dest="from_dt", help="Start date/time (YYYY-MM-DD or ISO)")
     parser.add_argument("--to", dest="to_dt", help="End date/time (YYYY-MM-DD or ISO)")
+    parser.add_argument(
+        "--source",
+        choices=TICK_SOURCES,
+        default="csv",
+        help=(
+            "Tick source: csv=parse csv.gz files, store=memory-mapped .ticks files (see tick_store.py), "
+            "bi5=hourly Dukascopy cache (<data-dir>/<Y>/<MM>/<DD>/<HH>h_ticks.bi5)"
+        ),
+    )
+    parser.add_argument(
+        "--prefetch-days",
+        type=int,
+        default=DEFAULT_PREFETCH_DAYS,
+        help="Days decoded ahead in background threads during replay (0=off)",
+    )
+    parser.add_argument(
+        "--prefetch-max-mb",
+        type=int,
+        default=DEFAULT_PREFETCH_MAX_MB,
+        help="Memory ceiling for prefetched day blocks in MB",
+    )
+    parser.add_argument(
+        "--tick-cache-mb",
+        type=int,
+        default=DEFAULT_TICK_CACHE_MB,
+        help="In-memory tick cache size for --optimize-lot sweeps in MB (0=off)",
+    )
+    parser.add_argument(
+        "--indicator-cache-dir",
+        help="Directory for memory-mapped per-tick ATR/ADX columns reused across runs (default: off)",
+    )
+    parser.add_argument(
+        "--event-skip",
+        action="store_true",
+        help="Jump over ticks on which no entry, exit, nanpin or margin call can trigger (same results, faster)",
+    )
     parser.add_argument("--debug", action="store_true", help="Print trade-level debug logs")
+    parser.add_argument(
+        "--time-mode",
+        choices=TIME_MODES,
+        help=(
+            "Engine timestamps: datetime objects, or int epoch ms with integer hour/day keys "
+            "(default: int for --optimize-lot, datetime otherwise)"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Save the full backtest state to this file at day boundaries (resume with --resume)",
+    )
+    parser.add_argument(
+        "--checkpoint-days",
+        type=int,
+        default=1,
+        help="Write --checkpoint every N day boundaries",
+    )
+    parser.add_argument(
+        "--resume",
+        help=(
+            "Continue from a --checkpoint or --save-state file (same symbol/fund mode/params/time mode) "
+            "up to --to"
+        ),
+    )
+    parser.add_argument(
+        "--save-state",
+        action="store_true",
+        help="Store the end-of-run state next to the result JSON, to extend the run later with --resume",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Write log/debug events to this binary journal instead of stdout (render with event_journal.py)",
+    )
     parser.add_argument("--base-lot", type=float, help="Override base lot size")
     parser.add_argument(
         "--fund-mode",
@@ -1866,6 +3733,15 @@ def main() -> None:
         action="store_true",
         help="Run lot optimization from 0.03 in 0.01 steps until final funds decrease",
     )
+    parser.add_argument(
+        "--optimize-search",
+        choices=["linear", "bracket"],
+        default="linear",
+        help=(
+            "Lot search for --optimize-lot: linear=one lot after another, bracket=--workers lots at once "
+            "narrowing the bracket around the peak (same best lot on a unimodal final funds curve)"
+        ),
+    )
     parser.add_argument(
         "--optimize-stop-on-margin-call",
         action="store_true",
@@ -1896,11 +3772,41 @@ def main() -> None:
         action="store_true",
         help="Split range by day and run backtests in parallel",
     )
+    parser.add_argument(
+        "--parallel-exact",
+        action="store_true",
+        help=(
+            "Replay the range in chunks on all workers and stitch them into the continuous run "
+            "(same results as a sequential run; int time mode, no hourly/debug log)"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-days",
+        type=int,
+        default=5,
+        help="Days per --parallel-exact chunk",
+    )
+    parser.add_argument(
+        "--warmup-days",
+        type=int,
+        default=1,
+        help="Days each --parallel-exact chunk replays ahead of its start to fall in step with the run",
+    )
     parser.add_argument(
         "--workers",
         type=int,
         default=8,
-        help="Parallel worker count for --parallel-days",
+        help="Parallel worker count for --parallel-days/--parallel-exact/--optimize-search bracket",
+    )
+    parser.add_argument(
+        "--check-data",
+        action="store_true",
+        help="Print data-quality warnings for the range from the tick catalog before running",
+    )
+    parser.add_argument(
+        "--shared-ticks",
+        action="store_true",
+        help="With --parallel-days, decode the range once in the parent and share it with workers via shared memory",
     )
     args = parser.parse_args()
 
@@ -1910,12 +3816,18 @@ def main() -> None:
     start = parse_user_datetime(args.from_dt, is_end=False)
     end = parse_user_datetime(args.to_dt, is_end=True)
     if start is None or end is None:
-        default_start, default_end = build_default_range(data_dir, symbol)
+        default_start, default_end = build_default_range(data_dir, symbol, args.source)
         start = start or default_start
         end = end or default_end
 
     if start > end:
         raise SystemExit("--from must be <= --to")
+    if args.check_data:
+        catalog = refresh_catalog(data_dir, symbol, args.source)
+        warnings = check_catalog(catalog, start.date(), end.date())
+        for warning in warnings:
+            print(f"[WARN] {warning}")
+        print(f"Data check: {len(warnings)} warnings")
 
     params_override: Dict[str, object] = {}
     if args.profit_base_level_mode:
@@ -1931,22 +3843,80 @@ def main() -> None:
     if not params_override:
         params_override = None
 
+    prefetch = PrefetchConfig(days=max(0, args.prefetch_days), max_bytes=max(1, args.prefetch_max_mb) * 1024 * 1024)
+    time_mode = args.time_mode or ("int" if args.optimize_lot else "datetime")
+
+    if (args.checkpoint or args.resume or args.save_state) and (
+        args.optimize_lot or args.parallel_days or args.parallel_exact
+    ):
+        raise SystemExit("--checkpoint/--resume/--save-state only apply to a single backtest run")
+    if args.parallel_exact and (args.optimize_lot or args.parallel_days or args.debug or args.journal):
+        raise SystemExit("--parallel-exact cannot be used with --optimize-lot/--parallel-days/--debug/--journal")
     if args.optimize_lot:
         if args.parallel_days:
             raise SystemExit("--parallel-days cannot be used with --optimize-lot")
-        optimize_base_lot(
+        if args.optimize_search == "bracket":
+            optimize_base_lot_bracket(
+                data_dir,
+                symbol,
+                start,
+                end,
+                args.fund_mode,
+                args.optimize_stop_on_margin_call or args.stop_on_margin_call,
+                params_override=params_override,
+                source=args.source,
+                prefetch=prefetch,
+                indicator_cache_dir=args.indicator_cache_dir,
+                event_skip=args.event_skip,
+                time_mode=time_mode,
+                workers=args.workers,
+            )
+        else:
+            optimize_base_lot(
+                data_dir,
+                symbol,
+                start,
+                end,
+                args.debug,
+                args.fund_mode,
+                args.optimize_stop_on_margin_call or args.stop_on_margin_call,
+                params_override=params_override,
+                source=args.source,
+                prefetch=prefetch,
+                tick_cache_mb=args.tick_cache_mb,
+                indicator_cache_dir=args.indicator_cache_dir,
+                event_skip=args.event_skip,
+                time_mode=time_mode,
+            )
+    elif args.parallel_exact:
+        run_backtest_stitched(
             data_dir,
             symbol,
             start,
             end,
-            args.debug,
+            args.base_lot,
             args.fund_mode,
-            args.optimize_stop_on_margin_call or args.stop_on_margin_call,
+            stop_on_margin_call=args.stop_on_margin_call,
             params_override=params_override,
+            source=args.source,
+            prefetch=prefetch,
+            workers=args.workers,
+            chunk_days=args.chunk_days,
+            warmup_days=args.warmup_days,
         )
     elif args.parallel_days:
         ranges = build_daily_ranges(start, end)
         worker_count = max(1, args.workers)
+        shared_ticks: Optional[SharedTicks] = None
+        if args.shared_ticks:
+            load_params = apply_param_overrides(NM1Params(), params_override)
+            shared_ticks = load_shared_day_ticks(
+                data_dir, symbol, ranges, args.source, prefetch, load_params.bi5_price_divisor
+            )
+            if shared_ticks is None:
+                print("Shared ticks unavailable (sub-millisecond timestamps); workers read files directly")
+            else:
+                print(f"Shared ticks: {shared_ticks.handle.rows} rows in {shared_ticks.handle.name}")
         tasks = [
             (
                 data_dir,
@@ -1958,20 +3928,28 @@ def main() -> None:
                 args.fund_mode,
                 args.stop_on_margin_call,
                 params_override,
+                args.source,
+                (shared_ticks.handle, index) if shared_ticks is not None else None,
+                args.event_skip,
+                time_mode,
             )
-            for day_start, day_end in ranges
+            for index, (day_start, day_end) in enumerate(ranges)
         ]
         results: List[Dict[str, object]] = []
-        with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count) as executor:
-            futures = [executor.submit(run_daily_backtest_task, task) for task in tasks]
-            for future in concurrent.futures.as_completed(futures):
-                item = future.result()
-                results.append(item)
-                print(
-                    f"{item['date']} final_funds={item['final_funds']:.2f} "
-                    f"margin_call={int(item['margin_call'])} "
-                    f"max_drawdown_rate={item['max_drawdown_rate']:.6f}"
-                )
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count) as executor:
+                futures = [executor.submit(run_daily_backtest_task, task) for task in tasks]
+                for future in concurrent.futures.as_completed(futures):
+                    item = future.result()
+                    results.append(item)
+                    print(
+                        f"{item['date']} final_funds={item['final_funds']:.2f} "
+                        f"margin_call={int(item['margin_call'])} "
+                        f"max_drawdown_rate={item['max_drawdown_rate']:.6f}"
+                    )
+        finally:
+            if shared_ticks is not None:
+                shared_ticks.unlink()
         summary = {
             "range": {"start": start.isoformat(), "end": end.isoformat()},
             "workers": worker_count,
@@ -1995,6 +3973,16 @@ def main() -> None:
             args.fund_mode,
             stop_on_margin_call=args.stop_on_margin_call,
             params_override=params_override,
+            source=args.source,
+            prefetch=prefetch,
+            indicator_cache_dir=args.indicator_cache_dir,
+            event_skip=args.event_skip,
+            journal_path=args.journal,
+            time_mode=time_mode,
+            checkpoint_path=args.checkpoint,
+            checkpoint_days=args.checkpoint_days,
+            resume_path=args.resume,
+            save_state=args.save_state,
         )
 
 
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Buffered event journal for the NM1 backtester.
+
+Trade events (--debug) and account events (log mode) are appended as fixed-size
+records to a preallocated numpy buffer and written out in bulk: either rendered
+to stdout in the historical text format, or, with a journal path, appended
+unformatted to a binary file (8 byte magic followed by JOURNAL_DTYPE records).
+`python event_journal.py <file>` renders a binary journal back to text.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import sys
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+JOURNAL_MAGIC = b"NM1JRNL1"
+JOURNAL_CAPACITY = 65536
+JOURNAL_DTYPE = np.dtype(
+    [
+        ("kind", "u1"),
+        ("side", "u1"),
+        ("flags", "u1"),
+        ("level", "<u2"),
+        ("time_us", "<i8"),
+        ("a", "<f8"),
+        ("b", "<f8"),
+        ("c", "<f8"),
+        ("d", "<f8"),
+        ("e", "<f8"),
+    ]
+)
+EPOCH = dt.datetime(1970, 1, 1)
+US = dt.timedelta(microseconds=1)
+
+# Record kinds; the a..e payload of each is listed next to it.
+J_ENTRY_CHECK = 1  # adx, plus_di, minus_di; flags bit0/bit1 = entry block buy/sell
+J_OPEN = 2  # lot, price; flags = flex
+J_OPEN_SKIP = 3
+J_CLOSE = 4  # lot, profit; flags = flex (full close and flex partial)
+J_TRANSFER = 5  # amount, balance, remaining_funds; flags = fund mode
+J_HOUR_FIRST = 6  # balance, equity, remaining_funds
+J_HOUR = 7  # balance, equity, remaining_funds, dd_now, dd_max
+J_SNAPSHOT = 8  # buy_count, buy_avg, sell_count, sell_avg
+J_MARGIN_CALL = 9  # loss, margin_level
+J_MARGIN_CALL_STOP = 10  # remaining_funds
+J_NO_FUNDS = 11
+J_FUNDING = 12  # amount, total_added, remaining_funds
+TRADE_KINDS = (J_ENTRY_CHECK, J_OPEN, J_OPEN_SKIP, J_CLOSE)
+
+SIDE_NAMES = ("buy", "sell")
+
+
+class EventJournal:
+    """Preallocated record buffer; accounts/trades select which event levels are recorded.
+
+    Producers receive the journal only for enabled levels (None otherwise), so a disabled
+    level costs one `is not None` test per event site.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        accounts: bool = True,
+        trades: bool = False,
+        capacity: int = JOURNAL_CAPACITY,
+    ) -> None:
+        self.path = path
+        self.accounts = accounts
+        self.trades = trades
+        self.records = np.zeros(capacity, dtype=JOURNAL_DTYPE)
+        self.count = 0
+        if path is not None:
+            with open(path, "wb") as f:
+                f.write(JOURNAL_MAGIC)
+
+    def record(
+        self,
+        kind: int,
+        time: Union[dt.datetime, int],
+        side: int = 0,
+        flags: int = 0,
+        level: int = 0,
+        a: float = 0.0,
+        b: float = 0.0,
+        c: float = 0.0,
+        d: float = 0.0,
+        e: float = 0.0,
+    ) -> None:
+        if self.count == len(self.records):
+            self.flush()
+        # int times are epoch milliseconds (the backtester's "int" time mode).
+        time_us = time * 1000 if isinstance(time, int) else (time - EPOCH) // US
+        self.records[self.count] = (kind, side, flags, level, time_us, a, b, c, d, e)
+        self.count += 1
+
+    def flush(self) -> None:
+        if self.count == 0:
+            return
+        records = self.records[: self.count]
+        if self.path is not None:
+            with open(self.path, "ab") as f:
+                f.write(records.tobytes())
+        else:
+            sys.stdout.write("".join(f"{line}\n" for line in render_records(records)))
+        self.count = 0
+
+
+def read_journal(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        if f.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+            raise ValueError(f"not an NM1 event journal: {path}")
+        return np.frombuffer(f.read(), dtype=JOURNAL_DTYPE)
+
+
+def level_comment(flex: int, level: int) -> str:
+    base = "NM1_FLEX" if flex else "NM1_CORE"
+    return f"{base}_L{level}" if level > 0 else base
+
+
+def render_record(record: np.void) -> str:
+    kind = int(record["kind"])
+    time = (EPOCH + dt.timedelta(microseconds=int(record["time_us"]))).isoformat()
+    side = SIDE_NAMES[int(record["side"])].upper()
+    flags = int(record["flags"])
+    level = int(record["level"])
+    a, b, c, d, e = (float(record[name]) for name in ("a", "b", "c", "d", "e"))
+    if kind == J_ENTRY_CHECK:
+        return (
+            f"{time} INIT_ENTRY_CHECK adx={a:.2f} plus_di={b:.2f} minus_di={c:.2f} "
+            f"entry_block_buy={flags & 1} entry_block_sell={(flags >> 1) & 1}"
+        )
+    if kind == J_OPEN:
+        return f"{time} OPEN {side} lot={a:.2f} price={b:.2f} comment={level_comment(flags, level)} level={level}"
+    if kind == J_OPEN_SKIP:
+        return f"{time} OPEN {side} SKIP entry_block_{side.lower()}=1"
+    if kind == J_CLOSE:
+        return f"{time} {side} lot={a:.2f} profit={b:.2f} comment={level_comment(flags, level)} level={level}"
+    if kind == J_TRANSFER:
+        return f"{time} FUND_TRANSFER_MODE{flags} amount={a:.2f} balance={b:.2f} remaining_funds={c:.2f}"
+    if kind == J_HOUR_FIRST:
+        return f"{time} balance={a:.2f} equity={b:.2f} remaining_funds={c:.2f} dd_now=0.00 dd_max=0.00"
+    if kind == J_HOUR:
+        return (
+            f"{time} balance={a:.2f} equity={b:.2f} remaining_funds={c:.2f} "
+            f"dd_now={d:.6f} dd_max={e:.6f}"
+        )
+    if kind == J_SNAPSHOT:
+        return f"{time} POS_SNAPSHOT buy_count={int(a)} buy_avg={b:.2f} sell_count={int(c)} sell_avg={d:.2f}"
+    if kind == J_MARGIN_CALL:
+        return f"{time} MARGIN_CALL loss={a:.2f} balance=0.00 margin_level={b:.3f}"
+    if kind == J_MARGIN_CALL_STOP:
+        return f"{time} MARGIN_CALL_STOP remaining_funds={a:.2f} backtest_stop"
+    if kind == J_NO_FUNDS:
+        return f"{time} NO_FUNDS remaining=0.00 backtest_stop"
+    if kind == J_FUNDING:
+        return f"{time} FUNDING +{a:.2f} total_added={b:.2f} remaining_funds={c:.2f}"
+    raise ValueError(f"unknown journal record kind {kind}")
+
+
+def render_records(records: np.ndarray) -> Iterator[str]:
+    for record in records:
+        yield render_record(record)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render an NM1 event journal as backtest log text")
+    parser.add_argument("path", help="Journal file written by backtest_nm1.py --journal")
+    parser.add_argument(
+        "--only",
+        choices=["accounts", "trades"],
+        help="Render only account events (log mode) or only trade events (--debug)",
+    )
+    args = parser.parse_args()
+    records = read_journal(args.path)
+    if args.only is not None:
+        is_trade = np.isin(records["kind"], TRADE_KINDS)
+        records = records[is_trade if args.only == "trades" else ~is_trade]
+    out = sys.stdout
+    for line in render_records(records):
+        out.write(f"{line}\n")
+
+
+if __name__ == "__main__":
+    main()
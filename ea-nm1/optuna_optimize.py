@@ -4,8 +4,11 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import os
 import sys
-from typing import Dict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 try:
     import optuna
@@ -15,16 +18,63 @@ except ImportError as exc:  # pragma: no cover - optuna is optional
     ) from exc
 
 from backtest_nm1 import (
+    DEFAULT_SYMBOL,
     K_MAX_LEVELS,
+    TIME_MODES,
+    DayProgress,
+    NM1Params,
+    abort_on,
+    apply_param_overrides,
     build_default_range,
+    normalize_symbol,
     parse_user_datetime,
+    range_data_fingerprint,
+    read_cached_result,
+    result_cache_path,
     run_backtest,
+    run_backtest_batch,
+    write_cached_result,
 )
+from tick_store import DEFAULT_TICK_CACHE_MB, TICK_SOURCES, TickCache
+
+ZERO_PROFIT_DRAWDOWN_RATE = 0.8  # trials at or past this drawdown (or with a margin call) score no profit
+SQLITE_BUSY_TIMEOUT_S = 60.0  # how long a --processes worker waits for the SQLite write lock
+PROGRESS_INTERVAL_S = 5.0  # how often the --processes parent reads the study for progress
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Optimize NM1 parameters with Optuna")
+    parser.add_argument("--symbol", default=DEFAULT_SYMBOL, help="Symbol (e.g. XAUUSD, BTCUSD)")
     parser.add_argument("--data-dir", default="data/XAUUSD", help="Root data directory")
+    parser.add_argument("--source", choices=TICK_SOURCES, default="csv", help="Tick source (see backtest_nm1.py)")
+    parser.add_argument(
+        "--tick-cache-mb",
+        type=int,
+        default=DEFAULT_TICK_CACHE_MB,
+        help="Decode the range once and share it across trials, up to this many MB (0=off)",
+    )
+    parser.add_argument(
+        "--indicator-cache-dir",
+        default="result/indicator_cache",
+        help="Directory for per-tick ATR/ADX columns shared by all trials (empty string=off)",
+    )
+    parser.add_argument(
+        "--trial-cache-dir",
+        default="result/trial_cache",
+        help="Directory of finished trial results keyed by the effective parameters, range and data; "
+        "a repeated parameter set reuses its result across studies (empty string=off)",
+    )
+    parser.add_argument(
+        "--event-skip",
+        action="store_true",
+        help="Jump over ticks on which nothing can trigger (see backtest_nm1.py --event-skip)",
+    )
+    parser.add_argument(
+        "--time-mode",
+        choices=TIME_MODES,
+        default="int",
+        help="Engine timestamps (see backtest_nm1.py --time-mode); int avoids per-tick datetime objects",
+    )
     parser.add_argument("--from", dest="from_dt", help="Start date/time (YYYY-MM-DD or ISO)")
     parser.add_argument("--to", dest="to_dt", help="End date/time (YYYY-MM-DD or ISO)")
     parser.add_argument(
@@ -36,9 +86,47 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--trials", type=int, default=50, help="Number of trials")
     parser.add_argument("--jobs", type=int, default=1, help="Parallel jobs")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help=(
+            "Run trials in this many worker processes sharing the study through --storage "
+            "(default: result/<study-name>.journal); unlike --jobs threads they are not serialized by the GIL"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Evaluate this many trials in one lockstep pass over the ticks (run_backtest_batch; needs --jobs 1)",
+    )
+    parser.add_argument(
+        "--pruner",
+        choices=["none", "median", "hyperband"],
+        default="none",
+        help="Report each replayed day's target to Optuna and stop trials the pruner rejects",
+    )
+    parser.add_argument(
+        "--prune-warmup-days",
+        type=int,
+        default=2,
+        help="Days every trial replays before it can be pruned",
+    )
+    parser.add_argument(
+        "--early-abort",
+        action="store_true",
+        help=(
+            "Stop a trial at the first day boundary after a margin call or "
+            f"{ZERO_PROFIT_DRAWDOWN_RATE:.0%} drawdown (it scores no profit either way)"
+        ),
+    )
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
     parser.add_argument("--study-name", default="nm1_optuna", help="Study name")
-    parser.add_argument("--storage", help="Optuna storage URL (e.g. sqlite:///result/optuna.db)")
+    parser.add_argument(
+        "--storage",
+        help="Optuna storage URL (e.g. sqlite:///result/optuna.db) or a journal file path (e.g. result/optuna.journal)",
+    )
     parser.add_argument("--optimize-safety-mode", action="store_true", help="Include safety_mode in search")
 
     parser.add_argument("--base-lot-min", type=float, default=0.03)
@@ -72,13 +160,319 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def suggest_params(trial: optuna.Trial, args: argparse.Namespace) -> Dict[str, object]:
+    params: Dict[str, object] = {}
+    base_lot_step = args.base_lot_step if args.base_lot_step > 0 else None
+    params["base_lot"] = trial.suggest_float(
+        "base_lot",
+        args.base_lot_min,
+        args.base_lot_max,
+        step=base_lot_step,
+    )
+    params["atr_multiplier"] = trial.suggest_float(
+        "atr_multiplier",
+        args.atr_multiplier_min,
+        args.atr_multiplier_max,
+        step=0.01,
+    )
+    params["min_atr"] = trial.suggest_float(
+        "min_atr",
+        args.min_atr_min,
+        args.min_atr_max,
+        step=0.01,
+    )
+    params["safe_k"] = trial.suggest_float(
+        "safe_k",
+        args.safe_k_min,
+        args.safe_k_max,
+        step=0.01,
+    )
+    params["safe_slope_k"] = trial.suggest_float(
+        "safe_slope_k",
+        args.safe_slope_k_min,
+        args.safe_slope_k_max,
+        step=0.01,
+    )
+    params["profit_base"] = trial.suggest_float(
+        "profit_base",
+        args.profit_base_min,
+        args.profit_base_max,
+        step=args.profit_base_step if args.profit_base_step > 0 else None,
+    )
+    params["profit_base_level_mode"] = False
+    #trial.suggest_categorical(
+    #    "profit_base_level_mode", [True, False] # True, False
+    #)
+    params["profit_base_level_step"] = trial.suggest_float(
+        "profit_base_level_step",
+        args.profit_base_level_step_min,
+        args.profit_base_level_step_max,
+    )
+    params["profit_base_level_min"] = trial.suggest_float(
+        "profit_base_level_min",
+        args.profit_base_level_min_min,
+        args.profit_base_level_min_max,
+    )
+    core_ratio = trial.suggest_float(
+        "core_ratio",
+        args.core_ratio_min,
+        args.core_ratio_max,
+        step=0.1,
+    )
+    params["core_ratio"] = core_ratio
+    params["flex_ratio"] = max(0.0, 1.0 - core_ratio)
+    params["flex_atr_profit_multiplier"] = trial.suggest_float(
+        "flex_atr_profit_multiplier",
+        args.flex_atr_profit_mult_min,
+        args.flex_atr_profit_mult_max,
+    )
+    params["max_levels"] = trial.suggest_int(
+        "max_levels",
+        args.max_levels_min,
+        min(args.max_levels_max, K_MAX_LEVELS),
+    )
+    params["core_flex_split_level"] = trial.suggest_int(
+        "core_flex_split_level",
+        args.core_flex_split_level_min,
+        args.core_flex_split_level_max,
+        step=1,
+    )
+    if args.optimize_safety_mode:
+        params["safety_mode"] = trial.suggest_categorical(
+            "safety_mode", [True, False]
+        )
+    return params
+
+
+def scored_profit(result: Tuple[float, bool, float, float, float]) -> float:
+    _final_funds, margin_call, max_drawdown_rate, profit, _unrealized_loss = result
+    return 0.0 if margin_call or max_drawdown_rate >= ZERO_PROFIT_DRAWDOWN_RATE else profit
+
+
+def record(trial: optuna.Trial, result: Tuple[float, bool, float, float, float]) -> float:
+    final_funds, margin_call, max_drawdown_rate, _profit, unrealized_loss = result
+    profit = scored_profit(result)
+    target = profit - unrealized_loss
+    trial.set_user_attr("final_funds", final_funds)
+    trial.set_user_attr("margin_call", margin_call)
+    trial.set_user_attr("max_drawdown_rate", max_drawdown_rate)
+    trial.set_user_attr("profit", profit)
+    trial.set_user_attr("unrealized_loss", unrealized_loss)
+    return target
+
+
+def make_tick_cache(args: argparse.Namespace) -> Optional[TickCache]:
+    return TickCache(max_bytes=args.tick_cache_mb * 1024 * 1024) if args.tick_cache_mb > 0 else None
+
+
+def trial_cache_path(
+    args: argparse.Namespace,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    data_fingerprint: Optional[str],
+    params: Dict[str, object],
+) -> Optional[str]:
+    if data_fingerprint is None:
+        return None
+    return result_cache_path(
+        args.trial_cache_dir,
+        symbol,
+        start,
+        end,
+        args.fund_mode,
+        False,
+        apply_param_overrides(NM1Params(), params),
+        data_fingerprint,
+    )
+
+
+def make_objective(
+    args: argparse.Namespace,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    tick_cache: Optional[TickCache],
+    data_fingerprint: Optional[str],
+) -> Callable[[optuna.Trial], float]:
+    doomed = abort_on(ZERO_PROFIT_DRAWDOWN_RATE, margin_call=True) if args.early_abort else None
+
+    def objective(trial: optuna.Trial) -> float:
+        params = suggest_params(trial, args)
+        cache_path = trial_cache_path(args, symbol, start, end, data_fingerprint, params)
+        cached = read_cached_result(cache_path) if cache_path is not None else None
+        if cached is not None:
+            trial.set_user_attr("cached", True)
+            return record(trial, cached)
+        pruned_after: List[int] = []
+        aborted_after: List[int] = []
+
+        def on_day(progress: DayProgress) -> bool:
+            if doomed is not None and doomed(progress):
+                trial.set_user_attr("aborted_after_days", progress.day)
+                aborted_after.append(progress.day)
+                return True
+            if args.pruner != "none":
+                trial.report(scored_profit(progress.result) - progress.result[4], progress.day)
+                if trial.should_prune():
+                    pruned_after.append(progress.day)
+                    return True
+            return False
+
+        result = run_backtest(
+            args.data_dir,
+            symbol,
+            start,
+            end,
+            debug=False,
+            base_lot_override=None,
+            fund_mode=args.fund_mode,
+            log_mode=False,
+            params_override=params,
+            source=args.source,
+            tick_cache=tick_cache,
+            indicator_cache_dir=args.indicator_cache_dir or None,
+            event_skip=args.event_skip,
+            time_mode=args.time_mode,
+            on_day=on_day if doomed is not None or args.pruner != "none" else None,
+        )
+        if pruned_after:
+            raise optuna.TrialPruned(f"pruned after {pruned_after[0]} days")
+        if cache_path is not None and not aborted_after:
+            write_cached_result(cache_path, result)
+        # An aborted trial keeps the target of the days it replayed (no profit, like a full replay).
+        return record(trial, result)
+
+    return objective
+
+
+def make_pruner(args: argparse.Namespace) -> optuna.pruners.BasePruner:
+    warmup_days = max(1, args.prune_warmup_days)
+    if args.pruner == "median":
+        return optuna.pruners.MedianPruner(n_warmup_steps=warmup_days)
+    if args.pruner == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=warmup_days)
+    return optuna.pruners.NopPruner()
+
+
+def open_storage(storage: Optional[str]) -> Union[None, str, optuna.storages.BaseStorage]:
+    """Resolve --storage: a database URL, or a journal file path for multi-process writers."""
+    if not storage:
+        return None
+    if "://" not in storage:
+        if hasattr(optuna.storages, "journal"):
+            backend = optuna.storages.journal.JournalFileBackend(storage)
+        else:  # optuna < 4.0
+            backend = optuna.storages.JournalFileStorage(storage)
+        return optuna.storages.JournalStorage(backend)
+    if storage.startswith("sqlite"):
+        # Concurrent workers wait on SQLite's write lock instead of failing with "database is locked".
+        return optuna.storages.RDBStorage(
+            storage, engine_kwargs={"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_S}}
+        )
+    return storage
+
+
+def best_line(trial: optuna.trial.FrozenTrial) -> str:
+    max_dd_rate = trial.user_attrs.get("max_drawdown_rate")
+    if isinstance(max_dd_rate, (int, float)):
+        max_dd_text = f"{max_dd_rate * 100:.2f}%"
+    else:
+        max_dd_text = "N/A"
+    return (
+        f"best is trial {trial.number} with value: {trial.value}. "
+        f"max_dd_percent: {max_dd_text}"
+    )
+
+
+def log_best(study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
+    if study.best_trial.number == trial.number:
+        print(best_line(trial))
+
+
+def run_study_worker(
+    args: argparse.Namespace,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    worker: int,
+    trial_budget: int,
+    data_fingerprint: Optional[str],
+) -> None:
+    """Pull trials of the shared study until it holds trial_budget trials (one --processes worker)."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=args.study_name,
+        storage=open_storage(args.storage),
+        # Distinct seeds, or every worker would propose the same first trials.
+        sampler=optuna.samplers.TPESampler(seed=args.seed + worker),
+        pruner=make_pruner(args),
+    )
+
+    def stop_at_budget(study: optuna.Study, _trial: optuna.trial.FrozenTrial) -> None:
+        if len(study.get_trials(deepcopy=False)) >= trial_budget:
+            study.stop()
+
+    if len(study.get_trials(deepcopy=False)) >= trial_budget:
+        return
+    # Each worker decodes the range into its own cache once; the GIL no longer serializes trials.
+    objective = make_objective(args, symbol, start, end, make_tick_cache(args), data_fingerprint)
+    study.optimize(objective, n_trials=args.trials, callbacks=[stop_at_budget])
+
+
+def run_study_processes(
+    args: argparse.Namespace,
+    study: optuna.Study,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    data_fingerprint: Optional[str],
+) -> None:
+    """Run --processes workers on the stored study and log progress and new bests from here."""
+    trial_budget = len(study.get_trials(deepcopy=False)) + args.trials
+    finished_states = (
+        optuna.trial.TrialState.COMPLETE,
+        optuna.trial.TrialState.PRUNED,
+        optuna.trial.TrialState.FAIL,
+    )
+    first = trial_budget - args.trials
+    reported_count, reported_best = -1, None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [
+            pool.submit(run_study_worker, args, symbol, start, end, worker, trial_budget, data_fingerprint)
+            for worker in range(args.processes)
+        ]
+        pending = futures
+        while pending:
+            _done, pending = concurrent.futures.wait(pending, timeout=PROGRESS_INTERVAL_S)
+            finished = [
+                trial
+                for trial in study.get_trials(deepcopy=False, states=finished_states)
+                if trial.number >= first
+            ]
+            complete = [trial for trial in finished if trial.state == optuna.trial.TrialState.COMPLETE]
+            if len(finished) != reported_count:
+                reported_count = len(finished)
+                pruned = sum(trial.state == optuna.trial.TrialState.PRUNED for trial in finished)
+                failed = sum(trial.state == optuna.trial.TrialState.FAIL for trial in finished)
+                print(f"Trials {reported_count}/{args.trials} (pruned={pruned} failed={failed})")
+            best = max(complete, key=lambda trial: trial.value, default=None)
+            if best is not None and best.number != reported_best:
+                reported_best = best.number
+                if best.number == study.best_trial.number:
+                    print(best_line(best))
+        for future in futures:
+            future.result()
+
+
 def main() -> None:
     args = parse_args()
+    symbol = normalize_symbol(args.symbol)
 
     start = parse_user_datetime(args.from_dt, is_end=False)
     end = parse_user_datetime(args.to_dt, is_end=True)
     if start is None or end is None:
-        default_start, default_end = build_default_range(args.data_dir)
+        default_start, default_end = build_default_range(args.data_dir, symbol, args.source)
         start = start or default_start
         end = end or default_end
     if start > end:
@@ -91,138 +485,87 @@ def main() -> None:
         raise SystemExit(
             "--core-flex-split-level-min must be <= --core-flex-split-level-max"
         )
+    if args.batch_size < 1:
+        raise SystemExit("--batch-size must be >= 1")
+    if args.batch_size > 1 and args.jobs != 1:
+        raise SystemExit("--batch-size cannot be combined with --jobs")
+    if args.batch_size > 1 and (args.pruner != "none" or args.early_abort):
+        raise SystemExit("--pruner/--early-abort cannot be combined with --batch-size")
+    if args.processes < 1:
+        raise SystemExit("--processes must be >= 1")
+    if args.processes > 1:
+        if args.jobs != 1 or args.batch_size > 1:
+            raise SystemExit("--processes cannot be combined with --jobs or --batch-size")
+        if not args.storage:
+            # Workers share the study through a file; a journal needs no database server.
+            args.storage = f"result/{args.study_name}.journal"
+        if "://" not in args.storage:
+            os.makedirs(os.path.dirname(args.storage) or ".", exist_ok=True)
 
-    def objective(trial: optuna.Trial) -> float:
-        params: Dict[str, object] = {}
-        base_lot_step = args.base_lot_step if args.base_lot_step > 0 else None
-        params["base_lot"] = trial.suggest_float(
-            "base_lot",
-            args.base_lot_min,
-            args.base_lot_max,
-            step=base_lot_step,
-        )
-        params["atr_multiplier"] = trial.suggest_float(
-            "atr_multiplier",
-            args.atr_multiplier_min,
-            args.atr_multiplier_max,
-            step=0.01,
-        )
-        params["min_atr"] = trial.suggest_float(
-            "min_atr",
-            args.min_atr_min,
-            args.min_atr_max,
-            step=0.01,
-        )
-        params["safe_k"] = trial.suggest_float(
-            "safe_k",
-            args.safe_k_min,
-            args.safe_k_max,
-            step=0.01,
-        )
-        params["safe_slope_k"] = trial.suggest_float(
-            "safe_slope_k",
-            args.safe_slope_k_min,
-            args.safe_slope_k_max,
-            step=0.01,
-        )
-        params["profit_base"] = trial.suggest_float(
-            "profit_base",
-            args.profit_base_min,
-            args.profit_base_max,
-            step=args.profit_base_step if args.profit_base_step > 0 else None,
-        )
-        params["profit_base_level_mode"] = False
-        #trial.suggest_categorical(
-        #    "profit_base_level_mode", [True, False] # True, False
-        #)
-        params["profit_base_level_step"] = trial.suggest_float(
-            "profit_base_level_step",
-            args.profit_base_level_step_min,
-            args.profit_base_level_step_max,
-        )
-        params["profit_base_level_min"] = trial.suggest_float(
-            "profit_base_level_min",
-            args.profit_base_level_min_min,
-            args.profit_base_level_min_max,
-        )
-        core_ratio = trial.suggest_float(
-            "core_ratio",
-            args.core_ratio_min,
-            args.core_ratio_max,
-            step=0.1,
-        )
-        params["core_ratio"] = core_ratio
-        params["flex_ratio"] = max(0.0, 1.0 - core_ratio)
-        params["flex_atr_profit_multiplier"] = trial.suggest_float(
-            "flex_atr_profit_multiplier",
-            args.flex_atr_profit_mult_min,
-            args.flex_atr_profit_mult_max,
-        )
-        params["max_levels"] = trial.suggest_int(
-            "max_levels",
-            args.max_levels_min,
-            max_levels_max,
-        )
-        params["core_flex_split_level"] = trial.suggest_int(
-            "core_flex_split_level",
-            args.core_flex_split_level_min,
-            args.core_flex_split_level_max,
-            step=1,
-        )
-        if args.optimize_safety_mode:
-            params["safety_mode"] = trial.suggest_categorical(
-                "safety_mode", [True, False]
-            )
-
-        final_funds, margin_call, max_drawdown_rate, profit, unrealized_loss = run_backtest(
-            args.data_dir,
-            start,
-            end,
-            debug=False,
-            base_lot_override=None,
-            fund_mode=args.fund_mode,
-            log_mode=False,
-            params_override=params,
-        )
-        if margin_call or max_drawdown_rate >= 0.8:
-            profit = 0.0
-        target = profit - unrealized_loss
-        trial.set_user_attr("final_funds", final_funds)
-        trial.set_user_attr("margin_call", margin_call)
-        trial.set_user_attr("max_drawdown_rate", max_drawdown_rate)
-        trial.set_user_attr("profit", profit)
-        trial.set_user_attr("unrealized_loss", unrealized_loss)
-        return target
-
-    def log_best(study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
-        if study.best_trial.number != trial.number:
-            return
-        max_dd_rate = trial.user_attrs.get("max_drawdown_rate")
-        if isinstance(max_dd_rate, (int, float)):
-            max_dd_text = f"{max_dd_rate * 100:.2f}%"
-        else:
-            max_dd_text = "N/A"
-        print(
-            f"best is trial {trial.number} with value: {trial.value}. "
-            f"max_dd_percent: {max_dd_text}"
-        )
+    # Trials run in this process (as --jobs threads or in batches), so one cache serves all of them.
+    tick_cache = make_tick_cache(args) if args.processes == 1 else None
+    # Keyed on the tick content, so corrected or re-downloaded data never reuses old results.
+    data_fingerprint = (
+        range_data_fingerprint(args.data_dir, symbol, start, end, args.source, tick_cache)
+        if args.trial_cache_dir
+        else None
+    )
 
     optuna.logging.set_verbosity(optuna.logging.WARNING)
-    sampler = optuna.samplers.TPESampler(seed=args.seed)
     study = optuna.create_study(
         study_name=args.study_name,
-        sampler=sampler,
-        storage=args.storage,
+        sampler=optuna.samplers.TPESampler(seed=args.seed),
+        pruner=make_pruner(args),
+        storage=open_storage(args.storage),
         load_if_exists=bool(args.storage),
         direction="maximize",
     )
-    study.optimize(
-        objective,
-        n_trials=args.trials,
-        n_jobs=args.jobs,
-        show_progress_bar=True,
-        callbacks=[log_best],
-    )
+    if args.processes > 1:
+        run_study_processes(args, study, symbol, start, end, data_fingerprint)
+    elif args.batch_size > 1:
+        # ask/tell: sample a batch of trials, replay them together, report all results.
+        remaining = args.trials
+        while remaining > 0:
+            trials = [study.ask() for _ in range(min(args.batch_size, remaining))]
+            trial_params = [suggest_params(trial, args) for trial in trials]
+            cache_paths = [
+                trial_cache_path(args, symbol, start, end, data_fingerprint, params) for params in trial_params
+            ]
+            results = [read_cached_result(path) if path is not None else None for path in cache_paths]
+            for trial, result in zip(trials, results):
+                if result is not None:
+                    trial.set_user_attr("cached", True)
+            replay = [i for i, result in enumerate(results) if result is None]
+            if replay:
+                replayed = run_backtest_batch(
+                    args.data_dir,
+                    symbol,
+                    start,
+                    end,
+                    args.fund_mode,
+                    [trial_params[i] for i in replay],
+                    source=args.source,
+                    tick_cache=tick_cache,
+                    indicator_cache_dir=args.indicator_cache_dir or None,
+                    event_skip=args.event_skip,
+                    time_mode=args.time_mode,
+                )
+                for i, result in zip(replay, replayed):
+                    results[i] = result
+                    if cache_paths[i] is not None:
+                        write_cached_result(cache_paths[i], result)
+            for trial, result in zip(trials, results):
+                frozen = study.tell(trial, record(trial, result))
+                log_best(study, frozen)
+            remaining -= len(trials)
+    else:
+        study.optimize(
+            make_objective(args, symbol, start, end, tick_cache, data_fingerprint),
+            n_trials=args.trials,
+            n_jobs=args.jobs,
+            show_progress_bar=True,
+            callbacks=[log_best],
+        )
 
     best = study.best_trial
     print("Best trial")
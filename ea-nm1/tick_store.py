@@ -0,0 +1,1144 @@
+#!/usr/bin/env python3
+"""Columnar tick store for the NM1 backtester.
+
+Each data/<SYMBOL>/<year>/<SYMBOL>_<date>.csv.gz day file can be converted once
+into a <SYMBOL>_<date>.ticks file next to it. A .ticks file is a 32 byte header
+followed by contiguous little-endian columns (int64 epoch ms, float64 bid,
+float64 ask) that are served through numpy.memmap, so repeated runs and worker
+processes share the page cache instead of re-parsing the csv.
+
+The "bi5" source reads the hourly Dukascopy cache used by ea-ml1
+(<data_dir>/<year>/<MM>/<DD>/<HH>h_ticks.bi5) directly, without a csv export.
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime as dt
+import functools
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import struct
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+from multiprocessing import shared_memory
+
+STORE_MAGIC = b"NM1TICK1"
+STORE_HEADER = struct.Struct("<8sqq8x")
+STORE_FLAG_SORTED = 1
+STORE_SUFFIX = ".ticks"
+CSV_SUFFIX = ".csv.gz"
+INDEX_MAGIC = b"NM1IDX01"
+INDEX_HEADER = struct.Struct("<8sq16x")
+INDEX_SUFFIX = ".idx"
+MINUTES_PER_DAY = 1440
+MS_PER_MINUTE = 60000
+CSV_CHUNK_BYTES = 16 * 1024 * 1024
+MAX_PRICE_WIDTH = 32
+TIME_DTYPE = np.dtype("<i8")
+PRICE_DTYPE = np.dtype("<f8")
+EPOCH = dt.datetime(1970, 1, 1)
+MS = dt.timedelta(milliseconds=1)
+BI5_SUFFIX = "h_ticks.bi5"
+BI5_DTYPE = np.dtype(
+    [
+        ("time_ms", ">u4"),
+        ("ask", ">u4"),
+        ("bid", ">u4"),
+        ("ask_vol", ">f4"),
+        ("bid_vol", ">f4"),
+    ]
+)
+MS_PER_HOUR = 3600000
+TICK_SOURCES = ("csv", "store", "bi5")
+DEFAULT_PREFETCH_DAYS = 2
+DEFAULT_PREFETCH_MAX_MB = 512
+DEFAULT_TICK_CACHE_MB = 2048
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+CATALOG_GAP_MS = 5 * MS_PER_MINUTE
+CATALOG_GAP_WARN_MS = 90 * MS_PER_MINUTE
+CATALOG_MIN_TICK_RATIO = 0.2
+CATALOG_MAX_SPREAD_RATIO = 5.0
+BLOCK_ITER_ROWS = 1 << 18
+
+T = TypeVar("T")
+
+
+@dataclass
+class TickArrays:
+    time_ms: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.time_ms.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.time_ms.nbytes + self.bid.nbytes + self.ask.nbytes)
+
+    def slice(self, begin: int, end: int) -> "TickArrays":
+        return TickArrays(self.time_ms[begin:end], self.bid[begin:end], self.ask[begin:end])
+
+
+@dataclass
+class PrefetchConfig:
+    days: int = DEFAULT_PREFETCH_DAYS
+    max_bytes: int = DEFAULT_PREFETCH_MAX_MB * 1024 * 1024
+
+
+def datetime_to_ms(value: dt.datetime) -> int:
+    return (value - EPOCH) // MS
+
+
+def datetime_to_ms_ceil(value: dt.datetime) -> int:
+    return -((EPOCH - value) // MS)
+
+
+def ms_to_datetime(value: int) -> dt.datetime:
+    return EPOCH + dt.timedelta(milliseconds=value)
+
+
+def empty_tick_arrays() -> TickArrays:
+    return TickArrays(
+        np.empty(0, dtype=TIME_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+    )
+
+
+def day_file_path(data_dir: str, symbol: str, day: dt.date, suffix: str) -> str:
+    return os.path.join(data_dir, str(day.year), f"{symbol}_{day.isoformat()}{suffix}")
+
+
+def day_start_ms(day: dt.date) -> int:
+    return datetime_to_ms(dt.datetime.combine(day, dt.time(0, 0, 0)))
+
+
+def is_sorted(time_ms: np.ndarray) -> bool:
+    return bool(np.all(time_ms[1:] >= time_ms[:-1]))
+
+
+@dataclass
+class CsvLayout:
+    columns: int
+    time_col: int
+    bid_col: int
+    ask_col: int
+
+
+def parse_csv_header(line: bytes) -> Optional[CsvLayout]:
+    names = [name.strip() for name in line.decode("utf-8", "replace").strip().split(",")]
+    try:
+        return CsvLayout(len(names), names.index("datetime"), names.index("bid"), names.index("ask"))
+    except ValueError:
+        return None
+
+
+def days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def decode_time_column(buf: np.ndarray, begin: np.ndarray, end: np.ndarray) -> Optional[np.ndarray]:
+    # Fixed "YYYY-MM-DD HH:MM:SS[.ffffff]" layout; anything else goes to the slow path.
+    length = end - begin
+    if length.min() < 19 or length.max() > 26:
+        return None
+    head = buf[begin[:, None] + np.arange(19)]
+    if not (
+        np.all(head[:, [4, 7]] == ord("-"))
+        and np.all((head[:, 10] == ord(" ")) | (head[:, 10] == ord("T")))
+        and np.all(head[:, [13, 16]] == ord(":"))
+    ):
+        return None
+    digits = head[:, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]].astype(np.int64) - ord("0")
+    if digits.min() < 0 or digits.max() > 9:
+        return None
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    second = digits[:, 12] * 10 + digits[:, 13]
+    if month.min() < 1 or month.max() > 12 or day.min() < 1 or day.max() > 31:
+        return None
+    if hour.max() > 23 or minute.max() > 59 or second.max() > 59:
+        return None
+    micros = np.zeros(begin.shape[0], dtype=np.int64)
+    has_fraction = length > 19
+    if has_fraction.any():
+        if np.any(length == 20) or np.any(buf[begin[has_fraction] + 19] != ord(".")):
+            return None
+        frac_len = length - 20
+        for k in range(6):
+            present = frac_len > k
+            if not present.any():
+                break
+            digit = buf[np.where(present, begin + 20 + k, begin)].astype(np.int64) - ord("0")
+            if np.any(present & ((digit < 0) | (digit > 9))):
+                return None
+            micros += np.where(present, digit * 10 ** (5 - k), 0)
+    if np.any(micros % 1000 != 0):
+        # Sub-millisecond stamps would be truncated by the epoch-ms columns.
+        return None
+    seconds = days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    return seconds * 1000 + micros // 1000
+
+
+def decode_price_column(buf: np.ndarray, begin: np.ndarray, end: np.ndarray) -> Optional[np.ndarray]:
+    length = end - begin
+    width = int(length.max())
+    if length.min() <= 0 or width > MAX_PRICE_WIDTH:
+        return None
+    offsets = np.arange(width)
+    index = np.minimum(begin[:, None] + offsets, buf.shape[0] - 1)
+    chars = buf[index]
+    chars[offsets >= length[:, None]] = 0
+    try:
+        return np.ascontiguousarray(chars).view(f"S{width}").ravel().astype(PRICE_DTYPE)
+    except ValueError:
+        return None
+
+
+def decode_csv_chunk(data: bytes, layout: CsvLayout) -> Optional[TickArrays]:
+    decoded = decode_csv_lines(data, layout)
+    return decoded[0] if decoded is not None else None
+
+
+def decode_csv_lines(data: bytes, layout: CsvLayout) -> Optional[Tuple[TickArrays, Optional[np.ndarray]]]:
+    """Decode a chunk of whole csv lines; also returns each row's byte offset in the chunk."""
+    if b'"' in data:
+        return None
+    has_cr = b"\r" in data
+    if has_cr:
+        data = data.replace(b"\r", b"")
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    buf = np.frombuffer(data, dtype=np.uint8)
+    line_end = np.flatnonzero(buf == ord("\n"))
+    line_begin = np.concatenate(([0], line_end[:-1] + 1))
+    keep = line_end > line_begin
+    if not keep.all():
+        line_begin = line_begin[keep]
+        line_end = line_end[keep]
+    if line_end.shape[0] == 0:
+        return empty_tick_arrays(), np.empty(0, dtype=np.int64)
+    separators = layout.columns - 1
+    commas = np.flatnonzero(buf == ord(","))
+    if commas.shape[0] != line_end.shape[0] * separators:
+        return None
+    commas = commas.reshape(line_end.shape[0], separators)
+    if separators > 0 and (np.any(commas[:, 0] < line_begin) or np.any(commas[:, -1] > line_end)):
+        return None
+    field_begin = [line_begin] + [commas[:, i] + 1 for i in range(separators)]
+    field_end = [commas[:, i] for i in range(separators)] + [line_end]
+    time_ms = decode_time_column(buf, field_begin[layout.time_col], field_end[layout.time_col])
+    if time_ms is None:
+        return None
+    bid = decode_price_column(buf, field_begin[layout.bid_col], field_end[layout.bid_col])
+    ask = decode_price_column(buf, field_begin[layout.ask_col], field_end[layout.ask_col])
+    if bid is None or ask is None:
+        return None
+    arrays = TickArrays(time_ms.astype(TIME_DTYPE, copy=False), bid, ask)
+    return arrays, None if has_cr else line_begin.astype(np.int64)
+
+
+def concat_tick_arrays(parts: List[TickArrays]) -> TickArrays:
+    if not parts:
+        return empty_tick_arrays()
+    if len(parts) == 1:
+        return parts[0]
+    return TickArrays(
+        np.concatenate([part.time_ms for part in parts]),
+        np.concatenate([part.bid for part in parts]),
+        np.concatenate([part.ask for part in parts]),
+    )
+
+
+def decode_csv_stream(
+    f: gzip.GzipFile,
+    layout: CsvLayout,
+    base_offset: int,
+    limit: Optional[int] = None,
+    chunk_bytes: int = CSV_CHUNK_BYTES,
+) -> Optional[Tuple[TickArrays, Optional[np.ndarray]]]:
+    parts: List[TickArrays] = []
+    offsets: Optional[List[np.ndarray]] = []
+    pending = b""
+    position = base_offset
+    remaining = limit
+    while True:
+        size = chunk_bytes if remaining is None else min(chunk_bytes, remaining)
+        chunk = f.read(size) if size > 0 else b""
+        if remaining is not None:
+            remaining -= len(chunk)
+        data = pending + chunk
+        if chunk:
+            cut = data.rfind(b"\n") + 1
+            pending = data[cut:]
+            data = data[:cut]
+        if data:
+            decoded = decode_csv_lines(data, layout)
+            if decoded is None:
+                return None
+            part, line_begin = decoded
+            parts.append(part)
+            if offsets is not None and line_begin is not None:
+                offsets.append(line_begin + position)
+            else:
+                offsets = None
+            position += len(data)
+        if not chunk:
+            break
+    if offsets is not None:
+        # Trailing sentinel: the offset just past the last decoded line.
+        offsets.append(np.array([position], dtype=np.int64))
+        line_offsets: Optional[np.ndarray] = np.concatenate(offsets)
+    else:
+        line_offsets = None
+    return concat_tick_arrays(parts), line_offsets
+
+
+def decode_csv_day(path: str, chunk_bytes: int = CSV_CHUNK_BYTES) -> Optional[TickArrays]:
+    """Decode a csv.gz day with NumPy in large chunks; None if the layout is not the fixed one."""
+    decoded = decode_csv_day_indexed(path, chunk_bytes)
+    return decoded[0] if decoded is not None else None
+
+
+def decode_csv_day_indexed(
+    path: str, chunk_bytes: int = CSV_CHUNK_BYTES
+) -> Optional[Tuple[TickArrays, Optional[np.ndarray]]]:
+    with gzip.open(path, "rb") as f:
+        header = f.readline()
+        layout = parse_csv_header(header)
+        if layout is None:
+            return None
+        return decode_csv_stream(f, layout, len(header), chunk_bytes=chunk_bytes)
+
+
+@dataclass
+class DayIndex:
+    """First row and uncompressed byte offset of every minute of a day file (plus an end sentinel)."""
+
+    day_start_ms: int
+    rows: np.ndarray
+    offsets: np.ndarray
+
+    def span(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        first = (start_ms - self.day_start_ms) // MS_PER_MINUTE
+        last = (end_ms - self.day_start_ms) // MS_PER_MINUTE + 1
+        first = min(max(first, 0), MINUTES_PER_DAY)
+        last = min(max(last, first), MINUTES_PER_DAY)
+        return first, last
+
+
+def build_day_index(day: dt.date, time_ms: np.ndarray, line_offsets: np.ndarray) -> DayIndex:
+    start_ms = day_start_ms(day)
+    minutes = np.clip((time_ms - start_ms) // MS_PER_MINUTE, 0, MINUTES_PER_DAY)
+    rows = np.searchsorted(minutes, np.arange(MINUTES_PER_DAY + 1), side="left").astype(np.int64)
+    return DayIndex(start_ms, rows, line_offsets[rows].astype(np.int64))
+
+
+def write_day_index(path: str, index: DayIndex) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, index.day_start_ms))
+        f.write(index.rows.astype("<i8").tobytes())
+        f.write(index.offsets.astype("<i8").tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_day_index(path: str) -> Optional[DayIndex]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    size = (MINUTES_PER_DAY + 1) * 8
+    if len(raw) != INDEX_HEADER.size + 2 * size:
+        return None
+    magic, start_ms = INDEX_HEADER.unpack_from(raw)
+    if magic != INDEX_MAGIC:
+        return None
+    rows = np.frombuffer(raw, dtype="<i8", count=MINUTES_PER_DAY + 1, offset=INDEX_HEADER.size)
+    offsets = np.frombuffer(raw, dtype="<i8", count=MINUTES_PER_DAY + 1, offset=INDEX_HEADER.size + size)
+    return DayIndex(start_ms, rows, offsets)
+
+
+def load_csv_index(csv_path: str) -> Optional[DayIndex]:
+    index_path = csv_path + INDEX_SUFFIX
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(csv_path):
+        return None
+    return read_day_index(index_path)
+
+
+def read_csv_range(path: str, day: dt.date, start_ms: int, end_ms: int) -> Optional[TickArrays]:
+    """Fast-path read of [start_ms, end_ms] from a day csv.gz, seeking via the sidecar index.
+
+    The first partial-day query decodes the whole file and writes <file>.idx; later
+    queries skip straight to the minute offsets. Returns None if the file needs the
+    row-by-row parser.
+    """
+    first_ms = day_start_ms(day)
+    if start_ms <= first_ms and end_ms >= first_ms + MINUTES_PER_DAY * MS_PER_MINUTE - 1:
+        arrays = decode_csv_day(path)
+        return clip_to_range(arrays, start_ms, end_ms) if arrays is not None else None
+    index = load_csv_index(path)
+    if index is None:
+        decoded = decode_csv_day_indexed(path)
+        if decoded is None:
+            return None
+        arrays, line_offsets = decoded
+        if line_offsets is not None and is_sorted(arrays.time_ms):
+            write_day_index(path + INDEX_SUFFIX, build_day_index(day, arrays.time_ms, line_offsets))
+        return clip_to_range(arrays, start_ms, end_ms)
+    first, last = index.span(start_ms, end_ms)
+    if index.rows[last] <= index.rows[first]:
+        return empty_tick_arrays()
+    with gzip.open(path, "rb") as f:
+        layout = parse_csv_header(f.readline())
+        if layout is None:
+            return None
+        begin = int(index.offsets[first])
+        f.seek(begin)
+        decoded = decode_csv_stream(f, layout, begin, limit=int(index.offsets[last]) - begin)
+    if decoded is None:
+        return None
+    return clip_to_range(decoded[0], start_ms, end_ms)
+
+
+def read_csv_day(path: str) -> TickArrays:
+    arrays = decode_csv_day(path)
+    if arrays is not None:
+        return arrays
+    return read_csv_day_rows(path)
+
+
+def read_csv_day_rows(path: str) -> TickArrays:
+    times: List[int] = []
+    bids: List[float] = []
+    asks: List[float] = []
+    with gzip.open(path, "rt") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            times.append(datetime_to_ms(dt.datetime.fromisoformat(row["datetime"])))
+            bids.append(float(row["bid"]))
+            asks.append(float(row["ask"]))
+    return TickArrays(
+        np.array(times, dtype=TIME_DTYPE),
+        np.array(bids, dtype=PRICE_DTYPE),
+        np.array(asks, dtype=PRICE_DTYPE),
+    )
+
+
+def write_store_day(path: str, arrays: TickArrays) -> None:
+    count = len(arrays)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        flags = STORE_FLAG_SORTED if is_sorted(arrays.time_ms) else 0
+        f.write(STORE_HEADER.pack(STORE_MAGIC, count, flags))
+        f.write(np.ascontiguousarray(arrays.time_ms, dtype=TIME_DTYPE).tobytes())
+        f.write(np.ascontiguousarray(arrays.bid, dtype=PRICE_DTYPE).tobytes())
+        f.write(np.ascontiguousarray(arrays.ask, dtype=PRICE_DTYPE).tobytes())
+    os.replace(tmp_path, path)
+
+
+def open_store_day(path: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> TickArrays:
+    with open(path, "rb") as f:
+        magic, count, flags = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+    if magic != STORE_MAGIC:
+        raise ValueError(f"Not a tick store file: {path}")
+    if count == 0:
+        return empty_tick_arrays()
+    offset = STORE_HEADER.size
+    time_ms = np.memmap(path, dtype=TIME_DTYPE, mode="r", offset=offset, shape=(count,))
+    offset += count * TIME_DTYPE.itemsize
+    bid = np.memmap(path, dtype=PRICE_DTYPE, mode="r", offset=offset, shape=(count,))
+    offset += count * PRICE_DTYPE.itemsize
+    ask = np.memmap(path, dtype=PRICE_DTYPE, mode="r", offset=offset, shape=(count,))
+    arrays = TickArrays(time_ms, bid, ask)
+    if start_ms is None or end_ms is None:
+        return arrays
+    if flags & STORE_FLAG_SORTED:
+        # Binary search on the mapped timestamps only touches the pages it probes.
+        begin = int(np.searchsorted(time_ms, start_ms, side="left"))
+        end = int(np.searchsorted(time_ms, end_ms, side="right"))
+        return arrays.slice(begin, max(begin, end))
+    return clip_to_range(arrays, start_ms, end_ms)
+
+
+def is_store_fresh(csv_path: str, store_path: str) -> bool:
+    if not os.path.exists(store_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(store_path) >= os.path.getmtime(csv_path)
+
+
+def convert_day(data_dir: str, symbol: str, day: dt.date, force: bool = False) -> Optional[str]:
+    csv_path = day_file_path(data_dir, symbol, day, CSV_SUFFIX)
+    if not os.path.exists(csv_path):
+        return None
+    store_path = day_file_path(data_dir, symbol, day, STORE_SUFFIX)
+    if not force and is_store_fresh(csv_path, store_path):
+        return None
+    write_store_day(store_path, read_csv_day(csv_path))
+    return store_path
+
+
+def bi5_day_dir(data_dir: str, day: dt.date) -> str:
+    # Month directories are 1-based, as written by ea-ml1's download_bi5.
+    return os.path.join(data_dir, str(day.year), f"{day.month:02d}", f"{day.day:02d}")
+
+
+def infer_bi5_divisor(prices: np.ndarray) -> float:
+    median = float(np.median(prices))
+    if median > 1_000_000:
+        return 1000.0
+    if median > 100_000:
+        return 100.0
+    return 1.0
+
+
+def decode_bi5_hour(path: str) -> Optional[np.ndarray]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not raw:
+        # Empty marker left by a failed/missing download.
+        return None
+    try:
+        data = lzma.decompress(raw)
+    except lzma.LZMAError:
+        return None
+    usable = len(data) - len(data) % BI5_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=BI5_DTYPE, count=usable // BI5_DTYPE.itemsize)
+    return records if records.size > 0 else None
+
+
+def read_bi5_day(data_dir: str, day: dt.date, price_divisor: float = 0.0) -> Optional[TickArrays]:
+    day_dir = bi5_day_dir(data_dir, day)
+    if not os.path.isdir(day_dir):
+        return None
+    base_ms = day_start_ms(day)
+    times: List[np.ndarray] = []
+    bids: List[np.ndarray] = []
+    asks: List[np.ndarray] = []
+    for hour in range(24):
+        path = os.path.join(day_dir, f"{hour:02d}{BI5_SUFFIX}")
+        if not os.path.exists(path):
+            continue
+        records = decode_bi5_hour(path)
+        if records is None:
+            continue
+        times.append(records["time_ms"].astype(TIME_DTYPE) + (base_ms + hour * MS_PER_HOUR))
+        bids.append(records["bid"].astype(PRICE_DTYPE))
+        asks.append(records["ask"].astype(PRICE_DTYPE))
+    if not times:
+        return empty_tick_arrays()
+    bid = np.concatenate(bids)
+    ask = np.concatenate(asks)
+    divisor = price_divisor if price_divisor > 0.0 else infer_bi5_divisor(bid)
+    if divisor != 1.0:
+        bid /= divisor
+        ask /= divisor
+    return TickArrays(np.concatenate(times), bid, ask)
+
+
+def list_numeric_names(path: str) -> List[str]:
+    if not os.path.isdir(path):
+        return []
+    return sorted((name for name in os.listdir(path) if name.isdigit()), key=int, reverse=True)
+
+
+def load_day(
+    data_dir: str,
+    symbol: str,
+    day: dt.date,
+    source: str = "csv",
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+    bi5_divisor: float = 0.0,
+) -> Optional[TickArrays]:
+    if source == "bi5":
+        arrays = read_bi5_day(data_dir, day, bi5_divisor)
+        if arrays is None or start_ms is None or end_ms is None:
+            return arrays
+        return clip_to_range(arrays, start_ms, end_ms)
+    csv_path = day_file_path(data_dir, symbol, day, CSV_SUFFIX)
+    if source == "store":
+        store_path = day_file_path(data_dir, symbol, day, STORE_SUFFIX)
+        if is_store_fresh(csv_path, store_path):
+            return open_store_day(store_path, start_ms, end_ms)
+    elif source != "csv":
+        raise ValueError(f"Unknown tick source: {source}")
+    if not os.path.exists(csv_path):
+        return None
+    if start_ms is None or end_ms is None:
+        return read_csv_day(csv_path)
+    arrays = read_csv_range(csv_path, day, start_ms, end_ms)
+    if arrays is None:
+        arrays = clip_to_range(read_csv_day_rows(csv_path), start_ms, end_ms)
+    return arrays
+
+
+def clip_to_range(arrays: TickArrays, start_ms: int, end_ms: int) -> TickArrays:
+    if len(arrays) == 0:
+        return arrays
+    if arrays.time_ms[0] >= start_ms and arrays.time_ms[-1] <= end_ms:
+        return arrays
+    mask = (arrays.time_ms >= start_ms) & (arrays.time_ms <= end_ms)
+    return TickArrays(arrays.time_ms[mask], arrays.bid[mask], arrays.ask[mask])
+
+
+def scale_prices(arrays: TickArrays, price_scale: float) -> TickArrays:
+    scale = price_scale if price_scale > 0.0 else 1.0
+    if scale == 1.0:
+        return arrays
+    return TickArrays(arrays.time_ms, arrays.bid * scale, arrays.ask * scale)
+
+
+def tick_fingerprint(arrays: TickArrays) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for column in (arrays.time_ms, arrays.bid, arrays.ask):
+        digest.update(np.ascontiguousarray(column).data)
+    return digest.hexdigest()
+
+
+def iter_block_ticks(arrays: TickArrays) -> Iterator[Tuple[dt.datetime, float, float]]:
+    # Convert in slices so a month-long cached range never materialises as Python lists at once.
+    for begin in range(0, len(arrays), BLOCK_ITER_ROWS):
+        part = arrays.slice(begin, begin + BLOCK_ITER_ROWS)
+        for time_ms, bid, ask in zip(part.time_ms.tolist(), part.bid.tolist(), part.ask.tolist()):
+            yield ms_to_datetime(time_ms), bid, ask
+
+
+@dataclass
+class TickCache:
+    """In-process LRU of decoded tick ranges, bounded by max_bytes of array data."""
+
+    max_bytes: int = DEFAULT_TICK_CACHE_MB * 1024 * 1024
+    entries: "collections.OrderedDict[Tuple, TickArrays]" = field(default_factory=collections.OrderedDict)
+    nbytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, key: Tuple) -> Optional[TickArrays]:
+        with self.lock:
+            arrays = self.entries.get(key)
+            if arrays is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return arrays
+
+    def put(self, key: Tuple, arrays: TickArrays) -> None:
+        for column in (arrays.time_ms, arrays.bid, arrays.ask):
+            column.flags.writeable = False
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            if arrays.nbytes > self.max_bytes:
+                return
+            self.entries[key] = arrays
+            self.nbytes += arrays.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+
+@dataclass(frozen=True)
+class SharedTicksHandle:
+    """Picklable description of a SharedTicks block, sent to worker processes."""
+
+    name: str
+    rows: int
+    parts: int
+
+
+@dataclass
+class SharedTicks:
+    """Tick columns plus part offsets in one multiprocessing.shared_memory block.
+
+    Layout: int64 time_ms[rows] | float64 bid[rows] | float64 ask[rows] | int64 offsets[parts + 1].
+    Part i (e.g. one day of a --parallel-days run) is rows offsets[i]:offsets[i + 1].
+    """
+
+    handle: SharedTicksHandle
+    shm: shared_memory.SharedMemory
+    arrays: TickArrays
+    offsets: np.ndarray
+
+    @staticmethod
+    def layout(rows: int, parts: int) -> Tuple[int, int, int, int, int]:
+        bid_at = rows * TIME_DTYPE.itemsize
+        ask_at = bid_at + rows * PRICE_DTYPE.itemsize
+        offsets_at = ask_at + rows * PRICE_DTYPE.itemsize
+        size = offsets_at + (parts + 1) * TIME_DTYPE.itemsize
+        return 0, bid_at, ask_at, offsets_at, size
+
+    @classmethod
+    def map(cls, handle: SharedTicksHandle, shm: shared_memory.SharedMemory) -> "SharedTicks":
+        time_at, bid_at, ask_at, offsets_at, _size = cls.layout(handle.rows, handle.parts)
+        buf = shm.buf
+        arrays = TickArrays(
+            np.ndarray((handle.rows,), dtype=TIME_DTYPE, buffer=buf, offset=time_at),
+            np.ndarray((handle.rows,), dtype=PRICE_DTYPE, buffer=buf, offset=bid_at),
+            np.ndarray((handle.rows,), dtype=PRICE_DTYPE, buffer=buf, offset=ask_at),
+        )
+        offsets = np.ndarray((handle.parts + 1,), dtype=TIME_DTYPE, buffer=buf, offset=offsets_at)
+        return cls(handle, shm, arrays, offsets)
+
+    @classmethod
+    def create(cls, parts: Sequence[TickArrays]) -> "SharedTicks":
+        rows = sum(len(part) for part in parts)
+        size = cls.layout(rows, len(parts))[-1]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        shared = cls.map(SharedTicksHandle(shm.name, rows, len(parts)), shm)
+        position = 0
+        shared.offsets[0] = 0
+        for index, part in enumerate(parts):
+            end = position + len(part)
+            shared.arrays.time_ms[position:end] = part.time_ms
+            shared.arrays.bid[position:end] = part.bid
+            shared.arrays.ask[position:end] = part.ask
+            shared.offsets[index + 1] = end
+            position = end
+        return shared
+
+    @classmethod
+    def attach(cls, handle: SharedTicksHandle) -> "SharedTicks":
+        return cls.map(handle, shared_memory.SharedMemory(name=handle.name))
+
+    def part(self, index: int) -> TickArrays:
+        return self.arrays.slice(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+    def parts(self, begin: int, end: int) -> TickArrays:
+        """Parts begin..end - 1 as one slice (parts are stored back to back)."""
+        return self.arrays.slice(int(self.offsets[begin]), int(self.offsets[end]))
+
+    def close(self) -> None:
+        # Drop the numpy views first; SharedMemory.close() fails while buffers are exported.
+        self.arrays = empty_tick_arrays()
+        self.offsets = np.zeros(0, dtype=TIME_DTYPE)
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.close()
+        self.shm.unlink()
+
+
+_ATTACHED_SHARED_TICKS: Dict[str, SharedTicks] = {}
+
+
+def attach_shared_ticks(handle: SharedTicksHandle) -> SharedTicks:
+    """Attach once per process; pool workers reuse the mapping across tasks."""
+    shared = _ATTACHED_SHARED_TICKS.get(handle.name)
+    if shared is None:
+        shared = SharedTicks.attach(handle)
+        _ATTACHED_SHARED_TICKS[handle.name] = shared
+    return shared
+
+
+def result_nbytes(value: object) -> int:
+    if isinstance(value, TickArrays):
+        return value.nbytes
+    return 0
+
+
+def iter_prefetched(loaders: Sequence[Callable[[], T]], prefetch: Optional[PrefetchConfig]) -> Iterator[T]:
+    """Yield loaders() results in order, running up to prefetch.days of them ahead in threads.
+
+    zlib/lzma and the NumPy decode release the GIL, so upcoming days are decoded
+    while the caller replays the current one. Decoded-but-unconsumed blocks are
+    kept under prefetch.max_bytes (in-flight loads are estimated from the largest
+    block seen so far); the next block in order is always allowed.
+    """
+    if prefetch is None or prefetch.days <= 0 or len(loaders) <= 1:
+        for loader in loaders:
+            yield loader()
+        return
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=prefetch.days, thread_name_prefix="tick-prefetch"
+    )
+    pending: Deque[concurrent.futures.Future] = collections.deque()
+    next_index = 0
+    block_bytes = 0
+    try:
+        while next_index < len(loaders) or pending:
+            while next_index < len(loaders) and len(pending) < prefetch.days:
+                held = 0
+                for future in pending:
+                    held += result_nbytes(future.result()) if future.done() else block_bytes
+                if pending and held + block_bytes > prefetch.max_bytes:
+                    break
+                pending.append(executor.submit(loaders[next_index]))
+                next_index += 1
+            result = pending.popleft().result()
+            block_bytes = max(block_bytes, result_nbytes(result))
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def load_day_block(
+    data_dir: str,
+    symbol: str,
+    day: dt.date,
+    source: str,
+    start_ms: int,
+    end_ms: int,
+    price_scale: float,
+    bi5_divisor: float = 0.0,
+) -> Optional[TickArrays]:
+    arrays = load_day(data_dir, symbol, day, source, start_ms, end_ms, bi5_divisor)
+    if arrays is None or len(arrays) == 0:
+        return None
+    return scale_prices(arrays, price_scale)
+
+
+def iter_days(start: dt.datetime, end: dt.datetime) -> Iterator[dt.date]:
+    current = start.date()
+    while current <= end.date():
+        yield current
+        current += dt.timedelta(days=1)
+
+
+def iter_tick_blocks(
+    data_dir: str,
+    symbol: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    price_scale: float = 1.0,
+    source: str = "csv",
+    prefetch: Optional[PrefetchConfig] = None,
+    bi5_divisor: float = 0.0,
+) -> Iterator[TickArrays]:
+    start_ms = datetime_to_ms_ceil(start)
+    end_ms = datetime_to_ms(end)
+    loaders = [
+        functools.partial(
+            load_day_block, data_dir, symbol, day, source, start_ms, end_ms, price_scale, bi5_divisor
+        )
+        for day in iter_days(start, end)
+    ]
+    for arrays in iter_prefetched(loaders, prefetch):
+        if arrays is not None:
+            yield arrays
+
+
+@dataclass
+class DayStats:
+    path: str
+    size: int
+    mtime_ns: int
+    ticks: int
+    first_ms: Optional[int]
+    last_ms: Optional[int]
+    min_bid: Optional[float]
+    max_bid: Optional[float]
+    median_spread: Optional[float]
+    gaps: List[List[int]]
+
+
+@dataclass
+class TickCatalog:
+    """Per-day stats of one symbol's tick tree, persisted as <data_dir>/catalog.json.
+
+    dirs holds the mtime of every directory whose listing is reflected in days, so a
+    refresh only re-lists directories that changed and only re-decodes changed files.
+    """
+
+    symbol: str
+    source: str
+    dirs: Dict[str, int] = field(default_factory=dict)
+    days: Dict[str, DayStats] = field(default_factory=dict)
+
+    def day_list(self) -> List[dt.date]:
+        return sorted(dt.date.fromisoformat(day) for day in self.days)
+
+    def latest_day(self) -> Optional[dt.date]:
+        days = self.day_list()
+        return days[-1] if days else None
+
+
+def catalog_path(data_dir: str) -> str:
+    return os.path.join(data_dir, CATALOG_NAME)
+
+
+def compute_day_stats(path: str, size: int, mtime_ns: int, arrays: TickArrays) -> DayStats:
+    if len(arrays) == 0:
+        return DayStats(path, size, mtime_ns, 0, None, None, None, None, None, [])
+    time_ms = arrays.time_ms
+    steps = np.diff(time_ms)
+    gap_at = np.flatnonzero(steps > CATALOG_GAP_MS)
+    gaps = [[int(time_ms[i]), int(time_ms[i + 1])] for i in gap_at]
+    return DayStats(
+        path=path,
+        size=size,
+        mtime_ns=mtime_ns,
+        ticks=len(arrays),
+        first_ms=int(time_ms[0]),
+        last_ms=int(time_ms[-1]),
+        min_bid=float(arrays.bid.min()),
+        max_bid=float(arrays.bid.max()),
+        median_spread=float(np.median(arrays.ask - arrays.bid)),
+        gaps=gaps,
+    )
+
+
+def read_catalog(data_dir: str, symbol: str, source: str) -> TickCatalog:
+    path = catalog_path(data_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return TickCatalog(symbol, source)
+    if (
+        not isinstance(payload, dict)
+        or payload.get("version") != CATALOG_VERSION
+        or payload.get("symbol") != symbol
+        or payload.get("source") != source
+    ):
+        return TickCatalog(symbol, source)
+    days = {day: DayStats(**stats) for day, stats in payload.get("days", {}).items()}
+    return TickCatalog(symbol, source, dict(payload.get("dirs", {})), days)
+
+
+def write_catalog(data_dir: str, catalog: TickCatalog) -> None:
+    path = catalog_path(data_dir)
+    payload = {
+        "version": CATALOG_VERSION,
+        "symbol": catalog.symbol,
+        "source": catalog.source,
+        "dirs": catalog.dirs,
+        "days": {day: asdict(catalog.days[day]) for day in sorted(catalog.days)},
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Read-only data trees still get an in-memory catalog for this run.
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def scan_csv_dir(
+    data_dir: str, symbol: str, rel_dir: str, catalog: TickCatalog, found: Dict[str, DayStats]
+) -> None:
+    for name in os.listdir(os.path.join(data_dir, rel_dir)):
+        if not name.startswith(f"{symbol}_") or not name.endswith(CSV_SUFFIX):
+            continue
+        day_text = name[len(symbol) + 1 : -len(CSV_SUFFIX)]
+        try:
+            dt.date.fromisoformat(day_text)
+        except ValueError:
+            continue
+        scan_csv_file(data_dir, os.path.join(rel_dir, name), day_text, catalog, found)
+
+
+def scan_csv_file(
+    data_dir: str, rel_path: str, day_text: str, catalog: TickCatalog, found: Dict[str, DayStats]
+) -> None:
+    try:
+        st = os.stat(os.path.join(data_dir, rel_path))
+    except FileNotFoundError:
+        return
+    known = catalog.days.get(day_text)
+    if known is not None and known.path == rel_path and known.size == st.st_size and known.mtime_ns == st.st_mtime_ns:
+        found[day_text] = known
+        return
+    arrays = read_csv_day(os.path.join(data_dir, rel_path))
+    found[day_text] = compute_day_stats(rel_path, st.st_size, st.st_mtime_ns, arrays)
+
+
+def scan_bi5_day(data_dir: str, rel_dir: str, catalog: TickCatalog, found: Dict[str, DayStats]) -> None:
+    year, month, day = (int(part) for part in rel_dir.split(os.sep))
+    try:
+        date = dt.date(year, month, day)
+    except ValueError:
+        return
+    day_dir = os.path.join(data_dir, rel_dir)
+    size = 0
+    # Rewriting an hour file in place leaves the directory mtime alone, so take the newest of both.
+    mtime_ns = os.stat(day_dir).st_mtime_ns
+    for name in os.listdir(day_dir):
+        if name.endswith(BI5_SUFFIX):
+            st = os.stat(os.path.join(day_dir, name))
+            size += st.st_size
+            mtime_ns = max(mtime_ns, st.st_mtime_ns)
+    if size == 0:
+        return
+    known = catalog.days.get(date.isoformat())
+    if known is not None and known.size == size and known.mtime_ns == mtime_ns:
+        found[date.isoformat()] = known
+        return
+    arrays = read_bi5_day(data_dir, date)
+    found[date.isoformat()] = compute_day_stats(rel_dir, size, mtime_ns, arrays or empty_tick_arrays())
+
+
+def refresh_catalog(data_dir: str, symbol: str, source: str = "csv", full: bool = False) -> TickCatalog:
+    """Bring <data_dir>/catalog.json up to date and return it.
+
+    Year directories (csv) whose mtime is unchanged are not listed again, since no file
+    was added or removed; their cataloged files are still stat-ed. Only new files and
+    files whose size or mtime changed (including rewrites in place) are decoded again.
+    """
+    kind = "bi5" if source == "bi5" else "csv"
+    catalog = read_catalog(data_dir, symbol, kind)
+    if full:
+        catalog = TickCatalog(symbol, kind)
+    dirs: Dict[str, int] = {}
+    days: Dict[str, DayStats] = {}
+    for year in list_numeric_names(data_dir):
+        year_dir = os.path.join(data_dir, year)
+        if kind == "csv":
+            mtime_ns = os.stat(year_dir).st_mtime_ns
+            dirs[year] = mtime_ns
+            if catalog.dirs.get(year) == mtime_ns:
+                for day, stats in catalog.days.items():
+                    if os.path.dirname(stats.path) == year:
+                        scan_csv_file(data_dir, stats.path, day, catalog, days)
+                continue
+            scan_csv_dir(data_dir, symbol, year, catalog, days)
+            continue
+        for month in list_numeric_names(year_dir):
+            month_rel = os.path.join(year, month)
+            for day in list_numeric_names(os.path.join(data_dir, month_rel)):
+                scan_bi5_day(data_dir, os.path.join(month_rel, day), catalog, days)
+    refreshed = TickCatalog(symbol, kind, dirs, days)
+    if refreshed.dirs != catalog.dirs or refreshed.days != catalog.days or not os.path.exists(catalog_path(data_dir)):
+        write_catalog(data_dir, refreshed)
+    return refreshed
+
+
+def catalog_fingerprint(catalog: TickCatalog, start: dt.date, end: dt.date) -> str:
+    """Digest of the catalog stats of [start, end]; changes when any day file in it is rewritten."""
+    in_range = {
+        day: asdict(stats) for day, stats in catalog.days.items() if start.isoformat() <= day <= end.isoformat()
+    }
+    payload = json.dumps([catalog.symbol, catalog.source, in_range], sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def check_catalog(catalog: TickCatalog, start: dt.date, end: dt.date) -> List[str]:
+    """Cheap data-quality warnings for [start, end] from catalog stats only."""
+    warnings: List[str] = []
+    in_range = {day: stats for day, stats in catalog.days.items() if start.isoformat() <= day <= end.isoformat()}
+    current = start
+    while current <= end:
+        if current.weekday() < 5 and current.isoformat() not in in_range:
+            warnings.append(f"{current.isoformat()} missing weekday file")
+        current += dt.timedelta(days=1)
+    counts = [stats.ticks for stats in in_range.values() if stats.ticks > 0]
+    spreads = [stats.median_spread for stats in in_range.values() if stats.median_spread is not None]
+    median_ticks = float(np.median(counts)) if counts else 0.0
+    median_spread = float(np.median(spreads)) if spreads else 0.0
+    for day in sorted(in_range):
+        stats = in_range[day]
+        if stats.ticks == 0:
+            warnings.append(f"{day} no ticks")
+            continue
+        weekday = dt.date.fromisoformat(day).weekday() < 5
+        if weekday and stats.ticks < median_ticks * CATALOG_MIN_TICK_RATIO:
+            warnings.append(f"{day} low tick count {stats.ticks} (median {median_ticks:.0f})")
+        if median_spread > 0.0 and stats.median_spread is not None and stats.median_spread > median_spread * CATALOG_MAX_SPREAD_RATIO:
+            warnings.append(f"{day} wide median spread {stats.median_spread:.5f} (range median {median_spread:.5f})")
+        if stats.median_spread is not None and stats.median_spread < 0.0:
+            warnings.append(f"{day} negative median spread {stats.median_spread:.5f}")
+        for gap_start, gap_end in stats.gaps:
+            # Shorter gaps (e.g. the daily 1h rollover break) are recorded but expected.
+            if gap_end - gap_start < CATALOG_GAP_WARN_MS:
+                continue
+            warnings.append(
+                f"{day} gap {ms_to_datetime(gap_start).time().isoformat()} -> "
+                f"{ms_to_datetime(gap_end).time().isoformat()} ({(gap_end - gap_start) / MS_PER_MINUTE:.1f} min)"
+            )
+    return warnings
+
+
+def iter_csv_days(data_dir: str, symbol: str) -> Iterator[dt.date]:
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if not name.startswith(f"{symbol}_") or not name.endswith(CSV_SUFFIX):
+                continue
+            try:
+                yield dt.date.fromisoformat(name[len(symbol) + 1 : -len(CSV_SUFFIX)])
+            except ValueError:
+                continue
+
+
+def convert_tree(
+    data_dir: str,
+    symbol: str,
+    start: Optional[dt.date] = None,
+    end: Optional[dt.date] = None,
+    force: bool = False,
+) -> List[str]:
+    converted: List[str] = []
+    for day in sorted(iter_csv_days(data_dir, symbol)):
+        if start is not None and day < start:
+            continue
+        if end is not None and day > end:
+            continue
+        path = convert_day(data_dir, symbol, day, force=force)
+        if path is not None:
+            converted.append(path)
+            print(f"Converted {path}")
+    return converted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert NM1 csv.gz tick files into the columnar tick store")
+    parser.add_argument("--symbol", default="XAUUSD", help="Symbol (e.g. XAUUSD, BTCUSD)")
+    parser.add_argument("--data-dir", help="Root data directory (default: data/<SYMBOL>)")
+    parser.add_argument("--from", dest="from_date", help="First date to convert (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", help="Last date to convert (YYYY-MM-DD)")
+    parser.add_argument("--force", action="store_true", help="Rewrite store files that are already up to date")
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="Refresh catalog.json and print data-quality warnings instead of converting",
+    )
+    parser.add_argument("--source", choices=("csv", "bi5"), default="csv", help="Tree layout for --catalog")
+    args = parser.parse_args()
+
+    symbol = args.symbol.strip().upper()
+    data_dir = args.data_dir or os.path.join("data", symbol)
+    start = dt.date.fromisoformat(args.from_date) if args.from_date else None
+    end = dt.date.fromisoformat(args.to_date) if args.to_date else None
+    if args.catalog:
+        catalog = refresh_catalog(data_dir, symbol, args.source, full=args.force)
+        days = catalog.day_list()
+        if not days:
+            raise SystemExit(f"No data found under {data_dir}")
+        start = start or days[0]
+        end = end or days[-1]
+        ticks = sum(stats.ticks for day, stats in catalog.days.items() if start.isoformat() <= day <= end.isoformat())
+        print(f"Catalog: {catalog_path(data_dir)} days={len(days)} first={days[0]} last={days[-1]}")
+        print(f"Range: {start} -> {end} ticks={ticks}")
+        for warning in check_catalog(catalog, start, end):
+            print(f"[WARN] {warning}")
+        return
+    converted = convert_tree(data_dir, symbol, start, end, force=args.force)
+    print(f"Converted files: {len(converted)}")
+
+
+if __name__ == "__main__":
+    main()